@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+IME辞書変換ツールのベンチマーク
+
+シード付きで合成した大きな辞書を使い、以下を計測する。
+
+- 処理段階ごと（読み込み・全単語取得・各形式の出力・統計表示）の
+  処理時間と tracemalloc によるメモリ使用量
+- 従来の方法（形式ごとに全単語をdictへコピーしてから出力）と、形式ごとに
+  個別出力した場合、1回の走査で全形式に同時出力した場合の処理時間
+- 単語の内部表現ごとの読み込み時のメモリ使用量
+
+結果は --json で JSON に保存でき、--compare で以前の結果と比較できる。
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent / 'tools' / 'converter'))
+from convert import FORMATS, DictionaryConverter, OutputWriter
+
+KANA = 'あいうえおかきくけこさしすせそたちつてとなにぬねのまみむめもやゆよらりるれろわん'
+ASCII = 'abcdefghijklmnopqrstuvwxyz'
+POS_CHOICES = ['名詞', '記号', '人名']
+
+
+def generate_dictionary(word_count, category_count=10, seed=0, tag_density=1.0, windows_share=0.0):
+    """ベンチマーク用の辞書データを生成
+
+    tag_density は1単語あたりの平均タグ数、windows_share は半角英字の読みと
+    読み_Windows を持つ単語の割合。同じ引数なら常に同じ辞書を返す。
+    """
+    rng = random.Random(seed)
+    whole_tags, extra_tag_share = divmod(tag_density, 1)
+    categories = {}
+    per_category = max(1, word_count // category_count)
+    for cat_index in range(category_count):
+        words = []
+        for i in range(per_category):
+            reading = ''.join(rng.choice(KANA) for _ in range(rng.randint(2, 6)))
+            word = {
+                '読み': reading,
+                '単語': f'単語{cat_index}_{i}',
+                '品詞': rng.choice(POS_CHOICES),
+                '説明': f'説明{i}',
+            }
+            tag_count = int(whole_tags)
+            if extra_tag_share and rng.random() < extra_tag_share:
+                tag_count += 1
+            word['タグ'] = [f'タグ{rng.randint(0, 9)}' for _ in range(tag_count)]
+            if windows_share and rng.random() < windows_share:
+                word['読み'] = ''.join(rng.choice(ASCII) for _ in range(len(reading)))
+                word['読み_Windows'] = reading
+            words.append(word)
+        categories[f'カテゴリ{cat_index}'] = {'説明': '', '有効': True, '単語リスト': words}
+    return {'辞書情報': {'名前': 'ベンチマーク', '説明': '', '更新日': '2025-01-01'}, 'カテゴリ': categories}
+
+
+def write_dictionary(json_file, word_count, **options):
+    """生成した辞書をJSONファイルに保存"""
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(generate_dictionary(word_count, **options), f, ensure_ascii=False)
+
+
+def stage_functions(json_file, output_dir, stream=False):
+    """計測する処理段階の (名前, 関数) のリスト"""
+    converter = DictionaryConverter(json_file, stream=stream)
+    return [
+        ('load', lambda: DictionaryConverter(json_file, stream=stream)),
+        ('_get_all_words', lambda: converter._get_all_words()),
+        ('to_csv', lambda: converter.to_csv(output_dir / 'stage.csv')),
+        ('to_txt', lambda: converter.to_txt(output_dir / 'stage.txt')),
+        ('to_macos_plist', lambda: converter.to_macos_plist(output_dir / 'stage.plist')),
+        ('to_windows', lambda: converter.to_windows(output_dir / 'stage_windows.txt')),
+        ('windows_readings', lambda: converter.generate_windows_readings()),
+        ('show_stats', converter.show_stats),
+    ]
+
+
+def profile_stage(func, repeat=3, memory=True):
+    """処理段階の最速時間（秒）と、1回分のメモリ使用量（バイト）を返す
+
+    tracemalloc は処理を大きく遅くするため、時間の計測とは別に1回だけ実行する。
+    """
+    seconds = measure(func, repeat=repeat)
+    result = {'seconds': seconds}
+    if memory:
+        tracemalloc.start()
+        with redirect_stdout(io.StringIO()):
+            value = func()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del value
+        result.update(current_bytes=current, peak_bytes=peak)
+    return result
+
+
+def run_stages(json_file, output_dir, stream=False, repeat=3, memory=True):
+    """全処理段階を計測"""
+    return {
+        name: profile_stage(func, repeat=repeat, memory=memory)
+        for name, func in stage_functions(json_file, output_dir, stream)
+    }
+
+
+# 全形式出力で計測する (形式名, 出力ファイル名)
+ALL_FORMATS = [
+    ('csv', 'dictionary.csv'),
+    ('txt', 'dictionary.txt'),
+    ('macos_plist', 'dictionary.plist'),
+    ('windows', 'dictionary_windows.txt'),
+]
+
+
+def run_copied(converter, output_dir):
+    """従来の方法で出力（形式ごとに _get_all_words() の単語をdictへコピーしてから書き込む）"""
+    for name, filename in ALL_FORMATS:
+        words = [word.to_dict() for word in converter._get_all_words()]
+        writer = OutputWriter(FORMATS[name](), output_dir / f'copy_{filename}')
+        for word in words:
+            writer.write(word)
+        writer.close()
+
+
+def run_sequential(converter, output_dir):
+    """形式ごとに個別に出力（形式の数だけ辞書を走査）"""
+    converter.to_csv(output_dir / 'seq.csv')
+    converter.to_txt(output_dir / 'seq.txt')
+    converter.to_macos(output_dir / 'seq.plist')
+    converter.to_windows(output_dir / 'seq_windows.txt')
+
+
+def run_fanout(converter, output_dir):
+    """1回の走査で全形式に同時出力"""
+    converter.convert([(name, output_dir / f'fan_{filename}') for name, filename in ALL_FORMATS])
+
+
+def measure(func, *args, repeat=3):
+    """最速の実行時間（秒）を返す"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure_load_memory(json_file, compact):
+    """辞書読み込み後のメモリ使用量と読み込み中のピーク（バイト）を返す"""
+    tracemalloc.start()
+    converter = DictionaryConverter(json_file, compact=compact)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del converter
+    return current, peak
+
+
+def word_count_arg(value):
+    """単語数の引数（1e6 のような指数表記も可）"""
+    return int(float(value))
+
+
+def format_bytes(size):
+    """バイト数をMiB表記に変換"""
+    return f"{size / (1024 * 1024):.1f}MiB"
+
+
+def print_stages(stages, previous=None):
+    """処理段階の計測結果を表示（以前の結果があれば比較も表示）"""
+    for name, result in stages.items():
+        line = f"    {name:<16} {result['seconds']:8.3f}秒"
+        if 'peak_bytes' in result:
+            line += f"  使用量 {format_bytes(result['current_bytes']):>10} / ピーク {format_bytes(result['peak_bytes']):>10}"
+        if previous and name in previous:
+            line += f"  (前回比 {result['seconds'] / previous[name]['seconds']:.2f}倍)"
+        print(line)
+
+
+def find_run(results, words, stream):
+    """結果JSONから同じ条件の計測を探す"""
+    for run in results.get('runs', []):
+        if run['words'] == words and run['stream'] == stream:
+            return run
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IME辞書変換ツールのベンチマーク')
+    parser.add_argument('--words', type=word_count_arg, nargs='+', default=[100000],
+                        help='生成する単語数（複数指定可、1e6 のような表記も可）')
+    parser.add_argument('--categories', type=int, default=10, help='カテゴリ数')
+    parser.add_argument('--tag-density', type=float, default=1.0, help='1単語あたりの平均タグ数')
+    parser.add_argument('--windows-share', type=float, default=0.0,
+                        help='読み_Windows を持つ単語の割合（0〜1）')
+    parser.add_argument('--seed', type=int, default=0, help='辞書生成の乱数シード')
+    parser.add_argument('--repeat', type=int, default=3, help='計測の繰り返し回数')
+    parser.add_argument('--only', choices=['stages', 'formats', 'memory'], nargs='+',
+                        default=['stages', 'formats', 'memory'], help='実行する計測')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='処理段階ごとのメモリ計測を省略（巨大な辞書向け）')
+    parser.add_argument('--json', type=Path, help='計測結果を保存するJSONファイル')
+    parser.add_argument('--compare', type=Path, help='比較する以前の計測結果JSON')
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    generator_options = {
+        'category_count': args.categories,
+        'seed': args.seed,
+        'tag_density': args.tag_density,
+        'windows_share': args.windows_share,
+    }
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': dict(generator_options, repeat=args.repeat),
+        'runs': [],
+        'load_memory': [],
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        for words in args.words:
+            json_file = temp_dir / 'bench.json'
+            write_dictionary(json_file, words, **generator_options)
+
+            for stream in (False, True):
+                mode = 'ストリーム' if stream else '一括読み込み'
+                run = {'words': words, 'stream': stream}
+                before = find_run(previous, words, stream) if previous else None
+
+                if 'stages' in args.only:
+                    print(f"📊 処理段階ごとの計測（{words}件・{mode}）")
+                    run['stages'] = run_stages(json_file, temp_dir, stream, args.repeat,
+                                               memory=not args.no_tracemalloc)
+                    print_stages(run['stages'], before and before.get('stages'))
+
+                if 'formats' in args.only:
+                    converter = DictionaryConverter(json_file, stream=stream)
+                    copied = measure(run_copied, converter, temp_dir, repeat=args.repeat)
+                    sequential = measure(run_sequential, converter, temp_dir, repeat=args.repeat)
+                    fanout = measure(run_fanout, converter, temp_dir, repeat=args.repeat)
+                    run['formats'] = {'copied': copied, 'sequential': sequential, 'fanout': fanout}
+                    print(f"📊 全形式出力（{words}件・{mode}、倍率は従来の方法との比較）")
+                    print(f"    従来の方法 {copied:.3f}秒")
+                    print(f"    個別出力   {sequential:.3f}秒 ({copied / sequential:.2f}倍)")
+                    print(f"    同時出力   {fanout:.3f}秒 ({copied / fanout:.2f}倍)")
+
+                results['runs'].append(run)
+
+            if 'memory' in args.only:
+                print(f"📊 読み込み時のメモリ使用量（{words}件、100万件あたりに換算）")
+                scale = 1000000 / words / (1024 * 1024)
+                memory = {'words': words}
+                for compact in (False, True):
+                    current, peak = measure_load_memory(json_file, compact)
+                    mode = 'CompactEntry' if compact else 'dict'
+                    memory[mode] = {'current_bytes': current, 'peak_bytes': peak}
+                    print(f"    {mode}: 使用量 {current * scale:.0f}MiB / ピーク {peak * scale:.0f}MiB")
+                results['load_memory'].append(memory)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 計測結果を保存しました: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
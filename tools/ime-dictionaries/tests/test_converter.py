@@ -13,8 +13,46 @@ import xml.etree.ElementTree as ET
 
 # テスト対象のモジュールをインポート
 sys.path.insert(0, str(Path(__file__).parent.parent / 'tools' / 'converter'))
+import convert
 from convert import DictionaryConverter
 
+# テストデータ（有効なカテゴリに5件の単語を含む辞書）
+TEST_DATA_PATH = Path(__file__).parent / 'test_data.json'
+
+
+class TempDirTestCase(unittest.TestCase):
+    """一時ディレクトリを使うテストの共通部分"""
+
+    test_data_path = TEST_DATA_PATH
+
+    def setUp(self):
+        """各テストの初期化"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """各テストの後処理"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def load_test_data(self):
+        """テストデータを読み込んだ辞書を返す"""
+        import json
+        with open(self.test_data_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_json(self, json_file, data, **options):
+        """データをJSONで書き込んでパスを返す（相対パスは一時ディレクトリ内）"""
+        import json
+        json_file = self.temp_dir / json_file
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, **options)
+        return json_file
+
+    def copy_test_data(self, name='dictionary.json'):
+        """テストデータを一時ディレクトリにコピーしてパスを返す"""
+        import shutil
+        return Path(shutil.copy(self.test_data_path, self.temp_dir / name))
+
 
 class TestDictionaryConverter(unittest.TestCase):
     """DictionaryConverterクラスのテスト"""
@@ -314,6 +352,38 @@ class TestDictionaryConverter(unittest.TestCase):
         self.assertIn('# 記号', content)
         self.assertIn('# 人名', content)
 
+    def test_convert_fanout_matches_individual_outputs(self):
+        """1回の走査で全形式に出力しても個別出力と同じ内容になるか"""
+        temp_dir = Path(self.temp_dir)
+        self.converter.convert([
+            ('csv', temp_dir / 'fan.csv'),
+            ('macos_plist', temp_dir / 'fan.plist'),
+            ('windows', temp_dir / 'fan_windows.txt'),
+        ], categories=['記号', '定型文'])
+        self.converter.to_csv(temp_dir / 'one.csv', categories=['記号', '定型文'])
+        self.converter.to_macos(temp_dir / 'one.plist', categories=['記号', '定型文'])
+        self.converter.to_windows(temp_dir / 'one_windows.txt', categories=['記号', '定型文'])
+
+        for fan, one in [('fan.csv', 'one.csv'), ('fan.plist', 'one.plist'), ('fan_windows.txt', 'one_windows.txt')]:
+            self.assertEqual((temp_dir / fan).read_bytes(), (temp_dir / one).read_bytes(), fan)
+
+    def test_segmented_convert_matches_serial(self):
+        """本文断片を連結した出力が逐次変換と同一か"""
+        from unittest import mock
+        temp_dir = Path(self.temp_dir)
+        targets = lambda prefix: [
+            ('csv', temp_dir / f'{prefix}.csv'),
+            ('macos_plist', temp_dir / f'{prefix}.plist'),
+            ('windows', temp_dir / f'{prefix}_windows.txt'),
+        ]
+        self.converter.convert(targets('serial'))
+        # シャード分割と連結を確認するため1シャード1件にする
+        with mock.patch.object(DictionaryConverter, 'SEGMENT_SIZE', 1):
+            self.converter.convert(targets('segmented'), cache_dir=temp_dir / 'cache')
+
+        for (_, serial), (_, segmented) in zip(targets('serial'), targets('segmented')):
+            self.assertEqual(serial.read_bytes(), segmented.read_bytes(), serial.name)
+
     def test_empty_words_output(self):
         """単語がない場合の出力テスト"""
         # 空のデータで試す
@@ -334,6 +404,8 @@ class TestDictionaryConverter(unittest.TestCase):
             csv_file = Path(self.temp_dir) / 'empty.csv'
             converter.to_csv(csv_file)
             # エラーなく実行できることを確認
+            # 単語がない場合はファイルを作成しない
+            self.assertFalse(csv_file.exists())
 
         finally:
             os.unlink(temp_file)
@@ -423,6 +495,1690 @@ class TestEdgeCases(unittest.TestCase):
             os.unlink(temp_file)
 
 
+class TestBuildCache(TempDirTestCase):
+    """変換キャッシュのテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = self.temp_dir / 'cache'
+        self.data = self.load_test_data()
+
+    def _convert(self, prefix, cache_dir=None):
+        from datetime import datetime
+        json_file = self.write_json('dict.json', self.data)
+        converter = DictionaryConverter(json_file)
+        targets = [
+            ('txt', self.temp_dir / f'{prefix}.txt'),
+            ('macos_txt', self.temp_dir / f'{prefix}_macos.txt'),
+            ('windows', self.temp_dir / f'{prefix}_windows.txt'),
+        ]
+        converter.convert(targets, cache_dir=cache_dir, generated_at=datetime(2025, 1, 1))
+        return converter, [path.read_bytes() for _, path in targets]
+
+    def test_cached_output_matches_uncached(self):
+        """キャッシュの有無で出力が変わらないか（生成日時固定）"""
+        _, expected = self._convert('plain')
+        _, first = self._convert('first', self.cache_dir)
+        _, second = self._convert('second', self.cache_dir)
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertIn('# 生成日時: 2025-01-01 00:00:00', expected[0].decode('utf-8'))
+
+    def test_source_date_epoch(self):
+        """SOURCE_DATE_EPOCH の生成日時はタイムゾーンによらず UTC で出力されるか"""
+        import io
+        import time
+        from contextlib import redirect_stdout
+        from unittest import mock
+        output_file = self.temp_dir / 'epoch.txt'
+        argv = ['convert.py', str(self.test_data_path), '--txt', str(output_file)]
+        try:
+            with mock.patch.dict(os.environ, {'SOURCE_DATE_EPOCH': '1735689600', 'TZ': 'Asia/Tokyo'}), \
+                    mock.patch.object(sys, 'argv', argv), redirect_stdout(io.StringIO()):
+                if hasattr(time, 'tzset'):
+                    time.tzset()
+                convert.main()
+        finally:
+            # 元のタイムゾーンに戻す
+            if hasattr(time, 'tzset'):
+                time.tzset()
+        self.assertIn('# 生成日時: 2025-01-01 00:00:00', output_file.read_text(encoding='utf-8'))
+
+    def test_only_changed_category_is_reencoded(self):
+        """変更のあったカテゴリだけ再変換されるか"""
+        converter, _ = self._convert('first', self.cache_dir)
+        self.assertEqual(converter.cache_stats, {'hit': 0, 'miss': 9})
+
+        converter, _ = self._convert('second', self.cache_dir)
+        self.assertEqual(converter.cache_stats, {'hit': 9, 'miss': 0})
+
+        self.data['カテゴリ']['人名']['単語リスト'][0]['単語'] = '田中太郎'
+        converter, outputs = self._convert('third', self.cache_dir)
+        self.assertEqual(converter.cache_stats, {'hit': 6, 'miss': 3})
+        self.assertIn('田中太郎', outputs[0].decode('utf-8'))
+
+
+class TestPlistWriter(TempDirTestCase):
+    """plist逐次出力のテスト"""
+
+    @staticmethod
+    def _minidom_plist(words):
+        """ElementTree + minidom による従来の整形結果"""
+        from xml.dom import minidom
+        plist = ET.Element('plist', version='1.0')
+        array = ET.SubElement(plist, 'array')
+        for word in words:
+            dict_elem = ET.SubElement(array, 'dict')
+            for key, field in (('phrase', '単語'), ('shortcut', '読み')):
+                ET.SubElement(dict_elem, 'key').text = key
+                ET.SubElement(dict_elem, 'string').text = word.get(field, '')
+        xml_str = ET.tostring(plist, encoding='unicode')
+        dom = minidom.parseString(f'<?xml version="1.0" encoding="UTF-8"?>{xml_str}')
+        pretty_xml = dom.toprettyxml(indent='\t', encoding='UTF-8').decode('utf-8')
+        lines = [line for line in pretty_xml.split('\n') if line.strip()]
+        return '\n'.join([
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">'
+        ] + lines[1:])
+
+    def test_matches_minidom_output(self):
+        """エスケープ・空文字・改行を含む値でも従来と同じ出力になるか"""
+        words = [
+            {"読み": "から", "単語": ""},
+            {"読み": "えすけーぷ", "単語": "<a href=\"x\">&'</a>"},
+            {"読み": "かいぎょう", "単語": "1行目\r\n\n  \n2行目"},
+            {"読み": "くうはく", "単語": "\u3000全角 "},
+        ]
+        json_file = self.write_json('plist.json', {"カテゴリ": {"テスト": {"単語リスト": words}}})
+        plist_file = self.temp_dir / 'out.plist'
+        DictionaryConverter(json_file).to_macos_plist(plist_file)
+        with open(plist_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), self._minidom_plist(words))
+
+
+class TestReadingLookup(unittest.TestCase):
+    """読み検索のテスト"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.converter = DictionaryConverter(TEST_DATA_PATH)
+
+    def test_prefix_lookup(self):
+        """前方一致検索"""
+        words = self.converter.lookup('m')
+        self.assertEqual([w['単語'] for w in words], ['meko@example.com', 'メモを確認する'])
+        self.assertEqual([w['単語'] for w in self.converter.lookup('ま')], ['○'])
+        self.assertEqual(self.converter.lookup('ん'), [])
+
+    def test_exact_lookup(self):
+        """完全一致検索"""
+        self.assertEqual([w['単語'] for w in self.converter.lookup('mem', exact=True)], ['メモを確認する'])
+        self.assertEqual(self.converter.lookup('me', exact=True), [])
+
+    def test_windows_reading_and_category(self):
+        """読み_Windowsでも検索でき、カテゴリが付いているか"""
+        words = self.converter.lookup('めー')
+        self.assertEqual(len(words), 1)
+        self.assertEqual(words[0]['カテゴリ'], '定型文')
+
+    def test_no_duplicates_and_limit(self):
+        """読みと読み_Windowsの両方が一致しても1件として返し、件数を制限できるか"""
+        self.assertEqual(len(self.converter.lookup('')), 5)
+        self.assertEqual(len(self.converter.lookup('', limit=2)), 2)
+
+    def test_index_reused(self):
+        """インデックスがカテゴリ指定ごとに再利用されるか"""
+        index = self.converter.reading_index()
+        self.assertIs(self.converter.reading_index(), index)
+        filtered = self.converter.reading_index(['人名'])
+        self.assertIsNot(filtered, index)
+        self.assertEqual([w['単語'] for w in self.converter.lookup('', categories=['人名'])], ['田中'])
+
+
+class TestDuplicates(TempDirTestCase):
+    """重複・衝突検出のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        data = {
+            "カテゴリ": {
+                "記号": {
+                    "単語リスト": [
+                        {"読み": "ほし", "単語": "★", "品詞": "記号"},
+                        {"読み": "ほ１", "単語": "★", "品詞": "記号"},
+                        {"読み": "まる", "単語": "○", "品詞": "記号"},
+                        {"読み": "まる", "単語": "●", "品詞": "記号"}
+                    ]
+                },
+                "定型文": {
+                    "単語リスト": [
+                        {"読み": "ほし", "単語": "★", "説明": "別カテゴリの重複"},
+                        {"読み": "mem", "読み_Windows": "めも", "単語": "メモを確認する"},
+                        {"読み": "めも", "単語": "メモ"}
+                    ]
+                }
+            }
+        }
+        self.json_file = self.write_json('dup.json', data)
+        self.converter = DictionaryConverter(self.json_file)
+
+    def test_find_duplicates(self):
+        """カテゴリをまたいだ重複とWindowsでの衝突を検出できるか"""
+        result = self.converter.find_duplicates()
+        self.assertEqual(len(result['duplicates']), 1)
+        self.assertEqual([w['カテゴリ'] for w in result['duplicates'][0]], ['記号', '定型文'])
+
+        # 同じ読みの複数候補（まる）は衝突ではない
+        self.assertEqual(len(result['windows_conflicts']), 1)
+        self.assertEqual({w['単語'] for w in result['windows_conflicts'][0]}, {'メモを確認する', 'メモ'})
+        self.assertEqual(self.converter.show_duplicates(), 2)
+
+    def test_dedupe_output(self):
+        """重複を除いた出力（逐次・本文断片とも同じ）"""
+        serial = self.temp_dir / 'serial.csv'
+        segmented = self.temp_dir / 'segmented.csv'
+        self.converter.convert([('csv', serial)], dedupe=True)
+        self.converter.convert([('csv', segmented)], dedupe=True, cache_dir=self.temp_dir / 'cache')
+        with open(serial, 'r', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(len(rows), 1 + 6)
+        self.assertEqual(serial.read_bytes(), segmented.read_bytes())
+
+        words = self.converter._iter_words(dedupe=True)
+        self.assertEqual(sum(1 for _ in words), 6)
+        self.assertEqual(words.duplicates, 1)
+
+
+class TestCompactEntry(TempDirTestCase):
+    """コンパクトな単語表現のテスト"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.compact = DictionaryConverter(TEST_DATA_PATH)
+        cls.plain = DictionaryConverter(TEST_DATA_PATH, compact=False)
+
+    def test_entries_are_compact(self):
+        """単語が CompactEntry として読み込まれ、dictと同じ内容か"""
+        compact_words = self.compact.data['カテゴリ']['記号']['単語リスト']
+        plain_words = self.plain.data['カテゴリ']['記号']['単語リスト']
+        self.assertIsInstance(compact_words[0], convert.CompactEntry)
+        self.assertEqual(dict(compact_words[0]), plain_words[0])
+        self.assertEqual(compact_words[0].get('読み_Windows', 'なし'), 'なし')
+        self.assertNotIn('読み_Windows', compact_words[0])
+        # カテゴリ情報や辞書情報は通常のdictのまま
+        self.assertIsInstance(self.compact.data['カテゴリ']['記号'], dict)
+
+    def test_shared_values(self):
+        """品詞とタグが辞書全体で共有されているか"""
+        words = self.compact._get_all_words(categories=['記号'])
+        self.assertIs(words[0]['品詞'], words[1]['品詞'])
+
+    def test_extra_fields_and_pickle(self):
+        """標準以外の項目を保持し、pickleできるか"""
+        import pickle
+        entry = convert.CompactEntry.from_pairs([('読み', 'よみ'), ('単語', '語'), ('独自', 1)], {})
+        self.assertEqual(dict(entry), {'読み': 'よみ', '単語': '語', '独自': 1})
+        self.assertEqual(dict(pickle.loads(pickle.dumps(entry))), dict(entry))
+
+    def test_outputs_match_plain_dicts(self):
+        """CompactEntry でも出力が変わらないか"""
+        for converter, name in [(self.compact, 'compact'), (self.plain, 'plain')]:
+            converter.convert([
+                ('csv', self.temp_dir / f'{name}.csv'),
+                ('windows', self.temp_dir / f'{name}.txt'),
+                ('macos_txt', self.temp_dir / f'{name}.macos'),
+            ])
+        for suffix in ('csv', 'txt', 'macos'):
+            self.assertEqual((self.temp_dir / f'compact.{suffix}').read_bytes(),
+                             (self.temp_dir / f'plain.{suffix}').read_bytes())
+
+    def test_batched_sections(self):
+        """一時ファイルへまとめて書き込む単語数によって出力が変わらないか"""
+        from datetime import datetime
+        from unittest import mock
+        expected = self.temp_dir / 'expected.txt'
+        self.compact.convert([('macos_txt', expected)], generated_at=datetime(2024, 1, 1))
+        for size in (1, 2):
+            output = self.temp_dir / f'batch{size}.txt'
+            with mock.patch.object(convert.OutputWriter, 'BATCH_SIZE', size):
+                self.compact.convert([('macos_txt', output)], generated_at=datetime(2024, 1, 1))
+            self.assertEqual(output.read_bytes(), expected.read_bytes())
+
+
+class TestSchemaValidation(TempDirTestCase):
+    """スキーマ検証のテスト"""
+
+    BAD_DATA = {
+        "辞書情報": {"名前": 1},
+        "カテゴリ": {
+            "a.b": {
+                "有効": "yes",
+                "単語リスト": [
+                    {"読み": "あ"},
+                    {"読み": 2, "単語": "x", "タグ": ["t", 3]},
+                    "str",
+                    {"読み": "い", "単語": "い"}
+                ]
+            },
+            "c": {"説明": "x"}
+        }
+    }
+
+    EXPECTED_PATHS = [
+        '$.辞書情報.名前',
+        '$.カテゴリ["a.b"].有効',
+        '$.カテゴリ["a.b"].単語リスト[0]',
+        '$.カテゴリ["a.b"].単語リスト[1].読み',
+        '$.カテゴリ["a.b"].単語リスト[1].タグ[1]',
+        '$.カテゴリ["a.b"].単語リスト[2]',
+        '$.カテゴリ.c',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.json_file = self.write_json('bad.json', self.BAD_DATA)
+
+    def _validate(self, stream):
+        validator = convert.SchemaValidator.from_file()
+        converter = DictionaryConverter(self.json_file, stream=stream, validator=validator)
+        converter.validate()
+        return validator.errors
+
+    def test_error_paths(self):
+        """エラー箇所がJSONパスで報告されるか"""
+        errors = self._validate(stream=False)
+        self.assertEqual(sorted(path for path, _ in errors), sorted(self.EXPECTED_PATHS))
+
+    def test_stream_matches_full_load(self):
+        """ストリームモードでも同じエラーが報告されるか"""
+        self.assertEqual(sorted(self._validate(stream=True)), sorted(self._validate(stream=False)))
+
+    def test_word_list_not_array(self):
+        """配列でない単語リストは1件のエラーになり、ストリームモードでも同じか"""
+        self.write_json(self.json_file, {"カテゴリ": {"a": {"有効": True, "単語リスト": "oops"}}})
+        for stream in (False, True):
+            errors = self._validate(stream)
+            self.assertEqual([path for path, _ in errors], ['$.カテゴリ.a.単語リスト'], stream)
+
+    def test_validate_document(self):
+        """データ全体の検証"""
+        validator = convert.SchemaValidator.from_file()
+        errors = validator.validate_document(self.BAD_DATA)
+        self.assertEqual(sorted(path for path, _ in errors), sorted(self.EXPECTED_PATHS))
+        self.assertEqual(validator.validate_document({"カテゴリ": {}}), [])
+
+    def test_repository_data_is_valid(self):
+        """リポジトリの辞書データがスキーマに適合するか"""
+        for stream in (False, True):
+            validator = convert.SchemaValidator.from_file()
+            converter = DictionaryConverter(self.test_data_path,
+                                            stream=stream, validator=validator)
+            self.assertEqual(converter.validate(), 0)
+
+    def test_validate_while_converting(self):
+        """変換と同時に検証し、出力は検証なしと同じか"""
+        import json
+        # オブジェクトでない単語は変換できないため除いておく
+        data = json.loads(json.dumps(self.BAD_DATA))
+        words = data['カテゴリ']['a.b']['単語リスト']
+        words.remove("str")
+        json_file = self.write_json('convertible.json', data)
+
+        validator = convert.SchemaValidator.from_file()
+        checked = DictionaryConverter(json_file, validator=validator)
+        plain = DictionaryConverter(json_file)
+        checked.convert([('txt', self.temp_dir / 'checked.txt')])
+        plain.convert([('txt', self.temp_dir / 'plain.txt')])
+        self.assertEqual(len(validator.errors), len(self.EXPECTED_PATHS) - 1)
+        self.assertEqual((self.temp_dir / 'checked.txt').read_bytes(),
+                         (self.temp_dir / 'plain.txt').read_bytes())
+
+
+class TestBenchmarkGenerator(unittest.TestCase):
+    """ベンチマーク用辞書生成のテスト"""
+
+    def test_deterministic_and_valid(self):
+        """同じシードで同じ辞書が生成され、スキーマに適合するか"""
+        import benchmark
+        options = {'category_count': 3, 'seed': 7, 'tag_density': 1.5, 'windows_share': 0.5}
+        data = benchmark.generate_dictionary(300, **options)
+        self.assertEqual(data, benchmark.generate_dictionary(300, **options))
+        self.assertNotEqual(data, benchmark.generate_dictionary(300, **dict(options, seed=8)))
+        self.assertEqual(convert.SchemaValidator.from_file().validate_document(data), [])
+
+        words = [w for cat in data['カテゴリ'].values() for w in cat['単語リスト']]
+        self.assertEqual(len(words), 300)
+        windows_words = [w for w in words if '読み_Windows' in w]
+        self.assertTrue(0 < len(windows_words) < len(words))
+        self.assertTrue(all(w['読み'].isascii() for w in windows_words))
+        average_tags = sum(len(w['タグ']) for w in words) / len(words)
+        self.assertTrue(1 <= average_tags <= 2)
+
+
+class TestProfiling(TempDirTestCase):
+    """処理段階ごとの計測のテスト"""
+
+    def test_conversion_stages(self):
+        """読み込み・走査・形式ごとの出力が記録されるか"""
+        profiler = convert.StageProfiler()
+        converter = DictionaryConverter(self.test_data_path, hooks=[profiler])
+        converter.convert([('csv', self.temp_dir / 'out.csv'), ('windows', self.temp_dir / 'out.txt')])
+
+        records = {record['stage']: record for record in profiler.records}
+        self.assertEqual(list(records), ['load', 'read', 'format:csv', 'format:windows', 'convert'])
+        self.assertEqual(records['load']['bytes'], self.test_data_path.stat().st_size)
+        self.assertEqual(records['read']['entries'], 5)
+        self.assertEqual(records['format:windows']['bytes'], (self.temp_dir / 'out.txt').stat().st_size)
+        self.assertGreater(records['convert']['entries_per_sec'], 0)
+        # tracemalloc が無効ならピークメモリは記録しない
+        self.assertIsNone(records['convert']['peak_memory'])
+
+    def test_hook_api_and_json_lines(self):
+        """add_hook() で登録したフックに記録が渡り、JSON Linesで出力できるか"""
+        import json
+        received = []
+        profiler = convert.StageProfiler()
+        converter = DictionaryConverter(self.test_data_path, stream=True)
+        converter.add_hook(received.append)
+        converter.add_hook(profiler)
+        converter.show_stats()
+        self.assertEqual([record['stage'] for record in received], ['stats'])
+        self.assertEqual(received[0]['entries'], 6)
+        self.assertEqual([json.loads(line) for line in profiler.json_lines()], received)
+
+    def test_failed_stage_recorded(self):
+        """例外で終わった段階も記録されるか"""
+        profiler = convert.StageProfiler()
+        converter = DictionaryConverter(self.test_data_path, hooks=[profiler])
+        with self.assertRaises(RuntimeError):
+            with converter._stage('failing'):
+                raise RuntimeError('失敗')
+        self.assertEqual([record['stage'] for record in profiler.records][-1], 'failing')
+
+    def test_peak_memory_covers_nested_stages(self):
+        """外側の段階のピークメモリが内側の段階のピーク以上になるか"""
+        import tracemalloc
+        profiler = convert.StageProfiler()
+        tracemalloc.start()
+        try:
+            converter = DictionaryConverter(self.test_data_path, hooks=[profiler])
+            converter.convert([('txt', self.temp_dir / 'out.txt'), ('macos_plist', self.temp_dir / 'out.plist')])
+        finally:
+            tracemalloc.stop()
+        peaks = {record['stage']: record['peak_memory'] for record in profiler.records}
+        self.assertTrue(all(peak > 0 for peak in peaks.values()))
+        self.assertEqual(peaks['convert'], max(peaks.values()))
+
+
+class TestSnapshot(TempDirTestCase):
+    """バイナリスナップショットのテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.json_file = self.copy_test_data('dict.json')
+        self.snapshot_file = convert.DictionarySnapshot.compile(self.json_file)
+
+    def test_snapshot_used_when_fresh(self):
+        """JSONと同じ場所に作成され、最新なら自動で読み込まれるか"""
+        self.assertEqual(self.snapshot_file, self.temp_dir / 'dict.json.snapshot')
+        converter = DictionaryConverter(self.json_file)
+        self.assertIsNotNone(converter.snapshot)
+        self.assertIsNone(DictionaryConverter(self.json_file, snapshot=False).snapshot)
+
+    def test_stale_snapshot_ignored(self):
+        """JSONを更新するとスナップショットを使わないか"""
+        import json
+        with open(self.json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data['カテゴリ']['記号']['単語リスト'].append({"読み": "ほし", "単語": "★"})
+        self.write_json(self.json_file, data)
+        converter = DictionaryConverter(self.json_file)
+        self.assertIsNone(converter.snapshot)
+        self.assertIn('★', [w['単語'] for w in converter._get_all_words()])
+
+    def test_outputs_match_json(self):
+        """スナップショットから作成した出力がJSONからの出力と同じか"""
+        from datetime import datetime
+        generated_at = datetime(2025, 1, 1)
+        formats = ['csv', 'txt', 'macos_plist', 'windows']
+        for stream in (False, True):
+            for snapshot in (False, True):
+                converter = DictionaryConverter(self.json_file, stream=stream, snapshot=snapshot)
+                converter.convert([(name, self.temp_dir / f'{name}_{snapshot}') for name in formats],
+                                  generated_at=generated_at)
+            for name in formats:
+                self.assertEqual((self.temp_dir / f'{name}_True').read_bytes(),
+                                 (self.temp_dir / f'{name}_False').read_bytes())
+
+    def test_only_requested_categories_decoded(self):
+        """件数はブロックを復元せずに返し、単語は参照したカテゴリだけ復元するか"""
+        converter = DictionaryConverter(self.json_file)
+        word_lists = {name: cat['単語リスト'] for name, cat in converter.data['カテゴリ'].items()}
+        converter.show_stats()
+        self.assertTrue(all(words._words is None for words in word_lists.values()))
+
+        words = converter._get_all_words(['人名'])
+        self.assertEqual([w['単語'] for w in words], ['田中'])
+        self.assertIsNotNone(word_lists['人名']._words)
+        self.assertIsNone(word_lists['記号']._words)
+
+    def test_round_trip_of_irregular_data(self):
+        """標準以外の項目や不正なデータも元どおりに復元されるか"""
+        import json
+        data = {
+            "辞書情報": {"名前": "テスト"},
+            "カテゴリ": {
+                "通常": {"有効": True, "単語リスト": [
+                    {"読み": "あ", "単語": "亜", "タグ": ["x", "y"], "優先度": 3, "メモ": {"a": [1, None]}},
+                    {"読み": 2, "単語": "い", "品詞": None},
+                    {"単語": "う", "説明": ""}
+                ]},
+                "空": {"単語リスト": []},
+                "単語リストなし": {"説明": "x"},
+                "不正": {"単語リスト": ["文字列"]},
+                "不正な型": "オブジェクトではない"
+            }
+        }
+        self.write_json(self.json_file, data)
+        convert.DictionarySnapshot.compile(self.json_file)
+
+        converter = DictionaryConverter(self.json_file)
+        self.assertIsNotNone(converter.snapshot)
+        from collections.abc import Mapping
+        restored = json.loads(json.dumps(converter.data, default=lambda value: (
+            dict(value) if isinstance(value, Mapping) else list(value))))
+        self.assertEqual(restored, data)
+
+        validator = convert.SchemaValidator.from_file()
+        DictionaryConverter(self.json_file, validator=validator).validate()
+        plain_validator = convert.SchemaValidator.from_file()
+        DictionaryConverter(self.json_file, validator=plain_validator, snapshot=False).validate()
+        self.assertEqual(sorted(validator.errors), sorted(plain_validator.errors))
+
+    def test_closed_with_converter(self):
+        """with 文を抜けるとスナップショットの mmap が閉じられるか"""
+        with DictionaryConverter(self.json_file) as converter:
+            snapshot = converter.snapshot
+            self.assertEqual(len(converter._get_all_words()), 5)
+            self.assertFalse(snapshot._mmap.closed)
+        self.assertTrue(snapshot._mmap.closed)
+        # 何度閉じてもよい
+        converter.close()
+
+
+class TestSQLiteStore(TempDirTestCase):
+    """辞書データベース（SQLite）のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.db_file = self.temp_dir / 'dict.sqlite'
+        DictionaryConverter(self.test_data_path).to_sqlite(self.db_file)
+        self.converter = DictionaryConverter(self.db_file)
+
+    def tearDown(self):
+        self.converter.close()
+        super().tearDown()
+
+    def test_indexes_created(self):
+        """読み・単語・カテゴリ・品詞・タグに索引があるか"""
+        rows = self.converter.store.connection.execute(
+            "SELECT tbl_name, sql FROM sqlite_master WHERE type = 'index'").fetchall()
+        indexed = {sql.split('(')[-1].rstrip(')') for _table, sql in rows if sql}
+        self.assertTrue({'reading', 'reading_windows', 'word', 'pos', 'category_id', 'tag'} <= indexed)
+
+    def test_outputs_match_json(self):
+        """データベースから作成した出力がJSONからの出力と同じか"""
+        from datetime import datetime
+        generated_at = datetime(2025, 1, 1)
+        formats = ['csv', 'txt', 'macos_plist', 'windows']
+        for source, converter in (('db', self.converter), ('json', DictionaryConverter(self.test_data_path))):
+            converter.convert([(name, self.temp_dir / f'{name}_{source}') for name in formats],
+                              categories=['記号', '人名'], generated_at=generated_at)
+        for name in formats:
+            self.assertEqual((self.temp_dir / f'{name}_db').read_bytes(),
+                             (self.temp_dir / f'{name}_json').read_bytes())
+
+    def test_queries(self):
+        """索引を使った検索が ReadingIndex と同じ結果を返すか"""
+        json_converter = DictionaryConverter(self.test_data_path)
+        for reading, exact in (('や', False), ('まる', True), ('', False), ('ない', False)):
+            self.assertEqual([dict(w) for w in self.converter.lookup(reading, exact=exact)],
+                             [dict(w) for w in json_converter.lookup(reading, exact=exact)])
+        self.assertEqual([w['単語'] for w in self.converter.store.find(pos='人名')], ['田中'])
+        self.assertEqual([w['単語'] for w in self.converter.store.find(tag='矢印', categories=['記号'])], ['→'])
+        # 無効なカテゴリの単語は検索しない
+        self.assertEqual(self.converter.store.find(word='無効な単語'), [])
+
+    def test_query_modes(self):
+        """条件の組み合わせごとの問い合わせが TagIndex・ReadingIndex と同じ結果を返すか"""
+        json_converter = DictionaryConverter(self.test_data_path)
+        store = self.converter.store
+        for reading, exact in (('や', False), ('まる', True), ('', False)):
+            self.assertEqual([dict(w) for w in store.lookup(reading, exact=exact, categories=['記号'])],
+                             [dict(w) for w in json_converter.lookup(reading, exact=exact, categories=['記号'])])
+        index = json_converter.tag_index()
+        for tags, pos, match_all in ((['矢印'], None, False), (['矢印', '記号'], None, True),
+                                     (None, ['名詞'], False), (['矢印'], ['記号', '名詞'], False)):
+            self.assertEqual([dict(w) for w in store.select(tags=tags, pos=pos, match_all=match_all)],
+                             [dict(w) for w in index.select(tags=tags, pos=pos, match_all=match_all)])
+        self.assertEqual(len(store.find(limit=2)), 2)
+        # 問い合わせは値によらず固定の文を使う
+        self.assertEqual(len(store.LOOKUP_QUERIES), 6)
+        self.assertEqual(len(store.FIND_QUERIES), 16)
+        self.assertEqual(len(store.SELECT_QUERIES), 18)
+
+    def test_word_list_sequence(self):
+        """単語リストの添字・スライス・逆順がJSONから読み込んだリストと同じか"""
+        import json
+        with open(self.test_data_path, 'r', encoding='utf-8') as f:
+            expected = json.load(f)['カテゴリ']['定型文']['単語リスト']
+        words = self.converter.data['カテゴリ']['定型文']['単語リスト']
+        self.assertIsInstance(words, convert.StoreWordList)
+        self.assertEqual([dict(word) for word in words], expected)
+        for index in (slice(None), slice(1, None), slice(None, None, -1), slice(5, 9), slice(-1, None)):
+            self.assertEqual([dict(word) for word in words[index]], expected[index], index)
+        self.assertEqual(dict(words[-1]), expected[-1])
+        self.assertEqual([dict(word) for word in reversed(words)], expected[::-1])
+        with self.assertRaises(IndexError):
+            words[len(expected)]
+
+    def test_close(self):
+        """with 文を抜けると辞書データベースの接続が閉じられるか"""
+        import sqlite3
+        with DictionaryConverter(self.db_file) as converter:
+            self.assertEqual(len(converter._get_all_words()), 5)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            converter.store.connection.execute('SELECT 1')
+
+    def test_json_round_trip(self):
+        """データベースから書き戻したJSONが元のデータと同じか"""
+        import json
+        data = {
+            "辞書情報": {"名前": "テスト"},
+            "カテゴリ": {
+                "通常": {"説明": "", "有効": True, "単語リスト": [
+                    {"読み": "あ", "単語": "亜", "タグ": ["x", "x"], "優先度": 3},
+                    {"読み": 2, "単語": "い", "品詞": None, "タグ": "不正"},
+                    "オブジェクトではない"
+                ]},
+                "空": {"単語リスト": []},
+                "単語リストなし": {"説明": "x"},
+                "不正": {"単語リスト": "配列ではない"}
+            }
+        }
+        json_file = self.write_json('irregular.json', data)
+        DictionaryConverter(json_file).to_sqlite(self.db_file)
+        DictionaryConverter(self.db_file).export_json(self.temp_dir / 'exported.json')
+        with open(self.temp_dir / 'exported.json', 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), data)
+
+    def test_export_json_format(self):
+        """書き戻したJSONが json.dump(indent=2) と同じ形式か（ストリームモードでの取り込みも）"""
+        import json
+        with open(self.test_data_path, 'r', encoding='utf-8') as f:
+            expected = json.dumps(json.load(f), ensure_ascii=False, indent=2)
+        self.converter.export_json(self.temp_dir / 'exported.json')
+        self.assertEqual((self.temp_dir / 'exported.json').read_text(encoding='utf-8'), expected)
+
+        DictionaryConverter(self.test_data_path, stream=True).to_sqlite(self.temp_dir / 'stream.sqlite')
+        DictionaryConverter(self.temp_dir / 'stream.sqlite').export_json(self.temp_dir / 'stream.json')
+        self.assertEqual((self.temp_dir / 'stream.json').read_text(encoding='utf-8'), expected)
+
+
+class TestTagIndex(TempDirTestCase):
+    """タグ・品詞の転置インデックスと絞り込み出力のテスト"""
+
+    # (タグ, 品詞, すべてのタグ, カテゴリ)
+    CONDITIONS = [
+        (['記号'], None, False, None),
+        (['矢印', '記号'], None, False, None),
+        (['矢印', '記号'], None, True, None),
+        (['矢印', '存在しないタグ'], None, True, None),
+        (None, ['名詞'], False, None),
+        (None, ['人名', '記号'], False, None),
+        (['記号'], ['記号'], False, ['記号']),
+        (['記号'], None, False, ['人名']),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.converter = DictionaryConverter(self.test_data_path)
+
+    def expected(self, tags, pos, match_all, categories):
+        """全単語を1件ずつ調べた結果"""
+        return [dict(word) for word in self.converter._iter_words(categories)
+                if convert.TagIndex.matches(word, tags, pos, match_all)]
+
+    def test_select_matches_linear_scan(self):
+        """インデックス・データベース・ストリームモードの選択結果が全件走査と同じか"""
+        db_file = self.temp_dir / 'dict.sqlite'
+        self.converter.to_sqlite(db_file)
+        store_converter = DictionaryConverter(db_file)
+        stream_converter = DictionaryConverter(self.test_data_path, stream=True)
+        try:
+            for tags, pos, match_all, categories in self.CONDITIONS:
+                expected = self.expected(tags, pos, match_all, categories)
+                for converter in (self.converter, store_converter, stream_converter):
+                    words = converter.select_words(tags, pos, match_all, categories)
+                    self.assertEqual([dict(word) for word in words], expected, (tags, pos, match_all, categories))
+        finally:
+            store_converter.store.close()
+
+        self.assertEqual([w['単語'] for w in self.converter.select_words(['矢印', '記号'], match_all=True)], ['→'])
+        self.assertEqual([w['単語'] for w in self.converter.select_words(pos=['人名'])], ['田中'])
+
+    def test_missing_pos_is_noun(self):
+        """品詞がない単語は「名詞」として選択されるか"""
+        index = convert.TagIndex([convert.WordView({'読み': 'あ', '単語': '亜'}, 'x'),
+                                  convert.WordView({'読み': 'い', '品詞': '記号'}, 'x')])
+        self.assertEqual([w['読み'] for w in index.select(pos=['名詞'])], ['あ'])
+        self.assertEqual(index.select(tags=['なし']), [])
+
+    def test_convert_selected(self):
+        """絞り込んだ出力が選択した単語だけを含み、本文断片を使っても同じか"""
+        for cache_dir in (None, self.temp_dir / 'cache'):
+            output_file = self.temp_dir / f'tags_{cache_dir is None}.csv'
+            self.converter.convert([('csv', output_file)], tags=['記号'], pos=['記号'], cache_dir=cache_dir)
+            rows = list(csv.reader(output_file.open('r', encoding='utf-8-sig')))[1:]
+            self.assertEqual([row[2] for row in rows], ['→', '○'])
+
+
+class TestWatchMode(TempDirTestCase):
+    """監視モード（変更の検出と差分変換）のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.json_file = self.copy_test_data('dict.json')
+
+    def test_watcher_debounces_saves(self):
+        """連続した保存が落ち着いてから1回だけ変更を通知するか"""
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            # 2回目から4回目の待機中に保存（サイズを変えて確実に変更にする）
+            if 2 <= len(sleeps) <= 4:
+                with open(self.json_file, 'a', encoding='utf-8') as f:
+                    f.write(' ')
+
+        watcher = convert.DictionaryWatcher(self.json_file, interval=1.0, debounce=0.5, sleep=sleep)
+        signature = watcher.wait()
+        self.assertEqual(signature[0][1], self.json_file.stat().st_size)
+        # 変更を検出するまでの2回と、保存のたびに延びた待機の後、変化のない待機が1回
+        self.assertEqual(sleeps, [1.0, 1.0, 0.5, 0.5, 0.5])
+
+    def test_incremental_convert(self):
+        """変更のあったカテゴリだけを変換し直し、全体を変換した場合と同じ出力になるか"""
+        import json
+        from datetime import datetime
+        generated_at = datetime(2025, 1, 1)
+        formats = ['csv', 'txt', 'macos_plist', 'windows']
+        memo = convert.SegmentMemo()
+        try:
+            targets = [(name, self.temp_dir / f'watch_{name}') for name in formats]
+            converter = DictionaryConverter(self.json_file)
+            converter.convert(targets, generated_at=generated_at, memo=memo)
+            self.assertEqual(converter.cache_stats['hit'], 0)
+            categories = converter.cache_stats['miss'] // len(formats)
+
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data['カテゴリ']['人名']['単語リスト'][0]['単語'] = '田仲'
+            self.write_json(self.json_file, data)
+
+            converter = DictionaryConverter(self.json_file, snapshot=False)
+            converter.convert(targets, generated_at=generated_at, memo=memo)
+            self.assertEqual(converter.cache_stats, {'hit': (categories - 1) * len(formats), 'miss': len(formats)})
+            # 使われなくなった断片は削除される
+            self.assertEqual(len(list(memo.segment_dir.iterdir())), categories * len(formats))
+
+            fresh = [(name, self.temp_dir / f'fresh_{name}') for name in formats]
+            DictionaryConverter(self.json_file).convert(fresh, generated_at=generated_at)
+            for (_, watched), (_, expected) in zip(targets, fresh):
+                self.assertEqual(watched.read_bytes(), expected.read_bytes())
+            self.assertIn('田仲', (self.temp_dir / 'watch_csv').read_text(encoding='utf-8-sig'))
+        finally:
+            memo.close()
+        self.assertFalse(memo.segment_dir.exists())
+
+    def run_watch(self, *args):
+        """--watch で1回変換し、変更を待つところで終了したときの出力を返す"""
+        import io
+        from contextlib import redirect_stdout
+        from unittest import mock
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['convert.py', str(self.json_file), '--watch', *args]), \
+                mock.patch.object(convert.DictionaryWatcher, 'wait', side_effect=KeyboardInterrupt), \
+                redirect_stdout(output):
+            convert.main()
+        return output.getvalue()
+
+    def test_watch_with_shard_size(self):
+        """--shard-size と併用しても変換エラーにならず、全体を変換することを表示するか"""
+        output_file = self.temp_dir / 'watch.csv'
+        output = self.run_watch('--csv', str(output_file), '--shard-size', '2')
+        self.assertNotIn('変換エラー', output)
+        self.assertIn('すべての単語を変換します', output)
+        self.assertTrue(convert.shard_path(output_file, 1).exists())
+
+    def test_watch_with_sort(self):
+        """--sort と併用しても変換エラーにならず、並べ替えた結果を出力するか"""
+        output_file = self.temp_dir / 'watch.csv'
+        output = self.run_watch('--csv', str(output_file), '--sort', 'word')
+        self.assertNotIn('変換エラー', output)
+        self.assertIn('すべての単語を変換します', output)
+        rows = list(csv.reader(output_file.open('r', encoding='utf-8-sig')))[1:]
+        self.assertEqual([row[2] for row in rows], sorted(row[2] for row in rows))
+
+
+class TestMergeInputs(TempDirTestCase):
+    """複数の辞書の併合のテスト"""
+
+    def merged_words(self, converter):
+        return [(w['カテゴリ'], w['単語'], w.get('説明')) for w in converter._iter_words()]
+
+    def test_precedence(self):
+        """先に指定した辞書のカテゴリ情報・単語・辞書情報が優先されるか"""
+        first = self.write_json('first.json', {"辞書情報": {"名前": "チームA"}, "カテゴリ": {
+            "記号": {"説明": "A", "有効": True, "単語リスト": [
+                {"読み": "まる", "単語": "○", "説明": "Aの説明"}, {"読み": "みぎ", "単語": "→"}]},
+            "人名": {"単語リスト": [{"読み": "たなか", "単語": "田中"}]}}})
+        second = self.write_json('second.json', {"辞書情報": {"名前": "チームB", "更新日": "2025-01-02"}, "カテゴリ": {
+            "追加": {"単語リスト": [{"読み": "あ", "単語": "亜"}]},
+            "記号": {"説明": "B", "有効": False, "単語リスト": [
+                {"読み": "まる", "単語": "○", "説明": "Bの説明"}, {"読み": "ほし", "単語": "☆"}]}}})
+
+        for stream in (False, True):
+            converter = DictionaryConverter([first, second], stream=stream)
+            self.assertEqual(self.merged_words(converter), [
+                ('記号', '○', 'Aの説明'), ('記号', '→', None), ('記号', '☆', None),
+                ('人名', '田中', None), ('追加', '亜', None)])
+            categories = {name: data for name, data, _words in converter._iter_categories()}
+            self.assertEqual(categories['記号']['説明'], 'A')
+            self.assertIs(categories['記号']['有効'], True)
+            self.assertEqual(converter._top_level()['辞書情報'], {"名前": "チームA", "更新日": "2025-01-02"})
+
+    def test_stream_matches_loaded(self):
+        """カテゴリの順が異なる辞書でも、ストリームモードと一括読み込みで同じ出力になるか"""
+        import json
+        data = self.load_test_data()
+        reordered = dict(reversed(list(data['カテゴリ'].items())))
+        first = self.write_json('first.json', data)
+        second = self.write_json('second.json', {"カテゴリ": reordered})
+        outputs = []
+        for stream in (False, True):
+            output_file = self.temp_dir / f'merged_{stream}.json'
+            DictionaryConverter([second, first], stream=stream).export_json(output_file)
+            outputs.append(output_file.read_bytes())
+        self.assertEqual(outputs[0], outputs[1])
+        # 同じ単語は1件だけになり、カテゴリは先に指定した辞書の順になる
+        merged = json.loads(outputs[0])
+        self.assertEqual(list(merged['カテゴリ']), list(reordered))
+        self.assertEqual(merged['カテゴリ'], reordered)
+
+    def test_sorted_merge(self):
+        """読みの順に並んだ辞書を読みの順に併合し、並んでいない辞書はエラーにするか"""
+        first = self.write_json('s1.json', {"カテゴリ": {"記号": {"単語リスト": [
+            {"読み": "あ", "単語": "A1"}, {"読み": "か", "単語": "○", "説明": "A"}, {"読み": "さ", "単語": "A3"}]}}})
+        second = self.write_json('s2.json', {"カテゴリ": {"記号": {"単語リスト": [
+            {"読み": "い", "単語": "B1"}, {"読み": "か", "単語": "○", "説明": "B"},
+            {"読み": "か", "単語": "B2"}, {"読み": "ん", "単語": "B3"}]}}})
+        for stream in (False, True):
+            converter = DictionaryConverter([first, second], stream=stream, merge='sorted')
+            self.assertEqual([(w['読み'], w['単語'], w.get('説明')) for w in converter._iter_words()], [
+                ('あ', 'A1', None), ('い', 'B1', None), ('か', '○', 'A'), ('か', 'B2', None),
+                ('さ', 'A3', None), ('ん', 'B3', None)])
+
+        unsorted = self.write_json('s3.json', {"カテゴリ": {"記号": {"単語リスト": [
+            {"読み": "ん", "単語": "C1"}, {"読み": "あ", "単語": "C2"}]}}})
+        converter = DictionaryConverter([first, unsorted], stream=True, merge='sorted')
+        with self.assertRaises(Exception):
+            list(converter._iter_words())
+
+    def test_expand_inputs(self):
+        """globパターンを名前順のパスに展開し、一致しないパスはそのまま残すか"""
+        for name in ('b.json', 'a.json', 'c.txt'):
+            self.write_json(name, {})
+        missing = self.temp_dir / 'missing.json'
+        paths = convert.expand_inputs([str(self.temp_dir / '*.json'), self.temp_dir / 'a.json', missing])
+        self.assertEqual(paths, [self.temp_dir / 'a.json', self.temp_dir / 'b.json', missing])
+
+
+class TestImporters(TempDirTestCase):
+    """他の形式から辞書JSONへの取り込みのテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.converter = DictionaryConverter(self.test_data_path)
+
+    def load(self, json_file):
+        import json
+        with open(json_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_round_trip(self):
+        """取り込んだ辞書を同じ形式で出力し直すと元のファイルと同じになるか"""
+        for name in ('csv', 'windows', 'macos_plist'):
+            exported = self.temp_dir / f'exported_{name}'
+            self.converter.convert([(name, exported)])
+            imported = self.temp_dir / f'imported_{name}.json'
+            convert.import_dictionary(name, [exported], imported)
+            reexported = self.temp_dir / f'reexported_{name}'
+            DictionaryConverter(imported).convert([(name, reexported)])
+            self.assertEqual(reexported.read_bytes(), exported.read_bytes(), name)
+
+    def test_csv_restores_fields(self):
+        """CSVから読み_Windows・タグ・カテゴリを含めて復元できるか"""
+        exported = self.temp_dir / 'exported.csv'
+        self.converter.to_csv(exported)
+        imported = self.temp_dir / 'imported.json'
+        count = convert.import_dictionary('csv', [exported], imported)
+
+        data = self.load(imported)
+        expected = {}
+        for word in self.converter._iter_words():
+            entry = {key: value for key, value in word.entry.items() if value not in ('', [])}
+            entry.setdefault('品詞', '名詞')
+            expected.setdefault(word.category, []).append(entry)
+        self.assertEqual(count, sum(len(words) for words in expected.values()))
+        self.assertEqual({name: cat['単語リスト'] for name, cat in data['カテゴリ'].items()}, expected)
+
+    def test_windows_vendor_file(self):
+        """BOMのないUTF-16LE・見出し行・タブを含むコメントを取り込めるか"""
+        source = self.temp_dir / 'vendor.txt'
+        source.write_bytes(('!Microsoft IME Dictionary Tool\r\n!Format=WORDLIST\r\n\r\n'
+                            'かお\t(^^)\t顔文字\tにこ\tにこ\r\nたなか\t田中\t人名\r\n').encode('utf-16-le'))
+        imported = self.temp_dir / 'vendor.json'
+        convert.import_dictionary('windows', [source], imported, category='取り込み')
+        self.assertEqual(self.load(imported)['カテゴリ'], {'取り込み': {'説明': '', '有効': True, '単語リスト': [
+            {'読み': 'かお', '単語': '(^^)', '品詞': '顔文字', '説明': 'にこ\tにこ'},
+            {'読み': 'たなか', '単語': '田中', '品詞': '人名'},
+        ]}})
+
+    def test_plist_values(self):
+        """plistのエスケープされた文字や空の文字列を取り込めるか"""
+        source = self.temp_dir / 'user.plist'
+        source.write_text(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<plist version="1.0"><array>'
+            '<dict><key>phrase</key><string>&lt;a&gt; &amp; b</string><key>shortcut</key><string>えー</string></dict>'
+            '<dict><key>phrase</key><string/><key>shortcut</key><string>から</string></dict>'
+            '</array></plist>', encoding='utf-8')
+        imported = self.temp_dir / 'user.json'
+        self.assertEqual(convert.import_dictionary('macos_plist', [source], imported), 2)
+        self.assertEqual(self.load(imported)['カテゴリ']['user']['単語リスト'],
+                         [{'読み': 'えー', '単語': '<a> & b'}, {'読み': 'から', '単語': ''}])
+
+    def test_invalid_csv_header(self):
+        """CsvFormat の見出しがないCSVはエラーになるか"""
+        source = self.temp_dir / 'other.csv'
+        source.write_text('a,b\n1,2\n', encoding='utf-8')
+        with self.assertRaises(Exception):
+            convert.import_dictionary('csv', [source], self.temp_dir / 'other.json')
+        self.assertFalse((self.temp_dir / 'other.json').exists())
+
+
+class TestManifest(TempDirTestCase):
+    """統計情報・カテゴリ一覧のマニフェストのテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.json_file = self.copy_test_data()
+
+    def capture(self, func, *args):
+        import io
+        from contextlib import redirect_stdout
+        output = io.StringIO()
+        with redirect_stdout(output):
+            func(*args)
+        return output.getvalue()
+
+    def run_main(self, *args):
+        from unittest import mock
+        with mock.patch.object(sys, 'argv', ['convert.py', str(self.json_file), *args]):
+            return self.capture(convert.main)
+
+    def test_saved_on_load(self):
+        """辞書の読み込み時にマニフェストが保存され、統計情報と同じ内容を表示できるか"""
+        converter = DictionaryConverter(self.json_file)
+        stats = self.capture(converter.show_stats)
+        categories = self.capture(converter.list_categories)
+
+        manifest = convert.DictionaryManifest.open_if_fresh(self.json_file)
+        self.assertIsNotNone(manifest)
+        self.assertEqual(self.capture(convert.print_stats, manifest.dictionary_info, manifest.rows()), stats)
+        self.assertEqual(self.capture(convert.print_categories, manifest.rows()), categories)
+        self.assertTrue(all(len(category['hash']) == 64 for category in manifest.categories))
+
+    def test_saved_after_stream_convert(self):
+        """ストリームモードでは辞書を最後まで走査した変換の後に保存されるか"""
+        manifest_file = convert.DictionaryManifest.path_for(self.json_file)
+        converter = DictionaryConverter(self.json_file, stream=True)
+        self.assertFalse(manifest_file.exists())
+        # 途中でやめた走査では保存しない
+        next(iter(converter._iter_words()))
+        self.assertFalse(manifest_file.exists())
+
+        self.capture(converter.convert, [('csv', self.temp_dir / 'output.csv')], ['記号'])
+        manifest = convert.DictionaryManifest.open_if_fresh(self.json_file)
+        self.assertIsNotNone(manifest)
+        loaded = DictionaryConverter(self.json_file, stream=True).summarize()
+        self.assertEqual(manifest.rows(), loaded.rows())
+
+    def test_saved_on_compile(self):
+        """スナップショットの作成時に、JSONの読み込み時と同じマニフェストが保存されるか"""
+        convert.DictionarySnapshot.compile(self.json_file)
+        compiled = convert.DictionaryManifest.open_if_fresh(self.json_file)
+        self.assertIsNotNone(compiled)
+        convert.DictionaryManifest.path_for(self.json_file).unlink()
+        DictionaryConverter(self.json_file, snapshot=False)
+        self.assertEqual(compiled.categories, convert.DictionaryManifest.open_if_fresh(self.json_file).categories)
+
+    def test_cli_uses_fresh_manifest(self):
+        """最新のマニフェストがあれば辞書を読み込まずに表示するか"""
+        from unittest import mock
+        stats = self.run_main('--stats')
+        categories = self.run_main('--list-categories')
+        with mock.patch.object(convert, 'DictionaryConverter', side_effect=AssertionError('辞書を読み込んだ')):
+            self.assertEqual(self.run_main('--stats'), stats)
+            self.assertEqual(self.run_main('--list-categories'), categories)
+
+    def test_stale_after_update(self):
+        """JSONを更新するとマニフェストが使われず、作り直されるか"""
+        import json
+        DictionaryConverter(self.json_file).save_manifest()
+        before = convert.DictionaryManifest.open_if_fresh(self.json_file)
+
+        with open(self.json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        name = next(iter(data['カテゴリ']))
+        data['カテゴリ'][name]['単語リスト'][0]['単語'] += '追加'
+        self.write_json(self.json_file, data)
+        self.assertIsNone(convert.DictionaryManifest.open_if_fresh(self.json_file))
+
+        DictionaryConverter(self.json_file, stream=True).save_manifest()
+        after = convert.DictionaryManifest.open_if_fresh(self.json_file)
+        self.assertEqual(after.rows(), before.rows())
+        changed = [a['name'] for a, b in zip(after.categories, before.categories) if a['hash'] != b['hash']]
+        self.assertEqual(changed, [name])
+
+
+class TestDelta(TempDirTestCase):
+    """以前の版との差分出力のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.data = self.load_test_data()
+        self.old_file = self.write_json('old.json', self.data)
+
+        # 追加・変更（説明の変更とカテゴリの移動）・削除を含む新しい版
+        categories = self.data['カテゴリ']
+        categories['記号']['単語リスト'].append({'読み': 'ひだりや', '単語': '←', '品詞': '記号'})
+        categories['記号']['単語リスト'][0]['説明'] = '右向きの矢印'
+        tanaka = categories['人名']['単語リスト'].pop()
+        categories['定型文']['単語リスト'].append(tanaka)
+        del categories['定型文']['単語リスト'][0]
+        self.new_file = self.write_json('new.json', self.data)
+
+    def test_diff(self):
+        """追加・変更・削除の単語を求められるか（一括読み込み・ストリームで同じ結果）"""
+        for stream in (False, True):
+            old = DictionaryConverter(self.old_file, stream=stream)
+            delta = DictionaryConverter(self.new_file, stream=stream).diff(old)
+            words = {kind: [(view['単語'], view.category) for view in views] for kind, views in delta.items()}
+            self.assertEqual(words, {
+                'added': [('←', '記号')],
+                'changed': [('→', '記号'), ('田中', '定型文')],
+                'removed': [('メモを確認する', '定型文')],
+            })
+
+    def test_unchanged_key_order(self):
+        """キーの順が違うだけの単語は変更として扱わないか"""
+        old = DictionaryConverter(self.old_file)
+        for cat in self.data['カテゴリ'].values():
+            cat['単語リスト'] = [dict(reversed(list(word.items()))) for word in cat['単語リスト']]
+        self.write_json(self.new_file, self.data)
+        delta = DictionaryConverter(self.new_file, compact=False).diff(old)
+        self.assertEqual([view['単語'] for view in delta['changed']], ['→', '田中'])
+
+    def test_export_delta(self):
+        """差分を各形式で出力し、該当のない種類の古いファイルを削除するか"""
+        targets = [('csv', self.temp_dir / 'delta.csv'), ('windows', self.temp_dir / 'delta_windows.txt')]
+        stale = self.temp_dir / 'delta.removed.csv'
+        stale.write_text('古い差分', encoding='utf-8')
+
+        old = DictionaryConverter(self.old_file)
+        new = DictionaryConverter(self.new_file)
+        new.export_delta(old, targets, categories=['記号'])
+
+        with open(self.temp_dir / 'delta.added.csv', 'r', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual([row[2] for row in rows[1:]], ['←'])
+        self.assertTrue((self.temp_dir / 'delta_windows.changed.txt').exists())
+        self.assertFalse(stale.exists())
+
+        # 差分の単語を全体の出力と同じ形式で出力しているか
+        full = self.temp_dir / 'full.csv'
+        new.convert([('csv', full)], categories=['記号'])
+        with open(full, 'r', encoding='utf-8-sig') as f:
+            full_rows = list(csv.reader(f))
+        self.assertIn(rows[1], full_rows)
+
+
+class TestShardedOutput(TempDirTestCase):
+    """単語数の上限ごとに分けた出力のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.converter = DictionaryConverter(self.test_data_path)
+        self.generated_at = convert.datetime(2025, 1, 1)
+
+    def load_manifest(self, output_file):
+        import json
+        with open(str(output_file) + convert.SHARD_MANIFEST_SUFFIX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_shards_match_full_output(self):
+        """分けたファイルの単語を連結すると全体の出力と同じになり、件数とハッシュが正しいか"""
+        import hashlib
+        full = self.temp_dir / 'full.txt'
+        self.converter.convert([('txt', full)], generated_at=self.generated_at)
+        sharded = self.temp_dir / 'sharded.txt'
+        self.converter.convert([('txt', sharded)], generated_at=self.generated_at, shard_size=2)
+
+        manifest = self.load_manifest(sharded)
+        self.assertEqual(manifest['format'], 'txt')
+        self.assertEqual([shard['count'] for shard in manifest['shards']], [2, 2, 1])
+        entries = []
+        for shard in manifest['shards']:
+            path = self.temp_dir / shard['file']
+            self.assertEqual(hashlib.sha256(path.read_bytes()).hexdigest(), shard['sha256'])
+            lines = path.read_text(encoding='utf-8').splitlines()
+            self.assertIn(f"# 単語数: {shard['count']}件", lines)
+            entries += [line for line in lines if line and not line.startswith('#')]
+        full_lines = full.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(entries, [line for line in full_lines if line and not line.startswith('#')])
+
+    def test_all_formats_are_complete(self):
+        """plistなど全形式で、分けたファイルがそれぞれ正しい形式になるか"""
+        targets = [(name, self.temp_dir / f'out_{name}.txt') for name in ('csv', 'windows', 'macos_plist')]
+        self.converter.convert(targets, shard_size=3, jobs=2)
+        plist = self.load_manifest(targets[2][1])['shards']
+        for shard in plist:
+            root = ET.parse(self.temp_dir / shard['file']).getroot()
+            self.assertEqual(len(root.find('array')), shard['count'])
+        windows = self.load_manifest(targets[1][1])['shards']
+        self.assertTrue((self.temp_dir / windows[-1]['file']).read_bytes().startswith(b'\xff\xfe'))
+
+    def test_stale_shards_removed(self):
+        """前回より分割数が減ると、不要になったファイルを削除するか"""
+        output_file = self.temp_dir / 'out.csv'
+        self.converter.convert([('csv', output_file)], shard_size=1)
+        self.assertTrue(convert.shard_path(output_file, 5).exists())
+        self.converter.convert([('csv', output_file)], shard_size=4)
+        self.assertEqual([shard['file'] for shard in self.load_manifest(output_file)['shards']],
+                         ['out.001.csv', 'out.002.csv'])
+        self.assertFalse(convert.shard_path(output_file, 3).exists())
+
+
+class TestExternalSort(TempDirTestCase):
+    """外部マージソートによる並べ替えのテスト"""
+
+    def setUp(self):
+        super().setUp()
+        self.converter = DictionaryConverter(self.test_data_path)
+
+    def test_stable_merge_of_runs(self):
+        """一時ファイルに分けて併合しても、メモリ上の安定ソートと同じ順になるか"""
+        import random
+        rng = random.Random(0)
+        words = [convert.WordView({'読み': rng.choice('あいう'), '単語': str(i % 3), '説明': str(i)}, 'c')
+                 for i in range(50)]
+        expected = sorted(words, key=lambda view: (view['読み'], view['単語']))
+
+        sorter = convert.ExternalSorter('reading', run_size=7)
+        result = list(sorter.sort(words))
+        self.assertEqual(sorter.runs, 8)
+        self.assertEqual([view['説明'] for view in result], [view['説明'] for view in expected])
+        self.assertEqual(result[0].category, 'c')
+
+        in_memory = convert.ExternalSorter('reading')
+        self.assertEqual([view['説明'] for view in in_memory.sort(words)], [view['説明'] for view in expected])
+        self.assertEqual(in_memory.runs, 0)
+
+    def test_sorted_output(self):
+        """convert() の sort で各形式の単語が指定の順に並ぶか"""
+        output_file = self.temp_dir / 'sorted.csv'
+        self.converter.convert([('csv', output_file)], sort='word')
+        with open(output_file, 'r', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))[1:]
+        self.assertEqual([row[2] for row in rows], sorted(row[2] for row in rows))
+
+    def test_sorted_txt_output(self):
+        """TXT・macOSテキストでもカテゴリごとにまとめ直さず、並べ替えた順のまま出力されるか"""
+        for name in ('txt', 'macos_txt'):
+            output_file = self.temp_dir / f'sorted_{name}.txt'
+            self.converter.convert([(name, output_file)], sort='reading')
+            with open(output_file, 'r', encoding='utf-8') as f:
+                lines = [line for line in f.read().splitlines() if line and not line.startswith('#')]
+            readings = [line.split('\t')[0] for line in lines]
+            self.assertEqual(len(readings), 5)
+            self.assertEqual(readings, sorted(readings))
+
+    def test_invalid_order(self):
+        """未知の並べ替えの種類はエラーになるか"""
+        with self.assertRaises(ValueError):
+            convert.ExternalSorter('length')
+
+
+class TestConversionServer(TempDirTestCase):
+    """変換サービス（server.py）のテスト"""
+
+    def setUp(self):
+        import server
+        super().setUp()
+        self.json_file = self.copy_test_data()
+        self.server = server.ConversionServer(self.json_file, cache_dir=self.temp_dir / 'cache')
+
+    def tearDown(self):
+        self.server.close()
+        super().tearDown()
+
+    def run_requests(self, *requests):
+        """要求 (メソッド, パス, ヘッダー, 本文) を同時に送信し、(ステータス, ヘッダー, 本文) のリストを返す"""
+        import asyncio
+
+        async def fetch(port, method, path, headers=None, body=b''):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            lines = [f"{method} {path} HTTP/1.1", "Host: localhost", "Connection: close",
+                     f"Content-Length: {len(body)}"]
+            lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + body)
+            response = await reader.read()
+            writer.close()
+            head, _, content = response.partition(b'\r\n\r\n')
+            status_line, *header_lines = head.decode('utf-8').split('\r\n')
+            response_headers = dict(line.split(': ', 1) for line in header_lines)
+            return int(status_line.split()[1]), response_headers, content
+
+        async def scenario():
+            listener = await self.server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                return await asyncio.gather(*(fetch(port, *request) for request in requests))
+
+        return asyncio.run(scenario())
+
+    def test_convert_and_not_modified(self):
+        """変換結果が変換ツールの出力と同じで、ETag が一致すれば 304 を返すか"""
+        expected = self.temp_dir / 'expected.csv'
+        DictionaryConverter(self.json_file).convert([('csv', expected)], ['記号'])
+        path = '/api/convert/csv?category=%E8%A8%98%E5%8F%B7'
+        [(status, headers, content)] = self.run_requests(('GET', path))
+        self.assertEqual(status, 200)
+        self.assertEqual(content, expected.read_bytes())
+
+        [(status, _headers, content)] = self.run_requests(('GET', path, {'If-None-Match': headers['ETag']}))
+        self.assertEqual((status, content), (304, b''))
+
+        # 辞書を更新すると ETag が変わる
+        self.json_file.write_text(self.json_file.read_text(encoding='utf-8').replace('右矢印', '右'),
+                                  encoding='utf-8')
+        [(status, changed, _content)] = self.run_requests(('GET', path, {'If-None-Match': headers['ETag']}))
+        self.assertEqual(status, 200)
+        self.assertNotEqual(changed['ETag'], headers['ETag'])
+
+    def test_concurrent_requests_convert_once(self):
+        """同じ変換を同時に要求しても変換は1回だけで、変換の結果を標準出力に表示しないか"""
+        import io
+        from contextlib import redirect_stdout
+        output = io.StringIO()
+        with redirect_stdout(output):
+            responses = self.run_requests(*[('GET', '/api/convert/windows')] * 10)
+        self.assertEqual(output.getvalue(), '')
+        self.assertEqual({status for status, _headers, _content in responses}, {200})
+        self.assertEqual(len({content for _status, _headers, content in responses}), 1)
+        self.assertEqual(self.server.cache.misses, 1)
+        self.assertEqual(self.server.cache.hits, 9)
+
+    def test_posted_dictionary(self):
+        """送信された辞書JSONを変換し、不正な要求にはエラーを返すか"""
+        import json
+        data = json.loads(self.json_file.read_text(encoding='utf-8'))
+        data['カテゴリ']['人名']['単語リスト'][0]['単語'] = '田仲'
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        (status, _headers, content), (invalid, _, _), (unknown, _, _) = self.run_requests(
+            ('POST', '/api/convert/txt?category=%E4%BA%BA%E5%90%8D', None, body),
+            ('POST', '/api/convert/txt', None, b'{'),
+            ('GET', '/api/convert/unknown'),
+        )
+        self.assertEqual(status, 200)
+        self.assertIn('田仲'.encode('utf-8'), content)
+        self.assertEqual((invalid, unknown), (400, 404))
+        # 送信された辞書のマニフェストは作らない
+        self.assertEqual(list((self.temp_dir / 'cache').glob('*.manifest')), [])
+
+    def test_invalid_content_length(self):
+        """Content-Length が数値でないか負の場合に 400 を返すか"""
+        responses = self.run_requests(('POST', '/api/journal', {'Content-Length': 'abc'}),
+                                      ('POST', '/api/journal', {'Content-Length': '-1'}))
+        self.assertEqual([status for status, _headers, _content in responses], [400, 400])
+
+    def test_reload_closes_previous_converter(self):
+        """辞書を読み込み直すと、前の DictionaryConverter を使い終わってから閉じるか"""
+        import asyncio
+        from unittest import mock
+
+        async def scenario(close):
+            source = self.server.source
+            async with source.hold() as (_version, first):
+                self.json_file.write_text(self.json_file.read_text(encoding='utf-8').replace('右矢印', '右'),
+                                          encoding='utf-8')
+                _version, second = await source.current()
+                self.assertIsNot(second, first)
+                close.assert_not_called()
+            close.assert_called_once_with(first)
+
+        with mock.patch.object(DictionaryConverter, 'close', autospec=True) as close:
+            asyncio.run(scenario(close))
+
+    def test_pinned_entries_not_evicted(self):
+        """送信中の変換結果はキャッシュの最大数を超えても削除されず、使い終わってから削除されるか"""
+        import asyncio
+        import server
+
+        def render(output_file):
+            output_file.write_text('変換結果', encoding='utf-8')
+
+        async def scenario():
+            cache = server.ConversionCache(self.temp_dir / 'pinned', self.server._executor, max_entries=1)
+            async with cache.use('a', render) as path:
+                await cache.get('b', render)
+                await cache.get('c', render)
+                self.assertTrue(path.exists())
+            self.assertFalse(path.exists())
+            self.assertEqual(list(cache._entries), ['c'])
+
+        asyncio.run(scenario())
+
+    def test_journal(self):
+        """変更をジャーナルに追記し、再生した辞書を返し、古い版からの追記は 409 になるか"""
+        import json
+        [(status, headers, content)] = self.run_requests(('GET', '/data/dictionary.json'))
+        self.assertEqual(status, 200)
+        self.assertEqual(content, self.json_file.read_bytes())
+        version = headers['ETag'].strip('"')
+        self.assertEqual(headers['X-Dictionary-Version'], version)
+
+        change = {'op': 'add_word', 'category': '人名', 'word': {'読み': 'さとう', '単語': '佐藤', '品詞': '人名'}}
+        body = json.dumps({'version': version, 'operations': [change]}, ensure_ascii=False).encode('utf-8')
+        [(status, _headers, content)] = self.run_requests(('POST', '/api/journal', None, body))
+        self.assertEqual(status, 200)
+        new_version = json.loads(content)['version']
+        self.assertNotEqual(new_version, version)
+
+        (stale, _, _), (invalid, _, _), (status, headers, content) = self.run_requests(
+            ('POST', '/api/journal', None, body),
+            ('POST', '/api/journal', None, b'{"version": "x", "operations": [{"op": "rename"}]}'),
+            ('GET', '/data/dictionary.json'),
+        )
+        self.assertEqual((stale, invalid, status), (409, 400, 200))
+        self.assertEqual(headers['ETag'], f'"{new_version}"')
+        self.assertEqual(headers['X-Dictionary-Version'], new_version)
+        self.assertEqual(json.loads(content)['カテゴリ']['人名']['単語リスト'][-1]['単語'], '佐藤')
+
+
+class TestChangeJournal(TempDirTestCase):
+    """変更ジャーナル（ChangeJournal）のテスト"""
+
+    OPERATIONS = [
+        {'op': 'add_word', 'category': '記号', 'word': {'読み': 'ひだりや', '単語': '←', '品詞': '記号'}},
+        {'op': 'edit_word', 'category': '人名', 'index': 0, 'word': {'読み': 'たなか', '単語': '田仲', '品詞': '人名'}},
+        {'op': 'delete_word', 'category': '定型文', 'index': 0},
+        {'op': 'add_category', 'category': '新規', 'info': {'説明': '追加したカテゴリ'}},
+        {'op': 'add_word', 'category': '新規', 'word': {'読み': 'あたらしい', '単語': '新しい', '品詞': '名詞'}},
+        {'op': 'edit_category', 'category': '無効カテゴリ', 'info': {'有効': True}},
+        {'op': 'set_info', 'info': {'更新日': '2025-06-01'}},
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.json_file = self.copy_test_data()
+
+        # ジャーナルと同じ変更を直接加えた辞書
+        data = self.load_test_data()
+        categories = data['カテゴリ']
+        categories['記号']['単語リスト'].append(self.OPERATIONS[0]['word'])
+        categories['人名']['単語リスト'][0] = self.OPERATIONS[1]['word']
+        del categories['定型文']['単語リスト'][0]
+        categories['無効カテゴリ']['有効'] = True
+        categories['新規'] = {'説明': '追加したカテゴリ', '有効': True, '単語リスト': [self.OPERATIONS[4]['word']]}
+        data['辞書情報']['更新日'] = '2025-06-01'
+        self.expected = data
+        self.expected_file = self.write_json('expected.json', data)
+
+    def csv_output(self, json_file, **options):
+        output_file = self.temp_dir / 'output.csv'
+        DictionaryConverter(json_file, **options).convert([('csv', output_file)])
+        return output_file.read_bytes()
+
+    def test_replay(self):
+        """ジャーナルを再生した辞書が変更を直接加えた辞書と同じか（一括読み込み・ストリーム）"""
+        journal = convert.ChangeJournal(self.json_file)
+        version = journal.append(self.OPERATIONS)
+        self.assertTrue(version.endswith(f'-{len(self.OPERATIONS)}'))
+        expected = self.csv_output(self.expected_file)
+        for stream in (False, True):
+            self.assertEqual(self.csv_output(self.json_file, stream=stream), expected)
+        converter = DictionaryConverter(self.json_file)
+        self.assertEqual(list(converter.data['カテゴリ']), list(self.expected['カテゴリ']))
+        self.assertEqual(converter.data['辞書情報']['更新日'], '2025-06-01')
+        # journal=False では元の辞書のまま
+        self.assertNotEqual(self.csv_output(self.json_file, journal=False), expected)
+
+    def test_compact(self):
+        """反映後の辞書JSONが再生した辞書と同じで、版が変わらないか"""
+        import json
+        journal = convert.ChangeJournal(self.json_file)
+        journal.append(self.OPERATIONS[:3])
+        version = journal.append(self.OPERATIONS[3:])
+        self.assertEqual(journal.compact(), len(self.OPERATIONS))
+        self.assertEqual(json.loads(self.json_file.read_text(encoding='utf-8')), self.expected)
+        self.assertFalse(journal.has_operations())
+        self.assertEqual(journal.version(), version)
+        self.assertEqual(journal.compact(), 0)
+
+        # 反映後の追記も続きの版になる
+        journal.append([{'op': 'delete_category', 'category': '新規'}])
+        self.assertTrue(journal.version().endswith(f'-{len(self.OPERATIONS) + 1}'))
+        self.assertNotIn('新規', DictionaryConverter(self.json_file).data['カテゴリ'])
+
+    def test_compact_in_background(self):
+        """ジャーナルが大きくなると別スレッドで反映されるか"""
+        journal = convert.ChangeJournal(self.json_file, compact_size=0)
+        journal.append(self.OPERATIONS)
+        journal.compact_in_background().join()
+        self.assertFalse(journal.has_operations())
+        self.assertEqual(self.csv_output(self.json_file), self.csv_output(self.expected_file))
+
+    def test_invalid_operations(self):
+        """不正な変更を追記できず、適用できない変更は読み込み時にエラーになるか"""
+        journal = convert.ChangeJournal(self.json_file)
+        for operation in [{'op': 'rename'}, {'op': 'add_word', 'category': '記号'},
+                          {'op': 'delete_word', 'category': '記号', 'index': '0'}]:
+            with self.assertRaises(ValueError):
+                journal.append([operation])
+        self.assertFalse(journal.path.exists())
+
+        journal.append([{'op': 'delete_word', 'category': '人名', 'index': 5}])
+        for stream in (False, True):
+            with self.assertRaisesRegex(Exception, '1件目'):
+                DictionaryConverter(self.json_file, stream=stream).convert([('csv', self.temp_dir / 'out.csv')])
+
+    def test_append_after_torn_write(self):
+        """書き込み途中で終わった行の後に追記しても、ジャーナルを読み込めるか"""
+        journal = convert.ChangeJournal(self.json_file)
+        journal.append(self.OPERATIONS[:1])
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "delete_word", "categ')
+        version = journal.append(self.OPERATIONS[1:])
+        self.assertTrue(version.endswith(f'-{len(self.OPERATIONS)}'))
+        self.assertEqual(journal.operations(), self.OPERATIONS)
+        for stream in (False, True):
+            self.assertEqual(self.csv_output(self.json_file, stream=stream), self.csv_output(self.expected_file))
+
+    def test_shared_lock(self):
+        """同じジャーナルの ChangeJournal は同じロックで追記と反映を排他するか"""
+        first, second = convert.ChangeJournal(self.json_file), convert.ChangeJournal(str(self.json_file))
+        self.assertIs(first._lock, second._lock)
+        self.assertIs(first._compact_lock, second._compact_lock)
+
+    def test_changed_dictionary(self):
+        """ジャーナルの作成後に辞書JSONが書き換えられたらエラーになるか"""
+        journal = convert.ChangeJournal(self.json_file)
+        journal.append(self.OPERATIONS[:1])
+        self.json_file.write_text(self.json_file.read_text(encoding='utf-8') + ' ', encoding='utf-8')
+        with self.assertRaisesRegex(Exception, 'ジャーナルの作成後'):
+            DictionaryConverter(self.json_file)
+
+    def test_interrupted_writes(self):
+        """書き込み途中の行は無視し、反映の途中で中断されていれば続きから読み込むか"""
+        journal = convert.ChangeJournal(self.json_file)
+        journal.append(self.OPERATIONS[:1])
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "delete_word", "categ')
+        self.assertEqual(journal.operations(), self.OPERATIONS[:1])
+
+        # 辞書JSONを置き換えた後、ジャーナルを置き換える前に中断した状態
+        journal.path.write_text(journal.path.read_text(encoding='utf-8').rsplit('\n', 1)[0] + '\n',
+                                encoding='utf-8')
+        journal.append(self.OPERATIONS[1:])
+        before = journal.path.read_bytes()
+        version = journal.version()
+        journal.compact()
+        pending = journal.path.with_name(journal.path.name + '.tmp')
+        pending.write_bytes(journal.path.read_bytes())
+        journal.path.write_bytes(before)
+        self.assertEqual(journal.version(), version)
+        self.assertFalse(pending.exists())
+        self.assertEqual(self.csv_output(self.json_file), self.csv_output(self.expected_file))
+
+
+class TestWindowsReadings(TempDirTestCase):
+    """Windows用の読みの生成（WindowsReadingGenerator）のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        data = {
+            '辞書情報': {'名前': 'テスト', '説明': '', '更新日': '2025-01-01'},
+            'カテゴリ': {
+                'ローマ字': {'説明': '', '有効': True, '単語リスト': [
+                    {'読み': 'kitte', '単語': '切手', '品詞': '名詞'},
+                    {'読み': 'kinyou', '単語': '金曜', '品詞': '名詞'},
+                    {'読み': 'ﾒﾓ', '読み_Windows': '', '単語': 'メモ', '品詞': '名詞', '説明': '半角カタカナ'},
+                    {'読み': 'mem', '読み_Windows': 'めも', '単語': 'メモを確認する', '品詞': '名詞'},
+                    {'読み': 'ほし', '単語': '星', '品詞': '名詞'},
+                    {'読み': 'ほ１', '単語': '★', '品詞': '記号'},
+                    {'読み': 'ちぇ0', '単語': '✔️', '品詞': '記号'},
+                ]},
+                '無効': {'説明': '', '有効': False, '単語リスト': [
+                    {'読み': 'matcha', '単語': '抹茶', '品詞': '名詞'},
+                ]},
+            },
+        }
+        self.json_file = self.write_json('dictionary.json', data)
+
+    def test_generate(self):
+        """ローマ字・全角英字・カタカナの読みをひらがなにできるか"""
+        generator = convert.WindowsReadingGenerator()
+        cases = {
+            'memo': 'めも', 'kyakka': 'きゃっか', 'matcha': 'まっちゃ', 'shimbun': 'しんぶん',
+            'kanji': 'かんじ', "kan'i": 'かんい', 'konnnichiha': 'こんにちは', 'fairu': 'ふぁいる',
+            'Ｍｅｍｏ': 'めも', 'メモ': 'めも', 'ﾊﾟｿｺﾝ': 'ぱそこん', 'memo-': 'めもー', 'めmo': 'めも',
+            # 全角数字は半角にし、数字はそのまま残す
+            'ほ１': 'ほ1', 'やじ０': 'やじ0', 'ちぇ0': 'ちぇ0', 'aku0': 'あく0',
+        }
+        for reading, expected in cases.items():
+            self.assertEqual(generator.generate(reading), (expected, None), reading)
+        # 同じ読みは一度だけ変換する
+        self.assertIs(generator.generate('kyakka'), generator.generate('kyakka'))
+        # 半角数字を含むひらがなの読みはそのまま使える
+        self.assertFalse(convert.WindowsReadingGenerator.needs_reading({'読み': 'め0'}))
+        self.assertTrue(convert.WindowsReadingGenerator.needs_reading({'読み': 'め０'}))
+
+    def test_ambiguous_and_unconvertible(self):
+        """曖昧な読みは理由付きで、変換できない読みは None で返すか"""
+        generator = convert.WindowsReadingGenerator()
+        for reading, expected in [('kinyou', 'きにょう'), ('konnichiha', 'こんにちは'), ('AI', 'あい')]:
+            kana, note = generator.generate(reading)
+            self.assertEqual(kana, expected)
+            self.assertIsNotNone(note)
+        for reading in ['mem', '2ch', 'hello world']:
+            kana, note = generator.generate(reading)
+            self.assertIsNone(kana)
+            self.assertIn('かなにできない', note)
+
+    def test_report(self):
+        """対象の単語（読み_Windows がなく読みがひらがな・半角数字だけでない）を集計できるか"""
+        for stream in (False, True):
+            result = DictionaryConverter(self.json_file, stream=stream).generate_windows_readings()
+            self.assertEqual((result['targets'], result['generated']), (4, 3))
+            self.assertEqual([(word['単語'], kana) for word, kana, _note in result['ambiguous']], [('金曜', 'きにょう')])
+            self.assertEqual(result['unconvertible'], [])
+
+    def test_fill(self):
+        """曖昧でない読みだけを読みの直後に書き込めるか（一括読み込み・ストリームで同じ結果）"""
+        import json
+        outputs = []
+        for stream in (False, True):
+            output_file = self.temp_dir / f'filled_{stream}.json'
+            count = DictionaryConverter(self.json_file, stream=stream).fill_windows_readings(output_file)
+            self.assertEqual(count, 3)
+            outputs.append(output_file.read_bytes())
+        self.assertEqual(outputs[0], outputs[1])
+
+        data = json.loads(outputs[0])
+        words = data['カテゴリ']['ローマ字']['単語リスト']
+        self.assertEqual(list(words[0]), ['読み', '読み_Windows', '単語', '品詞'])
+        self.assertEqual([word.get('読み_Windows') for word in words], ['きって', None, 'めも', 'めも', None, 'ほ1', None])
+        self.assertEqual(words[2]['説明'], '半角カタカナ')
+        # 無効なカテゴリは変換しないため書き込まない
+        self.assertNotIn('読み_Windows', data['カテゴリ']['無効']['単語リスト'][0])
+
+    def test_fill_keeps_journal_version(self):
+        """辞書JSONに書き戻すと変更履歴も反映され、辞書の版は変わらないか"""
+        import json
+        journal = convert.ChangeJournal(self.json_file)
+        version = journal.append([{'op': 'add_word', 'category': 'ローマ字',
+                                   'word': {'読み': 'techou', '単語': '手帳', '品詞': '名詞'}}])
+        count = DictionaryConverter(self.json_file, stream=True).fill_windows_readings(self.json_file)
+        self.assertEqual(count, 4)
+        self.assertEqual(journal.version(), version)
+        self.assertEqual(journal.operations(), [])
+
+        data = json.loads(self.json_file.read_text(encoding='utf-8'))
+        self.assertEqual(data['カテゴリ']['ローマ字']['単語リスト'][-1]['読み_Windows'], 'てちょう')
+        # 続けて編集できる（版の番号が続く）
+        new_version = journal.append([{'op': 'delete_word', 'category': 'ローマ字', 'index': 0}])
+        self.assertEqual(new_version, f"{version.rsplit('-', 1)[0]}-{int(version.rsplit('-', 1)[1]) + 1}")
+
+
+class TestWordStream(unittest.TestCase):
+    """単語ストリームのテスト"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.converter = DictionaryConverter(TEST_DATA_PATH)
+
+    def test_views_reference_original_entries(self):
+        """単語をコピーせず元のエントリを参照しているか"""
+        words = self.converter._get_all_words(categories=['記号'])
+        original = self.converter.data['カテゴリ']['記号']['単語リスト']
+        self.assertIs(words[0].entry, original[0])
+        self.assertEqual(words[0]['カテゴリ'], '記号')
+        self.assertEqual(words[0].to_dict(), {**original[0], 'カテゴリ': '記号'})
+        self.assertNotIn('カテゴリ', original[0])
+
+    def test_counts_collected_while_iterating(self):
+        """走査と同時に件数が集計されるか"""
+        words = self.converter._iter_words()
+        self.assertEqual(sum(1 for _ in words), 5)
+        self.assertEqual(words.count, 5)
+        self.assertEqual(words.category_counts, {'記号': 2, '人名': 1, '定型文': 2})
+
+
+class TestStreamMode(TempDirTestCase):
+    """ストリーム読み込みモードのテスト"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.converter = DictionaryConverter(cls.test_data_path)
+
+    def _write_json(self, data):
+        return self.write_json('stream.json', data, indent=2)
+
+    def test_stream_words_match_full_load(self):
+        """ストリームモードでも通常読み込みと同じ単語が得られるか"""
+        stream_converter = DictionaryConverter(self.test_data_path, stream=True)
+        self.assertEqual(stream_converter._get_all_words(), self.converter._get_all_words())
+        self.assertEqual(
+            stream_converter._get_all_words(categories=['記号']),
+            self.converter._get_all_words(categories=['記号'])
+        )
+
+    def test_small_chunks(self):
+        """チャンク境界で値が分割されても正しく読み込めるか"""
+        from unittest import mock
+        with mock.patch.object(convert.JSONStreamReader, 'CHUNK_SIZE', 3):
+            stream_converter = DictionaryConverter(self.test_data_path, stream=True)
+            words = stream_converter._get_all_words()
+        self.assertEqual(words, self.converter._get_all_words())
+
+    def test_stream_outputs_match_full_load(self):
+        """ストリームモードの出力が通常モードと同一か"""
+        stream_converter = DictionaryConverter(self.test_data_path, stream=True)
+        for method, name in [('to_csv', 'out.csv'), ('to_windows', 'out_windows.txt'), ('to_macos_plist', 'out.plist')]:
+            expected = Path(self.temp_dir) / f'full_{name}'
+            actual = Path(self.temp_dir) / f'stream_{name}'
+            getattr(self.converter, method)(expected)
+            getattr(stream_converter, method)(actual)
+            self.assertEqual(expected.read_bytes(), actual.read_bytes(), method)
+
+    def test_enabled_flag_after_word_list(self):
+        """有効フラグがなければ有効として1件ずつ読み込み、単語リストより後の false はエラーになるか"""
+        data = {
+            "カテゴリ": {
+                "後置": {
+                    "単語リスト": [{"読み": "あと", "単語": "後"}],
+                    "有効": True,
+                    "説明": "後置"
+                },
+                "通常": {
+                    "単語リスト": [{"読み": "つう", "単語": "通", "品詞": "名詞"}]
+                }
+            },
+            "辞書情報": {"名前": "後置テスト"}
+        }
+        stream_converter = DictionaryConverter(self._write_json(data), stream=True)
+        words = stream_converter._get_all_words()
+        self.assertEqual([w['単語'] for w in words], ['後', '通'])
+        # カテゴリより後ろの辞書情報も読み込まれる
+        self.assertEqual(stream_converter.data['辞書情報']['名前'], '後置テスト')
+
+        data['カテゴリ']['後置']['有効'] = False
+        stream_converter = DictionaryConverter(self._write_json(data), stream=True)
+        with self.assertRaises(Exception) as context:
+            stream_converter._get_all_words()
+        self.assertIn('「有効」が「単語リスト」より後', str(context.exception))
+
+    def test_malformed_value_read_is_bounded(self):
+        """値の構文エラーでは残りのファイルを読み込まずにエラーにするか"""
+        import io
+        text = '[{"読み": oops}, ' + ', '.join(['{"読み": "あ"}'] * 1000) + ']'
+        f = io.StringIO(text)
+        reader = convert.JSONStreamReader(f, chunk_size=64)
+        with self.assertRaises(ValueError):
+            for _ in reader.iter_array():
+                reader.read_value()
+        self.assertLessEqual(f.tell(), 128)
+
+    def test_stream_list_categories(self):
+        """ストリームモードのカテゴリ一覧"""
+        stream_converter = DictionaryConverter(self.test_data_path, stream=True)
+        self.assertEqual(stream_converter.list_categories(), self.converter.list_categories())
+
+    def test_stream_invalid_json(self):
+        """壊れたJSONはストリームモードでもエラーになるか"""
+        path = Path(self.temp_dir) / 'broken.json'
+        path.write_text('{"カテゴリ": {"a": {"単語リスト": [{"読み": "あ",', encoding='utf-8')
+        stream_converter = DictionaryConverter(path, stream=True)
+        with self.assertRaises(Exception) as context:
+            stream_converter._get_all_words()
+        self.assertIn('読み込みに失敗', str(context.exception))
+
+        with self.assertRaises(Exception):
+            DictionaryConverter('/nonexistent/file.json', stream=True)
+
+
 def run_tests():
     """テストを実行"""
     # テストスイートを作成
@@ -432,6 +2188,29 @@ def run_tests():
     # テストクラスを追加
     suite.addTests(loader.loadTestsFromTestCase(TestDictionaryConverter))
     suite.addTests(loader.loadTestsFromTestCase(TestEdgeCases))
+    suite.addTests(loader.loadTestsFromTestCase(TestBuildCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestPlistWriter))
+    suite.addTests(loader.loadTestsFromTestCase(TestReadingLookup))
+    suite.addTests(loader.loadTestsFromTestCase(TestDuplicates))
+    suite.addTests(loader.loadTestsFromTestCase(TestCompactEntry))
+    suite.addTests(loader.loadTestsFromTestCase(TestSchemaValidation))
+    suite.addTests(loader.loadTestsFromTestCase(TestBenchmarkGenerator))
+    suite.addTests(loader.loadTestsFromTestCase(TestProfiling))
+    suite.addTests(loader.loadTestsFromTestCase(TestSnapshot))
+    suite.addTests(loader.loadTestsFromTestCase(TestSQLiteStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestTagIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestWatchMode))
+    suite.addTests(loader.loadTestsFromTestCase(TestMergeInputs))
+    suite.addTests(loader.loadTestsFromTestCase(TestImporters))
+    suite.addTests(loader.loadTestsFromTestCase(TestManifest))
+    suite.addTests(loader.loadTestsFromTestCase(TestDelta))
+    suite.addTests(loader.loadTestsFromTestCase(TestShardedOutput))
+    suite.addTests(loader.loadTestsFromTestCase(TestExternalSort))
+    suite.addTests(loader.loadTestsFromTestCase(TestConversionServer))
+    suite.addTests(loader.loadTestsFromTestCase(TestChangeJournal))
+    suite.addTests(loader.loadTestsFromTestCase(TestWindowsReadings))
+    suite.addTests(loader.loadTestsFromTestCase(TestWordStream))
+    suite.addTests(loader.loadTestsFromTestCase(TestStreamMode))
 
     # テストを実行
     runner = unittest.TextTestRunner(verbosity=2)
@@ -4,278 +4,3557 @@ IME辞書変換ツール
 JSON形式の辞書データを各プラットフォーム用の形式に変換
 """
 
+import glob
+import hashlib
+import heapq
+import io
 import json
-import csv
+import mmap
+import os
+import pickle
+import re
 import sys
+import shutil
+import struct
 import argparse
+import csv
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate, compress, count, repeat
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
+if __name__ == '__main__':
+    # スクリプトとして実行した場合も、journal・store が参照する convert をこのモジュールにする
+    sys.modules.setdefault('convert', sys.modules[__name__])
+
+from journal import JOURNAL_SUFFIX, ChangeJournal
+from store import SQLITE_SUFFIXES, DictionaryStore, StoreWordList
+
+
+class JSONStreamReader:
+    """JSONを少しずつ読み進める逐次トークナイザ
+
+    オブジェクト・配列は iter_object() / iter_array() で1要素ずつ辿り、
+    要素の値は read_value() で読み込む。バッファには未処理の部分しか
+    保持しないため、メモリ使用量は最大の要素1つ分に抑えられる。
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    # 構文エラーの位置がバッファ末尾からこの文字数以内なら、値が途中で切れているものとして続きを読む
+    # （true・数値などの途中。それより前の構文エラーは残りのファイルを読まずにすぐ報告する）
+    TRUNCATION_MARGIN = 16
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, f, chunk_size=None):
+        self._file = f
+        self._chunk_size = chunk_size or self.CHUNK_SIZE
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """次のチャンクをバッファに追加（読み終えた部分は破棄）"""
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """空白を読み飛ばして次の文字を返す（終端なら空文字）"""
+        while True:
+            self._pos = self._WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def peek(self):
+        """次の値の最初の文字を返す（読み進めない。終端なら空文字）"""
+        return self._peek()
+
+    def _expect(self, char):
+        """指定文字を読み進める"""
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"'{char}' が必要ですが '{found}' がありました")
+        self._pos += 1
+
+    def read_value(self):
+        """値を1つ読み込んでPythonオブジェクトとして返す"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                truncated = (e.msg.startswith('Unterminated string')
+                             or len(self._buf) - e.pos <= self.TRUNCATION_MARGIN)
+                if truncated and self._fill():
+                    continue
+                raise
+            # バッファ末尾で終わった数値などは途中で切れている可能性がある
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
 
-class DictionaryConverter:
-    def __init__(self, json_file):
-        """辞書変換器を初期化"""
-        self.json_file = Path(json_file)
-        self.data = self._load_json()
+    def _iter_items(self, open_char, close_char, with_key):
+        self._expect(open_char)
+        if self._peek() == close_char:
+            self._pos += 1
+            return
+        while True:
+            if with_key:
+                key = self.read_value()
+                if not isinstance(key, str):
+                    raise ValueError(f"オブジェクトのキーが文字列ではありません: {key!r}")
+                self._expect(':')
+                yield key
+            else:
+                yield None
+            separator = self._peek()
+            self._pos += 1
+            if separator == close_char:
+                return
+            if separator != ',':
+                raise ValueError(f"',' または '{close_char}' が必要ですが '{separator}' がありました")
+
+    def iter_object(self):
+        """オブジェクトのキーを順に返す（値は呼び出し側が読み進める）"""
+        return self._iter_items('{', '}', with_key=True)
+
+    def iter_array(self):
+        """配列の要素ごとに制御を返す（値は呼び出し側が読み進める）"""
+        return self._iter_items('[', ']', with_key=False)
+
+
+class CompactEntry(Mapping):
+    """メモリ効率のよい単語エントリ
+
+    標準の項目は __slots__ に保持し、品詞とタグは同じ値のオブジェクトを
+    辞書全体で共有する（intern）。dictと同じ読み取り専用のMappingとして扱える。
+    タグのリストも共有されるため変更しないこと。
+    """
+
+    FIELDS = ('読み', '読み_Windows', '単語', '品詞', '説明', 'タグ')
+    __slots__ = FIELDS + ('_extra',)
+
+    @classmethod
+    def from_pairs(cls, pairs, pool):
+        """(キー, 値) のリストから作成（pool は共有オブジェクトの表）"""
+        entry = cls()
+        entry._extra = None
+        for key, value in pairs:
+            if key == '品詞' and isinstance(value, str):
+                value = pool.setdefault(value, value)
+            elif key == 'タグ' and isinstance(value, list):
+                try:
+                    value = pool.setdefault(('タグ',) + tuple(value), value)
+                except TypeError:
+                    pass
+            if key in _COMPACT_FIELDS:
+                setattr(entry, key, value)
+            else:
+                if entry._extra is None:
+                    entry._extra = {}
+                entry._extra[key] = value
+        return entry
+
+    def get(self, key, default=None):
+        if key in _COMPACT_FIELDS:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __getitem__(self, key):
+        if key in _COMPACT_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __contains__(self, key):
+        if key in _COMPACT_FIELDS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def items(self):
+        """(キー, 値) のリスト（Mapping の既定実装より高速）"""
+        pairs = []
+        for key in self.FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                pairs.append((key, value))
+        if self._extra is not None:
+            pairs.extend(self._extra.items())
+        return pairs
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactEntry):
+            return Mapping.__eq__(self, other)
+        # 共有されている品詞・タグは同一オブジェクトなので、ほとんどは同一性の比較で済む
+        for key in self.FIELDS:
+            if getattr(self, key, _MISSING) != getattr(other, key, _MISSING):
+                return False
+        return self._extra == other._extra
+
+    def __repr__(self):
+        return f"CompactEntry({dict(self)!r})"
+
+
+_COMPACT_FIELDS = frozenset(CompactEntry.FIELDS)
+_MISSING = object()
+
+
+def compact_object_hook():
+    """json.load 用の object_pairs_hook（単語エントリを CompactEntry にする）"""
+    pool = {}
+
+    def hook(pairs):
+        keys = [key for key, _ in pairs]
+        if ('読み' in keys or '単語' in keys) and '単語リスト' not in keys:
+            return CompactEntry.from_pairs(pairs, pool)
+        return dict(pairs)
+
+    return hook
+
+
+# バイナリスナップショット（--compile で作成、JSONより新しければ自動で使用）
+SNAPSHOT_MAGIC = b'IMEDSNP1'
+SNAPSHOT_SUFFIX = '.snapshot'
+_U32 = 'I' if array('I').itemsize == 4 else 'L'
+# 単語1件あたりのセル数（標準の項目 + 追加項目）
+_SNAPSHOT_CELLS = len(CompactEntry.FIELDS) + 1
+
+
+def _consume(iterator):
+    """イテレータを最後まで進める"""
+    deque(iterator, maxlen=0)
+
+
+def _u32_bytes(values):
+    """符号なし32bit整数の列をリトルエンディアンのバイト列に変換"""
+    values = array(_U32, values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_u32(buf, pos, count):
+    """バイト列から符号なし32bit整数の列を読み込む"""
+    values = array(_U32)
+    values.frombytes(buf[pos:pos + count * 4])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class _SnapshotBlock:
+    """カテゴリ1つ分のブロックを作成
+
+    値は文字列プールにまとめ（同じ値は1つ）、単語は項目ごとに
+    プールの番号（0 は項目なし）を並べた固定長のセルで表す。
+    文字列以外の値（タグのリスト・追加項目など）はJSON文字列としてプールに入れる。
+    """
+
+    def __init__(self):
+        self.values = []
+        self.json_indices = []
+        self.cells = []
+        self._index = {}
+
+    def _add(self, value):
+        if isinstance(value, str):
+            key = text = value
+        else:
+            text = json.dumps(value, ensure_ascii=False)
+            key = ('json', text)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.values) + 1
+            self.values.append(text)
+            if not isinstance(value, str):
+                self.json_indices.append(index)
+        return index
+
+    def add_word(self, word):
+        for key in CompactEntry.FIELDS:
+            self.cells.append(self._add(word[key]) if key in word else 0)
+        extra = {key: value for key, value in word.items() if key not in _COMPACT_FIELDS}
+        self.cells.append(self._add(extra) if extra else 0)
+
+    def to_bytes(self):
+        """ブロックをバイト列に変換（長さは4バイト境界に揃える）"""
+        text = ''.join(self.values).encode('utf-8')
+        parts = [
+            struct.pack('<4I', len(self.values), len(self.json_indices),
+                        len(self.cells) // _SNAPSHOT_CELLS, len(text)),
+            _u32_bytes(len(value) for value in self.values),
+            _u32_bytes(self.json_indices),
+            text,
+            b'\0' * (-len(text) % 4),
+            _u32_bytes(self.cells),
+        ]
+        return b''.join(parts)
+
+
+def decode_snapshot_block(buf):
+    """カテゴリ1つ分のブロックを CompactEntry のリストに復元"""
+    value_count, json_count, word_count, text_size = struct.unpack_from('<4I', buf, 0)
+    pos = 16
+    lengths = _read_u32(buf, pos, value_count)
+    pos += value_count * 4
+    json_indices = _read_u32(buf, pos, json_count)
+    pos += json_count * 4
+    text = str(buf[pos:pos + text_size], 'utf-8')
+    pos += text_size + (-text_size % 4)
+    cells = _read_u32(buf, pos, word_count * _SNAPSHOT_CELLS)
+
+    # プールの値（0 番は項目なし）
+    ends = list(accumulate(lengths))
+    values = [None] + [text[start:end] for start, end in zip([0] + ends, ends)]
+    for index in json_indices:
+        values[index] = json.loads(values[index])
+
+    # 項目ごと（列ごと）に slot へ代入する（単語ごとのループより速い）
+    words = list(map(CompactEntry.__new__, repeat(CompactEntry, word_count)))
+    lookup = values.__getitem__
+    for column, key in enumerate(CompactEntry.FIELDS + ('_extra',)):
+        indices = cells[column::_SNAPSHOT_CELLS]
+        setter = getattr(CompactEntry, key).__set__
+        if key == '_extra' or 0 not in indices:
+            # 追加項目は、なければ None を入れる
+            _consume(map(setter, words, map(lookup, indices)))
+        else:
+            _consume(map(setter, compress(words, indices), map(lookup, filter(None, indices))))
+    return words
+
+
+class SnapshotWordList(Sequence):
+    """スナップショット内の単語リスト（最初に参照したときに復元）
+
+    件数はブロックを復元せずに返せる。cache=False の場合は復元した
+    単語を保持せず、参照のたびに復元する（ストリームモード用）。
+    """
+
+    def __init__(self, snapshot, offset, length, count, cache=True):
+        self._snapshot = snapshot
+        self._offset = offset
+        self._length = length
+        self._count = count
+        self._cache = cache
+        self._words = None
+
+    def _load(self):
+        if self._words is not None:
+            return self._words
+        words = self._snapshot.decode_block(self._offset, self._length)
+        if self._cache:
+            self._words = words
+        return words
 
-    def _load_json(self):
-        """JSONファイルを読み込み"""
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+    def __iter__(self):
+        return iter(self._load())
+
+
+class DictionarySnapshot:
+    """解析済みの辞書を保存したバイナリスナップショット
+
+    ファイル構成（整数はリトルエンディアン）:
+      マジック（8バイト）、ヘッダー長（4バイト）、ヘッダー（JSON）、
+      カテゴリごとのブロック（ヘッダーの後の4バイト境界から連続して配置）
+    ヘッダーには元のJSONのサイズと更新日時、カテゴリ以外の項目、
+    カテゴリ情報とブロックの位置（ブロック領域の先頭から）・長さ・単語数の表を持つ。
+    ファイルは mmap で開き、ブロックは単語リストを参照したときに復元する。
+    """
+
+    def __init__(self, snapshot_file):
+        self.snapshot_file = Path(snapshot_file)
+        with open(self.snapshot_file, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            if self._mmap[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError(f"スナップショットの形式が正しくありません: {self.snapshot_file}")
+            pos = len(SNAPSHOT_MAGIC)
+            (header_size,) = struct.unpack_from('<I', self._mmap, pos)
+            pos += 4
+            self.header = json.loads(self._mmap[pos:pos + header_size].decode('utf-8'))
+            self.header_size = pos + header_size
+            # ブロックの位置はヘッダーの後（4バイト境界）からの相対位置
+            self._blocks_start = self.header_size + (-self.header_size % 4)
+        except BaseException:
+            self.close()
+            raise
+
+    @staticmethod
+    def path_for(json_file):
+        """JSONファイルに対応するスナップショットのパス（JSONと同じ場所）"""
+        json_file = Path(json_file)
+        return json_file.with_name(json_file.name + SNAPSHOT_SUFFIX)
+
+    @staticmethod
+    def _source_info(json_file):
+        stat = Path(json_file).stat()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @classmethod
+    def compile(cls, json_file, snapshot_file=None):
+        """JSONファイルからスナップショットを作成（作成したパスを返す）
+
+        同じ内容から作るマニフェスト（DictionaryManifest）もJSONの隣に保存する。
+        """
+        snapshot_file = Path(snapshot_file or cls.path_for(json_file))
+        source = cls._source_info(json_file)
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         except Exception as e:
             raise Exception(f"JSONファイルの読み込みに失敗: {e}")
 
-    def list_categories(self):
-        """カテゴリ一覧を表示"""
-        categories = self.data.get('カテゴリ', {})
-        print("📁 利用可能なカテゴリ:")
-        for i, (cat_name, cat_data) in enumerate(categories.items(), 1):
-            word_count = len(cat_data.get('単語リスト', []))
-            status = "✅" if cat_data.get('有効', True) else "❌"
-            print(f"  {i}. {status} {cat_name} ({word_count}件)")
-            if cat_data.get('説明'):
-                print(f"     {cat_data.get('説明')}")
-        print()
-        return list(categories.keys())
+        header = {'source': source, 'data': {}, 'categories': None}
+        blocks = []
+        # マニフェストのカテゴリ（不正なカテゴリがあれば None にして作成しない）
+        summaries = []
+        for key, value in (data.items() if isinstance(data, Mapping) else []):
+            if key != 'カテゴリ' or not isinstance(value, Mapping):
+                header['data'][key] = value
+                continue
+            header['categories'] = []
+            for cat_name, cat_data in value.items():
+                words = cat_data.get('単語リスト') if isinstance(cat_data, Mapping) else None
+                if not isinstance(cat_data, Mapping) or (
+                        '単語リスト' in cat_data
+                        and not (isinstance(words, list) and all(isinstance(w, Mapping) for w in words))):
+                    # 不正なカテゴリは検証でエラーにできるよう、そのままヘッダーに保存
+                    header['categories'].append({'name': cat_name, 'raw': cat_data})
+                    summaries = None
+                    continue
+                info = {key: value for key, value in cat_data.items() if key != '単語リスト'}
+                entry = {'name': cat_name, 'data': info, 'count': None}
+                if words is not None:
+                    block = _SnapshotBlock()
+                    for word in words:
+                        block.add_word(word)
+                    blocks.append((entry, block.to_bytes()))
+                    entry['count'] = len(words)
+                header['categories'].append(entry)
+                if summaries is None:
+                    continue
+                word_count, words_hash = _summarize_words(words or ())
+                summaries.append({'name': cat_name, 'enabled': cat_data.get('有効', True),
+                                  'description': cat_data.get('説明', ''), 'count': word_count, 'hash': words_hash})
+
+        offset = 0
+        for entry, block in blocks:
+            entry['offset'], entry['length'] = offset, len(block)
+            offset += len(block)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        start = len(SNAPSHOT_MAGIC) + 4 + len(header_bytes)
+
+        temp_file = snapshot_file.with_name(snapshot_file.name + '.tmp')
+        with open(temp_file, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b'\0' * (-start % 4))
+            for _entry, block in blocks:
+                f.write(block)
+        os.replace(temp_file, snapshot_file)
+
+        if summaries is not None and isinstance(data, Mapping):
+            dictionary_info = data.get('辞書情報', {})
+            manifest = DictionaryManifest(dictionary_info if isinstance(dictionary_info, Mapping) else {}, summaries)
+            try:
+                manifest.save(json_file, source)
+            except OSError:
+                pass
+        return snapshot_file
+
+    @classmethod
+    def open_if_fresh(cls, json_file, snapshot_file=None):
+        """JSONファイルから作成した最新のスナップショットがあれば開く（なければ None）"""
+        snapshot_file = Path(snapshot_file or cls.path_for(json_file))
+        try:
+            source = cls._source_info(json_file)
+            if not snapshot_file.is_file():
+                return None
+            snapshot = cls(snapshot_file)
+        except (OSError, ValueError):
+            return None
+        if snapshot.header.get('source') != source:
+            snapshot.close()
+            return None
+        return snapshot
+
+    def decode_block(self, offset, length):
+        """カテゴリのブロックを単語のリストに復元"""
+        start = self._blocks_start + offset
+        with memoryview(self._mmap) as view:
+            return decode_snapshot_block(view[start:start + length])
+
+    def to_data(self, cache=True):
+        """JSONを読み込んだ場合と同じ形のデータ（単語リストは SnapshotWordList）"""
+        data = dict(self.header['data'])
+        categories = self.header['categories']
+        if categories is None:
+            return data
+        data['カテゴリ'] = {}
+        for entry in categories:
+            if 'raw' in entry:
+                data['カテゴリ'][entry['name']] = entry['raw']
+                continue
+            cat_data = dict(entry['data'])
+            if entry['count'] is not None:
+                cat_data['単語リスト'] = SnapshotWordList(self, entry['offset'], entry['length'],
+                                                     entry['count'], cache)
+            data['カテゴリ'][entry['name']] = cat_data
+        return data
 
-    def _get_all_words(self, categories=None):
-        """全単語を取得（カテゴリフィルタあり）"""
-        words = []
-        all_categories = self.data.get('カテゴリ', {})
+    def close(self):
+        """mmap を閉じる（以降は to_data() で作成した単語リストも参照できない）"""
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# 辞書の概要を保存したマニフェスト（--stats / --list-categories の結果を読み込みなしで表示）
+MANIFEST_SUFFIX = '.manifest'
+
+
+class DictionaryManifest:
+    """辞書の概要を保存したサイドカーファイル（JSONと同じ場所の <JSON>.manifest）
+
+    カテゴリごとの単語数・有効フラグ・説明・単語リストの内容のハッシュと、辞書情報、
+    元のJSONのサイズと更新日時をJSONで保存する。JSONが更新されていない間は、
+    辞書を読み込まずに統計情報とカテゴリ一覧を表示できる（辞書の大きさによらない）。
+    """
+
+    VERSION = 1
+
+    def __init__(self, dictionary_info, categories):
+        self.dictionary_info = dictionary_info
+        # {'name', 'enabled', 'description', 'count', 'hash'} のリスト
+        self.categories = categories
+
+    @staticmethod
+    def path_for(json_file):
+        """JSONファイルに対応するマニフェストのパス（JSONと同じ場所）"""
+        json_file = Path(json_file)
+        return json_file.with_name(json_file.name + MANIFEST_SUFFIX)
+
+    @classmethod
+    def open_if_fresh(cls, json_file):
+        """JSONファイルの最新のマニフェストがあれば読み込む（なければ None）"""
+        try:
+            source = DictionarySnapshot._source_info(json_file)
+            with open(cls.path_for(json_file), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != cls.VERSION or data.get('source') != source:
+            return None
+        return cls(data['辞書情報'], data['categories'])
+
+    def save(self, json_file, source):
+        """保存して保存先のパスを返す（source は読み込みを始める前のJSONのサイズと更新日時）"""
+        manifest_file = self.path_for(json_file)
+        temp_file = manifest_file.with_name(manifest_file.name + '.tmp')
+        data = {'version': self.VERSION, 'source': source,
+                '辞書情報': self.dictionary_info, 'categories': self.categories}
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, manifest_file)
+        return manifest_file
+
+    def rows(self):
+        """(カテゴリ名, 有効フラグ, 単語数, 説明) のリスト（print_stats() などに渡す）"""
+        return [(c['name'], c['enabled'], c['count'], c['description']) for c in self.categories]
+
+
+def print_stats(dictionary_info, rows):
+    """統計情報を表示（rows は (カテゴリ名, 有効フラグ, 単語数, 説明) のリスト）"""
+    total_words = sum(row[2] for row in rows)
+    active_words = sum(row[2] for row in rows if row[1])
+
+    print("📊 辞書統計情報")
+    print(f"  辞書名: {dictionary_info.get('名前', 'N/A')}")
+    print(f"  更新日: {dictionary_info.get('更新日', 'N/A')}")
+    print(f"  カテゴリ数: {len(rows)}")
+    print(f"  総単語数: {total_words}")
+    print(f"  有効単語数: {active_words}")
+    print()
 
-        for cat_name, cat_data in all_categories.items():
+    # カテゴリ別詳細
+    for cat_name, enabled, word_count, description in rows:
+        status = "✅" if enabled else "❌"
+        print(f"  {status} {cat_name}: {word_count}件 - {description}")
+
+
+def print_categories(rows):
+    """カテゴリ一覧を表示し、カテゴリ名のリストを返す（rows は print_stats() と同じ）"""
+    print("📁 利用可能なカテゴリ:")
+    for i, (cat_name, enabled, word_count, description) in enumerate(rows, 1):
+        status = "✅" if enabled else "❌"
+        print(f"  {i}. {status} {cat_name} ({word_count}件)")
+        if description:
+            print(f"     {description}")
+    print()
+    return [row[0] for row in rows]
+
+
+def _is_word_list(words):
+    """単語リストとして1件ずつ辿れる値か（文字列やオブジェクトなどの不正な値でないか）"""
+    return isinstance(words, Iterable) and not isinstance(words, (str, Mapping))
+
+
+class WordView(Mapping):
+    """単語エントリの軽量ビュー
+
+    元の単語dictをコピーせずに参照し、カテゴリ名を追加のキー
+    'カテゴリ' として見せる。読み取り専用。
+    """
+
+    __slots__ = ('entry', 'category')
+
+    def __init__(self, entry, category):
+        self.entry = entry
+        self.category = category
+
+    def __getitem__(self, key):
+        if key == 'カテゴリ':
+            return self.category
+        return self.entry[key]
+
+    def get(self, key, default=None):
+        if key == 'カテゴリ':
+            return self.category
+        return self.entry.get(key, default)
+
+    def __contains__(self, key):
+        return key == 'カテゴリ' or key in self.entry
+
+    def __iter__(self):
+        for key in self.entry:
+            if key != 'カテゴリ':
+                yield key
+        yield 'カテゴリ'
+
+    def __len__(self):
+        return len(self.entry) + (0 if 'カテゴリ' in self.entry else 1)
+
+    def __repr__(self):
+        return f"WordView({self.entry!r}, category={self.category!r})"
+
+    def to_dict(self):
+        """カテゴリ付きの通常のdictに変換"""
+        return {**self.entry, 'カテゴリ': self.category}
+
+
+def duplicate_key(word):
+    """重複判定のキー（読み・Windows用の読み・単語がすべて同じなら重複）"""
+    reading = word.get('読み', '')
+    return reading, word.get('読み_Windows') or reading, word.get('単語', '')
+
+
+class DuplicateFilter:
+    """重複する単語（duplicate_key が同じもの）の2件目以降を検出"""
+
+    def __init__(self):
+        self.count = 0
+        self._seen = set()
+
+    def is_duplicate(self, word):
+        """既に出現した単語なら True（初出なら記録する）"""
+        key = duplicate_key(word)
+        if key in self._seen:
+            self.count += 1
+            return True
+        self._seen.add(key)
+        return False
+
+
+# 差分の種類（出力ファイル名に付ける名前, 表示名）
+DELTA_KINDS = (('added', '追加'), ('changed', '変更'), ('removed', '削除'))
+
+
+def delta_key(word):
+    """差分を取る単位のキー（読み・単語・品詞。品詞の省略は名詞として扱う）"""
+    return word.get('読み', ''), word.get('単語', ''), word.get('品詞') or '名詞'
+
+
+def _delta_digest(view):
+    """単語（カテゴリを含む）の内容のハッシュ（キーの順によらない）"""
+    return hashlib.blake2b(_json_sorted([view.category, dict(view.entry.items())]).encode('utf-8'),
+                           digest_size=16).digest()
+
+
+def delta_path(output_file, kind):
+    """差分の出力ファイル名（例: dictionary.csv -> dictionary.added.csv）"""
+    output_file = Path(output_file)
+    return output_file.with_name(f"{output_file.stem}.{kind}{output_file.suffix}")
+
+
+class WordStream:
+    """単語を1件ずつ WordView として返すイテレータ
+
+    走査しながら件数（count）とカテゴリ別件数（category_counts）を集計する。
+    dedupe=True の場合は重複する単語（duplicate_key が同じもの）の2件目以降を
+    読み飛ばし、その件数を duplicates に数える。
+    """
+
+    def __init__(self, source, categories=None, dedupe=False):
+        self.count = 0
+        self.category_counts = {}
+        self._duplicates = DuplicateFilter() if dedupe else None
+        self._words = self._generate(source, set(categories) if categories else None)
+
+    @property
+    def duplicates(self):
+        """読み飛ばした重複の件数"""
+        return self._duplicates.count if self._duplicates is not None else 0
+
+    def _generate(self, source, selected):
+        for cat_name, cat_data, words in source:
             # カテゴリフィルタ
-            if categories and cat_name not in categories:
+            if selected is not None and cat_name not in selected:
                 continue
 
             # 無効なカテゴリはスキップ
             if cat_data.get('有効', True) is False:
                 continue
 
-            for word in cat_data.get('単語リスト', []):
-                words.append({
-                    **word,
-                    'カテゴリ': cat_name
-                })
+            start = self.count
+            for word in words:
+                if self._duplicates is not None and self._duplicates.is_duplicate(word):
+                    continue
+                self.count += 1
+                yield WordView(word, cat_name)
+            self.category_counts[cat_name] = self.category_counts.get(cat_name, 0) + self.count - start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._words)
+
+
+def _reading_key(word):
+    """読みの順に併合するときのキー（読みが文字列でない単語は空の読みとして扱う）"""
+    reading = word.get('読み', '') if isinstance(word, Mapping) else ''
+    return reading if isinstance(reading, str) else ''
+
+
+def _check_sorted(words, source, name):
+    """単語を (入力の番号, 単語) で返し、読みの順に並んでいなければエラーにする"""
+    previous = ''
+    for word in words:
+        reading = _reading_key(word)
+        if reading < previous:
+            raise Exception(f"読みの順に並んでいません: {name} の「{previous}」の後に「{reading}」があります")
+        previous = reading
+        yield source, word
+
+
+def merge_word_lists(word_lists, sorted_by_reading=False, names=None):
+    """複数の入力の同じカテゴリの単語リストを1つにまとめて1件ずつ返す
+
+    word_lists は優先する順（先の入力が優先）に並べる。別の入力に同じ単語
+    （duplicate_key が同じもの）がある場合は優先する入力のものだけを残す。
+    sorted_by_reading=True の場合は、読みの順に並んだ単語リストを heapq.merge で
+    読みの順に併合する。同じ単語は同じ読みの中でだけ比較するため、単語を保持せずに済む。
+    names はエラー表示用の入力名のリスト。
+    """
+    if len(word_lists) == 1:
+        yield from word_lists[0]
+        return
+
+    if not sorted_by_reading:
+        owners = {}
+        for source, words in enumerate(word_lists):
+            for word in words:
+                if isinstance(word, Mapping) and owners.setdefault(duplicate_key(word), source) != source:
+                    continue
+                yield word
+        return
 
+    names = names or [f"入力{i + 1}" for i in range(len(word_lists))]
+    tagged = [_check_sorted(words, source, name) for source, (words, name) in enumerate(zip(word_lists, names))]
+    # 同じ読みの単語は入力の順に返されるため、各読みで最初に現れた入力が優先される
+    run_reading = None
+    owners = {}
+    for source, word in heapq.merge(*tagged, key=lambda item: _reading_key(item[1])):
+        if isinstance(word, Mapping):
+            reading = _reading_key(word)
+            if reading != run_reading:
+                run_reading = reading
+                owners = {}
+            if owners.setdefault(duplicate_key(word), source) != source:
+                continue
+        yield word
+
+
+def expand_inputs(patterns):
+    """入力ファイルの指定（パスまたはglobパターン）をパスのリストに展開
+
+    パターンに一致したファイルは名前順に並べ、同じファイルは最初の1つだけ残す。
+    何にも一致しないパターンはそのまま返す（読み込み時にファイルがないエラーになる）。
+    """
+    paths = []
+    for pattern in patterns:
+        pattern = str(pattern)
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else []
+        paths.extend(matches or [pattern])
+    return [Path(path) for path in dict.fromkeys(paths)]
+
+
+class ReadingIndex:
+    """読み（読み・読み_Windows）の検索用インデックス
+
+    読みをソートした配列と二分探索で、完全一致・前方一致の検索を
+    O(log n + 件数) で行う。一度作成すれば何度でも検索に使える。
+    """
+
+    def __init__(self, words):
+        pairs = []
+        for word in words:
+            reading = word.get('読み')
+            if reading:
+                pairs.append((reading, word))
+            reading_windows = word.get('読み_Windows')
+            if reading_windows and reading_windows != reading:
+                pairs.append((reading_windows, word))
+        # 同じ読みの中では辞書内の順序を保つ（安定ソート）
+        pairs.sort(key=lambda pair: pair[0])
+        self._readings = [reading for reading, _ in pairs]
+        self._words = [word for _, word in pairs]
+
+    def __len__(self):
+        return len(self._readings)
+
+    @staticmethod
+    def _prefix_end(prefix):
+        """prefix で始まる文字列より大きい最小の文字列（なければNone）"""
+        for i in range(len(prefix) - 1, -1, -1):
+            if ord(prefix[i]) < sys.maxunicode:
+                return prefix[:i] + chr(ord(prefix[i]) + 1)
+        return None
+
+    def lookup(self, reading, exact=False, limit=None):
+        """読みで検索して WordView のリストを返す（exact=False なら前方一致）"""
+        start = bisect_left(self._readings, reading)
+        if exact:
+            end = bisect_right(self._readings, reading, start)
+        else:
+            prefix_end = self._prefix_end(reading)
+            end = len(self._readings) if prefix_end is None else bisect_left(self._readings, prefix_end, start)
+
+        # 読みと読み_Windowsの両方が一致した単語は1回だけ返す
+        results = []
+        seen = set()
+        for word in self._words[start:end]:
+            if id(word.entry) in seen:
+                continue
+            seen.add(id(word.entry))
+            results.append(word)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+def _windows_reading_tables():
+    """Windows用の読みの生成に使う (文字の変換表, 区切りの正規表現, 区切り -> かなの表)
+
+    文字の変換表は全角英数字・記号を半角に、カタカナをひらがなに、長音記号に
+    見える文字を「ー」にする。ローマ字の表は Microsoft IME のローマ字入力に合わせる。
+    正規表現は綴りを先頭の文字ごとにまとめた木の形で、長い綴りから順に試す（最長一致）。
+    促音の子音と「ん」になる n・m は1文字の区切りとして表に加える。
+    """
+    table = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+    table.update({code: code - 0x60 for code in range(0x30A1, 0x30F7)})
+    table.update({ord(char): 'ー' for char in '-－‐−ｰ'})
+    table[0x3000] = ' '
+
+    # 子音 -> あ・い・う・え・お段のかな（- はその段がない）
+    rows = {
+        '': 'あ い う え お', 'k': 'か き く け こ', 's': 'さ し す せ そ', 't': 'た ち つ て と',
+        'n': 'な に ぬ ね の', 'h': 'は ひ ふ へ ほ', 'm': 'ま み む め も', 'y': 'や - ゆ いぇ よ',
+        'r': 'ら り る れ ろ', 'w': 'わ うぃ う うぇ を', 'g': 'が ぎ ぐ げ ご', 'z': 'ざ じ ず ぜ ぞ',
+        'd': 'だ ぢ づ で ど', 'b': 'ば び ぶ べ ぼ', 'p': 'ぱ ぴ ぷ ぺ ぽ', 'f': 'ふぁ ふぃ ふ ふぇ ふぉ',
+        'v': 'ゔぁ ゔぃ ゔ ゔぇ ゔぉ', 'q': 'くぁ くぃ く くぇ くぉ', 'j': 'じゃ じ じゅ じぇ じょ',
+        'c': 'か し く せ こ', 'x': 'ぁ ぃ ぅ ぇ ぉ', 'l': 'ぁ ぃ ぅ ぇ ぉ',
+    }
+    kana = {consonant + vowel: syllable for consonant, syllables in rows.items()
+            for vowel, syllable in zip('aiueo', syllables.split()) if syllable != '-'}
+    # 拗音（kya・sha・cha など）
+    for consonant, base in {'k': 'き', 's': 'し', 't': 'ち', 'n': 'に', 'h': 'ひ', 'm': 'み', 'r': 'り',
+                            'g': 'ぎ', 'z': 'じ', 'j': 'じ', 'd': 'ぢ', 'b': 'び', 'p': 'ぴ', 'c': 'ち'}.items():
+        for vowel, small in zip('auo', 'ゃゅょ'):
+            kana[consonant + 'y' + vowel] = base + small
+        kana[consonant + 'ye'] = base + 'ぇ'
+    for vowel, small in zip('auo', 'ゃゅょ'):
+        kana['sh' + vowel] = 'し' + small
+        kana['ch' + vowel] = 'ち' + small
+        kana['xy' + vowel] = kana['ly' + vowel] = small
+    kana.update({
+        'yi': 'い', 'shi': 'し', 'she': 'しぇ', 'chi': 'ち', 'che': 'ちぇ', 'tsu': 'つ', 'tu': 'つ', 'ji': 'じ', 'je': 'じぇ',
+        'fu': 'ふ', 'hu': 'ふ', 'si': 'し', 'ti': 'ち', 'ci': 'し', 'ce': 'せ', 'zi': 'じ', 'di': 'ぢ', 'du': 'づ',
+        'thi': 'てぃ', 'thu': 'てゅ', 'dhi': 'でぃ', 'dhu': 'でゅ', 'twu': 'とぅ', 'dwu': 'どぅ',
+        'tsa': 'つぁ', 'tsi': 'つぃ', 'tse': 'つぇ', 'tso': 'つぉ', 'kwa': 'くぁ', 'gwa': 'ぐぁ',
+        'xtu': 'っ', 'ltu': 'っ', 'xtsu': 'っ', 'ltsu': 'っ', 'xwa': 'ゎ', 'lwa': 'ゎ',
+        'xka': 'ゕ', 'lka': 'ゕ', 'xke': 'ゖ', 'lke': 'ゖ', 'vu': 'ゔ', 'nn': 'ん', "n'": 'ん', 'xn': 'ん',
+    })
+
+    def alternatives(spellings):
+        # 綴りを先頭の文字でまとめ、続きのある綴りを先に試す（k(?:y(?:a|u|o|e)|a|…)）
+        groups = {}
+        for spelling in spellings:
+            groups.setdefault(spelling[0], []).append(spelling[1:])
+        options = []
+        for first, rests in sorted(groups.items()):
+            longer = [rest for rest in rests if rest]
+            if not longer:
+                options.append(re.escape(first))
+            elif len(longer) == len(rests):
+                options.append(re.escape(first) + alternatives(longer))
+            else:
+                options.append(f'{re.escape(first)}(?:{alternatives(longer)})?')
+        return options[0] if len(options) == 1 else f"(?:{'|'.join(options)})"
+
+    consonants = 'bcdfghjklpqrstvwxyz'
+    patterns = [
+        # 促音（kitte・matcha の最初の t）
+        *(f'{char}(?={char})' for char in consonants), 't(?=ch)',
+        # konnichiha の最初の n、ヘボン式の shimbun・amma の m は「ん」
+        'n(?=n[aiueoy])', 'm(?=[bpm])',
+        alternatives(kana),
+        # 子音の前と末尾の n は「ん」。ひらがなと数字（やじ0 など）はそのまま
+        'n', '[ぁ-ゖゝゞー0-9]+',
+    ]
+    kana.update({char: 'っ' for char in consonants})
+    kana.update({'n': 'ん', 'm': 'ん'})
+    return str.maketrans(table), re.compile('|'.join(patterns)), kana
+
+
+class WindowsReadingGenerator:
+    """読み_Windows がない単語のWindows用の読み（ひらがな）を生成
+
+    読みを1つの変換表（str.translate）で半角・ひらがなに揃え、残ったローマ字を
+    最長一致でかなにする。結果は読みごとに覚えておくため、同じ読みは一度だけ変換する。
+    generate() は (生成した読み, 注意) を返す。注意は曖昧な場合の理由（生成した読みは
+    よく使われる方の解釈）、生成した読みが None の場合は変換できない理由。
+    """
+
+    TRANSLATION, SYLLABLE, KANA = _windows_reading_tables()
+    SYLLABLES = re.compile(f'(?:{SYLLABLE.pattern})+')
+    # Windows IMEの読みにそのまま使える文字（ひらがな・長音記号・半角数字）
+    WINDOWS_READING = re.compile(r'[ぁ-ゖゝゞー0-9]+')
+    HALFWIDTH_KANA = re.compile(r'[｡-ﾟ]')
+    # 区切り方で読みが変わる綴り（生成した読みは前者。nnn・nny のように n が多ければ曖昧ではない）
+    AMBIGUOUS = [
+        (re.compile(r'nn+[aiueoy]'), "「{}」の区切り（ん + な行 か ん + あ行・や行 か）"),
+        (re.compile(r'n+y[aiueo]'), "「{}」の区切り（にゃ行 か ん + や行 か）"),
+    ]
+
+    def __init__(self):
+        self._memo = {}
+
+    @classmethod
+    def needs_reading(cls, word):
+        """読み_Windows がなく、読みがWindows IMEでそのまま使えない単語か"""
+        reading = word.get('読み')
+        if not reading or not isinstance(reading, str) or cls.WINDOWS_READING.fullmatch(reading):
+            return False
+        return not word.get('読み_Windows')
+
+    def generate(self, reading):
+        """読みから (Windows用の読み, 注意) を返す（読みごとに1回だけ変換する）"""
+        result = self._memo.get(reading)
+        if result is None:
+            result = self._memo[reading] = self._generate(reading)
+        return result
+
+    def _generate(self, reading):
+        if self.HALFWIDTH_KANA.search(reading):
+            # 半角カタカナの濁点・半濁点は前の文字と合成する
+            reading = unicodedata.normalize('NFKC', reading)
+        # 半角英字だけの読み（大半のローマ字の読み）は変換表を通さなくてよい
+        text = reading if reading.isascii() and '-' not in reading else reading.translate(self.TRANSLATION)
+        if self.WINDOWS_READING.fullmatch(text):
+            return text, None
+        acronym = len(text) > 1 and text.isascii() and text.isalpha() and text.isupper()
+        text = text.lower()
+
+        syllables = self.SYLLABLE.findall(text)
+        if sum(map(len, syllables)) != len(text):
+            # 区切れなかった位置から後ろを理由として返す
+            match = self.SYLLABLES.match(text)
+            return None, f"かなにできない「{text[match.end() if match else 0:]}」"
+        kana = ''.join([self.KANA.get(syllable, syllable) for syllable in syllables])
+
+        if acronym:
+            return kana, "大文字の略語（1文字ずつ読む可能性）"
+        if 'n' in text:
+            for pattern, message in self.AMBIGUOUS:
+                for match in pattern.finditer(text):
+                    if len(match.group()) == 3:
+                        return kana, message.format(match.group())
+        return kana, None
+
+
+def _with_windows_reading(word, reading):
+    """読みの直後に読み_Windows を追加した単語のdict"""
+    entry = {}
+    for key, value in word.items():
+        if key != '読み_Windows':
+            entry[key] = value
+        if key == '読み':
+            entry['読み_Windows'] = reading
+    return entry
+
+
+class TagIndex:
+    """タグ・品詞の転置インデックス
+
+    タグ・品詞ごとに該当する単語の番号（辞書内の順）の昇順リストを持ち、
+    条件に合う単語を辞書の大きさではなく該当件数に比例した時間で取り出す。
+    品詞がない単語は出力時と同じく「名詞」として扱う。
+    """
+
+    def __init__(self, words):
+        self._words = list(words)
+        self._tags = {}
+        self._pos = {}
+        # CompactEntry は同じタグのリストを共有するため、リストごとに一度だけ調べる
+        checked = {}
+        for number, word in enumerate(self._words):
+            tags = word.get('タグ')
+            if tags is not None:
+                unique_tags = checked.get(id(tags))
+                if unique_tags is None:
+                    unique_tags = checked[id(tags)] = tuple(dict.fromkeys(self._word_tags(word)))
+                for tag in unique_tags:
+                    postings = self._tags.get(tag)
+                    if postings is None:
+                        self._tags[tag] = [number]
+                    else:
+                        postings.append(number)
+            pos = word.get('品詞', '名詞')
+            if isinstance(pos, str):
+                postings = self._pos.get(pos)
+                if postings is None:
+                    self._pos[pos] = [number]
+                else:
+                    postings.append(number)
+
+    def __len__(self):
+        return len(self._words)
+
+    @staticmethod
+    def _word_tags(word):
+        """単語のタグ（文字列の配列でないタグは DictionaryStore と同じく無視する）"""
+        tags = word.get('タグ')
+        if isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+            return tags
+        return ()
+
+    @staticmethod
+    def _union(postings):
+        if len(postings) == 1:
+            return postings[0]
+        return sorted(set().union(*postings))
+
+    @staticmethod
+    def _intersection(postings):
+        """昇順リストの共通部分（最も短いリストの各要素を他のリストで二分探索）"""
+        postings = sorted(postings, key=len)
+        result = postings[0]
+        for other in postings[1:]:
+            matched = []
+            start = 0
+            for number in result:
+                start = bisect_left(other, number, start)
+                if start == len(other):
+                    break
+                if other[start] == number:
+                    matched.append(number)
+            result = matched
+        return result
+
+    def select(self, tags=None, pos=None, match_all=False, categories=None):
+        """タグ・品詞で単語を選択して WordView のリストを返す（辞書内の順）
+
+        tags は match_all=False ならいずれか、True ならすべてを持つ単語、
+        pos はいずれかの品詞の単語を選ぶ。両方を指定した場合は両方に合う単語。
+        """
+        numbers = None
+        if tags:
+            postings = [self._tags.get(tag, []) for tag in tags]
+            numbers = self._intersection(postings) if match_all else self._union(postings)
+        if pos:
+            pos_numbers = self._union([self._pos.get(name, []) for name in pos])
+            numbers = pos_numbers if numbers is None else self._intersection([numbers, pos_numbers])
+        words = self._words if numbers is None else [self._words[number] for number in numbers]
+        if categories:
+            selected = set(categories)
+            words = [word for word in words if word.category in selected]
         return words
 
-    def to_csv(self, output_file, categories=None):
-        """CSV形式で出力（正しいCSV形式）"""
-        words = self._get_all_words(categories)
+    @staticmethod
+    def matches(word, tags=None, pos=None, match_all=False):
+        """単語が select() と同じ条件に合うか（インデックスを作らずに1件ずつ調べる場合用）"""
+        if tags:
+            word_tags = set(TagIndex._word_tags(word))
+            found = [tag in word_tags for tag in tags]
+            if not (all(found) if match_all else any(found)):
+                return False
+        return not pos or word.get('品詞', '名詞') in pos
+
+
+# 一時ファイルをメモリ上に保持する上限（超えたらディスクに書き出す）
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def _spooled_text(max_size=SPOOL_MAX_SIZE):
+    """改行変換なしのテキスト用一時ファイルを作成"""
+    return tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+', encoding='utf-8', newline='')
+
+
+# 値を1行のJSONに変換するエンコーダー（呼び出しごとに作らないよう共有する）
+_json_value = json.JSONEncoder(ensure_ascii=False).encode
+_json_string = json.encoder.encode_basestring
+
+
+def _json_text(value, level):
+    """json.dump(indent=2) で level 段目に書いた場合と同じ形式の文字列
+
+    indent を指定した json.dumps は Python 実装の遅いエンコーダーを使うため、
+    オブジェクトと配列は自前で組み立て、値だけを json.dumps で変換する。
+    """
+    if isinstance(value, str):
+        return _json_string(value)
+    if isinstance(value, dict):
+        if not value:
+            return '{}'
+        if not all(isinstance(key, str) for key in value):
+            # 文字列以外のキーの変換は json に任せる
+            return json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n' + '  ' * level)
+        indent = '\n' + '  ' * (level + 1)
+        items = [f"{indent}{_json_string(key)}: {_json_text(item, level + 1)}" for key, item in value.items()]
+        return '{' + ','.join(items) + '\n' + '  ' * level + '}'
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return '[]'
+        indent = '\n' + '  ' * (level + 1)
+        return '[' + ','.join(indent + _json_text(item, level + 1) for item in value) + '\n' + '  ' * level + ']'
+    return _json_value(value)
+
+
+def write_dictionary_json(output_file, categories, top_level):
+    """辞書をJSONファイルに書き出し、単語数を返す
+
+    json.dump(indent=2) と同じ形式で、単語を1件ずつ書き出す。categories は
+    (カテゴリ名, カテゴリ情報, 単語リスト) のイテレータ、top_level は最上位の項目を
+    返す関数（カテゴリを書き出した後に呼ぶため、ストリームモードの走査結果も使える）。
+    """
+    dumps = _json_text
+    output_file = Path(output_file)
+    temp_file = output_file.with_name(output_file.name + '.tmp')
+    with _spooled_text() as category_text:
+        # カテゴリを先に書き出す（ストリームモードでは最上位の項目が走査後に確定するため）
+        count = 0
+        for i, (cat_name, cat_data, words) in enumerate(categories):
+            fields = [f"\n      {dumps(key, 0)}: {dumps(value, 3)}"
+                      for key, value in cat_data.items() if key != '単語リスト']
+            category_text.write(f"{',' if i else ''}\n    {dumps(cat_name, 0)}: {{{','.join(fields)}")
+            if words is not MISSING_WORD_LIST and not _is_word_list(words):
+                category_text.write(f"{',' if fields else ''}\n      \"単語リスト\": {dumps(words, 3)}")
+            elif words is not MISSING_WORD_LIST:
+                category_text.write(f"{',' if fields else ''}\n      \"単語リスト\": [")
+                start = count
+                for word in words:
+                    word = dict(word) if isinstance(word, Mapping) else word
+                    category_text.write(f"{',' if count > start else ''}\n        {dumps(word, 4)}")
+                    count += 1
+                category_text.write('\n      ]' if count > start else ']')
+            category_text.write('\n    }' if fields or words is not MISSING_WORD_LIST else '}')
+
+        with open(temp_file, 'w', encoding='utf-8', newline='\n') as f:
+            f.write('{')
+            i = None
+            for i, (key, value) in enumerate(top_level().items()):
+                f.write(f"{',' if i else ''}\n  {dumps(key, 0)}: ")
+                if key == 'カテゴリ' and isinstance(value, Mapping):
+                    if category_text.tell():
+                        category_text.seek(0)
+                        f.write('{')
+                        shutil.copyfileobj(category_text, f)
+                        f.write('\n  }')
+                    else:
+                        f.write('{}')
+                else:
+                    f.write(dumps(value, 1))
+            f.write('\n}' if i is not None else '}')
+    os.replace(temp_file, output_file)
+    return count
+
+
+def _sort_text(value):
+    """並べ替えのキーに使う文字列（文字列以外の値も比較できるようにする）"""
+    return value if isinstance(value, str) else '' if value is None else str(value)
+
+
+class ExternalSorter:
+    """単語（WordView）を外部マージソートで並べ替える
+
+    run_size 件ずつ並べ替えた列（ラン）を一時ファイルに書き出し、heapq.merge で
+    併合するため、メモリには run_size 件と各ランの先頭 BATCH_SIZE 件しか保持しない。
+    キーが同じ単語は元の順を保つ（安定）ため、辞書の変更が出力の差分に最小限しか現れない。
+    1つのランに収まる場合は一時ファイルを使わない。
+    """
+
+    # 並べ替えの種類 -> キー（第1キーが同じ場合は第2キー、それも同じなら元の順）
+    ORDERS = {
+        'reading': lambda view: (_sort_text(view.get('読み')), _sort_text(view.get('単語'))),
+        'word': lambda view: (_sort_text(view.get('単語')), _sort_text(view.get('読み'))),
+        'category': lambda view: (_sort_text(view.category),),
+    }
+    RUN_SIZE = 50000
+    # 一時ファイルへ pickle でまとめて書き出す件数
+    BATCH_SIZE = 1000
+
+    def __init__(self, order, run_size=None):
+        if order not in self.ORDERS:
+            raise ValueError(f"並べ替えの種類が正しくありません: {order}（{', '.join(self.ORDERS)}）")
+        self.key = self.ORDERS[order]
+        self.run_size = run_size or self.RUN_SIZE
+        # 一時ファイルに書き出したランの数
+        self.runs = 0
+
+    def sort(self, words):
+        """並べ替えた単語を1件ずつ返す（一時ファイルは全て返し終えるか閉じた時点で削除）"""
+        key = self.key
+        with ExitStack() as stack:
+            run_files = []
+            run = []
+            for number, view in enumerate(words):
+                run.append((key(view), number, view))
+                if len(run) >= self.run_size:
+                    run_files.append(stack.enter_context(self._spill(run)))
+                    run = []
+            run.sort(key=lambda item: item[:2])
+            if not run_files:
+                for _key, _number, view in run:
+                    yield view
+                return
+            if run:
+                run_files.append(stack.enter_context(self._spill(run)))
+            del run
+            for _key, _number, category, entry in heapq.merge(*(self._read_run(f) for f in run_files)):
+                yield WordView(entry, category)
+
+    def _spill(self, run):
+        """ランを並べ替えて BATCH_SIZE 件ずつ pickle で一時ファイルに書き出す"""
+        run.sort(key=lambda item: item[:2])
+        f = tempfile.TemporaryFile()
+        for start in range(0, len(run), self.BATCH_SIZE):
+            batch = [(view_key, number, view.category,
+                      dict(view.entry.items()) if isinstance(view.entry, Mapping) else view.entry)
+                     for view_key, number, view in run[start:start + self.BATCH_SIZE]]
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.seek(0)
+        self.runs += 1
+        return f
+
+    @staticmethod
+    def _read_run(f):
+        """ランの一時ファイルから (キー, 元の順, カテゴリ, 単語) を返す（元の順は一意のため単語は比較されない）"""
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
 
-        if not words:
-            print("⚠️  出力する単語がありません")
-            return
 
-        with open(output_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.writer(csvfile, quoting=csv.QUOTE_ALL)
+# Windows IMEで使用可能な品詞へのマッピング
+WINDOWS_POS_MAP = {
+    '記号': '短縮よみ',
+    '名詞': '名詞',
+    '動詞': '名詞',  # Windows IMEでは動詞は使えないので名詞に
+    '形容詞': '名詞',  # Windows IMEでは形容詞は使えないので名詞に
+    '副詞': '名詞',  # Windows IMEでは副詞は使えないので名詞に
+    '人名': '人名',
+    '地名': '地名',
+    '固有名詞': '名詞',
+    '短縮よみ': '短縮よみ',
+    '顔文字': '顔文字',
+    'サ変名詞': 'サ変名詞'
+}
 
-            # ヘッダー
-            writer.writerow(['読み', '読み_Windows', '単語', '品詞', '説明', 'タグ', 'カテゴリ'])
 
-            # データ
-            for word in words:
-                tags = ';'.join(word.get('タグ', []))
-                writer.writerow([
-                    word.get('読み', ''),
-                    word.get('読み_Windows', ''),
-                    word.get('単語', ''),
-                    word.get('品詞', '名詞'),
-                    word.get('説明', ''),
-                    tags,
-                    word.get('カテゴリ', '')
-                ])
-
-        print(f"✅ CSV出力完了: {output_file} ({len(words)}件)")
+def map_pos_for_windows(pos):
+    """品詞をWindows IME用にマッピング"""
+    return WINDOWS_POS_MAP.get(pos, '名詞')
+
+
+def _csv_row(values):
+    """全フィールドを引用符で囲んだCSVの1行"""
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerow(values)
+    return buffer.getvalue()
+
+
+def _entry_fields(word):
+    """単語の (読み, 読み_Windows, 単語, 品詞, 説明, タグ, カテゴリ)（未設定の項目は既定値）
+
+    出力形式が単語ごとに呼ぶため、WordView と CompactEntry は Mapping.get を
+    経由せずスロットを直接読む。
+    """
+    if type(word) is WordView:
+        entry, category = word.entry, word.category
+    else:
+        entry, category = word, word.get('カテゴリ', '')
+    if type(entry) is CompactEntry:
+        return (getattr(entry, '読み', ''), getattr(entry, '読み_Windows', ''), getattr(entry, '単語', ''),
+                getattr(entry, '品詞', '名詞'), getattr(entry, '説明', ''), getattr(entry, 'タグ', ()), category)
+    get = entry.get
+    return (get('読み', ''), get('読み_Windows', ''), get('単語', ''),
+            get('品詞', '名詞'), get('説明', ''), get('タグ', ()), category)
+
+
+def _tab_row(word):
+    """読み<TAB>単語<TAB>品詞<TAB>説明 の1行"""
+    reading, _, surface, pos, description, _, _ = _entry_fields(word)
+    return f"{reading}\t{surface}\t{pos}\t{description}\n"
+
+
+class OutputFormat:
+    """出力形式の基底クラス
+
+    出力ファイルは header + (カテゴリごとに category_header + entry...) + footer
+    で構成される。インスタンスは出力ファイル1つにつき1つ作成する。
+    """
+
+    label = ''
+    encoding = 'utf-8'
+    newline = None
+    # 本文断片のキャッシュ形式を変えたら上げる
+    version = 1
+    # ヘッダーに単語数を書くため、本文をすべて書き終えてからヘッダーを出力する
+    needs_count = False
+    # カテゴリ名順に並べ替えて出力する
+    sort_categories = False
+
+    def __init__(self, generated_at=None):
+        # ヘッダーに書く生成日時（Noneなら出力時の現在時刻）
+        self.generated_at = generated_at
+
+    def timestamp(self):
+        """ヘッダー用の生成日時"""
+        return (self.generated_at or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+
+    def header(self, count, categories):
+        return ''
+
+    def category_header(self, category):
+        return ''
+
+    def entry(self, word):
+        raise NotImplementedError
+
+    def entry_writer(self, f):
+        """単語を1件ずつ f（write() を持つオブジェクト）へ書き込む関数を返す"""
+        entry = self.entry
+        write = f.write
+        return lambda word: write(entry(word))
+
+    def footer(self):
+        return ''
+
+
+class CsvFormat(OutputFormat):
+    """CSV形式（BOM付きUTF-8）"""
+
+    label = 'CSV'
+    encoding = 'utf-8-sig'
+    newline = ''
+
+    def header(self, count, categories):
+        return _csv_row(['読み', '読み_Windows', '単語', '品詞', '説明', 'タグ', 'カテゴリ'])
+
+    @staticmethod
+    def _values(word):
+        reading, reading_windows, surface, pos, description, tags, category = _entry_fields(word)
+        return reading, reading_windows, surface, pos, description, ';'.join(tags), category
+
+    def entry(self, word):
+        return _csv_row(self._values(word))
+
+    def entry_writer(self, f):
+        # 1行ずつ文字列を作らず、csv.writer で出力先へ直接書き込む
+        writerow = csv.writer(f, quoting=csv.QUOTE_ALL).writerow
+        values = self._values
+        return lambda word: writerow(values(word))
+
+
+class TxtFormat(OutputFormat):
+    """タブ区切りテキスト形式"""
+
+    label = 'TXT'
+    needs_count = True
+
+    def header(self, count, categories):
+        lines = [
+            "# IME辞書データ\n",
+            f"# 生成日時: {self.timestamp()}\n",
+            f"# 単語数: {count}件\n",
+        ]
         if categories:
-            print(f"   対象カテゴリ: {', '.join(categories)}")
+            lines.append(f"# カテゴリ: {', '.join(categories)}\n")
+        lines.append("# 形式: 読み<TAB>単語<TAB>品詞<TAB>説明\n")
+        lines.append("\n")
+        return ''.join(lines)
 
-    def to_txt(self, output_file, categories=None):
-        """タブ区切りテキスト形式で出力"""
-        words = self._get_all_words(categories)
+    def entry(self, word):
+        return _tab_row(word)
 
-        if not words:
-            print("⚠️  出力する単語がありません")
-            return
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write("# IME辞書データ\n")
-            f.write(f"# 生成日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"# 単語数: {len(words)}件\n")
-            if categories:
-                f.write(f"# カテゴリ: {', '.join(categories)}\n")
-            f.write("# 形式: 読み<TAB>単語<TAB>品詞<TAB>説明\n")
-            f.write("\n")
+class MacosTxtFormat(OutputFormat):
+    """macOS日本語入力用テキスト形式（互換性のため残す）"""
 
-            for word in words:
-                f.write(f"{word.get('読み', '')}\t{word.get('単語', '')}\t{word.get('品詞', '名詞')}\t{word.get('説明', '')}\n")
+    label = 'macOS形式'
+    needs_count = True
+    sort_categories = True
 
-        print(f"✅ TXT出力完了: {output_file} ({len(words)}件)")
+    def header(self, count, categories):
+        lines = [
+            "# macOS日本語入力用辞書\n",
+            f"# 生成日時: {self.timestamp()}\n",
+            f"# 単語数: {count}件\n",
+        ]
         if categories:
-            print(f"   対象カテゴリ: {', '.join(categories)}")
+            lines.append(f"# カテゴリ: {', '.join(categories)}\n")
+        lines.append("\n")
+        return ''.join(lines)
 
-    def to_macos_plist(self, output_file, categories=None):
-        """macOS日本語入力用.plist形式で出力"""
-        import xml.etree.ElementTree as ET
-        from xml.dom import minidom
+    def category_header(self, category):
+        return f"\n# {category}\n"
 
-        words = self._get_all_words(categories)
+    def entry(self, word):
+        return _tab_row(word)
 
-        if not words:
-            print("⚠️  出力する単語がありません")
-            return
 
-        # plist XML構造を作成
-        plist = ET.Element('plist', version='1.0')
-        array = ET.SubElement(plist, 'array')
+def _plist_string(value):
+    """plistの<string>要素を1行で返す（従来のminidom整形と同じ出力）"""
+    if value is None or value == '':
+        return '<string/>'
+    # XMLパーサーと同様に改行を正規化してからエスケープ
+    text = str(value).replace('\r\n', '\n').replace('\r', '\n')
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+    if '\n' in text:
+        # 整形後に空行を削除していたため、値の途中の空白だけの行も取り除く
+        lines = text.split('\n')
+        text = '\n'.join([lines[0]] + [line for line in lines[1:-1] if line.strip()] + [lines[-1]])
+    return f'<string>{text}</string>'
 
-        # 各単語をdictエントリに変換
-        for word in words:
-            dict_elem = ET.SubElement(array, 'dict')
 
-            # phrase (変換後の単語)
-            key_phrase = ET.SubElement(dict_elem, 'key')
-            key_phrase.text = 'phrase'
-            string_phrase = ET.SubElement(dict_elem, 'string')
-            string_phrase.text = word.get('単語', '')
+class MacosPlistFormat(OutputFormat):
+    """macOS日本語入力用.plist形式
 
-            # shortcut (読み)
-            key_shortcut = ET.SubElement(dict_elem, 'key')
-            key_shortcut.text = 'shortcut'
-            string_shortcut = ET.SubElement(dict_elem, 'string')
-            string_shortcut.text = word.get('読み', '')
+    文書全体を組み立てず、単語ごとに<dict>要素を直接書き出す。
+    """
 
-        # XML宣言とDOCTYPEを追加してフォーマット
-        xml_str = ET.tostring(plist, encoding='unicode')
+    label = 'macOS plist形式'
 
-        # minidomで整形
-        dom = minidom.parseString(f'<?xml version="1.0" encoding="UTF-8"?>{xml_str}')
-        pretty_xml = dom.toprettyxml(indent='\t', encoding='UTF-8').decode('utf-8')
+    def header(self, count, categories):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">\n'
+            '<plist version="1.0">\n'
+            '\t<array>\n'
+        )
 
-        # 不要な空行を削除
-        lines = [line for line in pretty_xml.split('\n') if line.strip()]
+    def entry(self, word):
+        # phrase (変換後の単語) と shortcut (読み)
+        return (
+            '\t\t<dict>\n'
+            '\t\t\t<key>phrase</key>\n'
+            f"\t\t\t{_plist_string(word.get('単語', ''))}\n"
+            '\t\t\t<key>shortcut</key>\n'
+            f"\t\t\t{_plist_string(word.get('読み', ''))}\n"
+            '\t\t</dict>\n'
+        )
 
-        # DOCTYPE追加
-        final_lines = [
-            '<?xml version="1.0" encoding="UTF-8"?>',
-            '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">'
-        ] + lines[1:]  # XML宣言を除去
+    def footer(self):
+        return '\t</array>\n</plist>'
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(final_lines))
 
-        print(f"✅ macOS plist形式出力完了: {output_file} ({len(words)}件)")
-        if categories:
-            print(f"   対象カテゴリ: {', '.join(categories)}")
+class WindowsFormat(OutputFormat):
+    """Windows IME用形式（BOM付きUTF-16LE）"""
 
-    def to_macos(self, output_file, categories=None):
-        """macOS日本語入力用形式で出力（.plist形式）"""
-        # 拡張子に応じて処理を振り分け
-        if str(output_file).endswith('.plist'):
-            self.to_macos_plist(output_file, categories)
+    label = 'Windows形式'
+    # encoding='utf-16' を使うと自動でBOMが付く
+    encoding = 'utf-16'
+
+    def header(self, count, categories):
+        return (
+            "!Microsoft IME Dictionary Tool\n"
+            "!Version=10.0\n"
+            "!CharSet=UTF-16LE\n"
+            "!Format=<Reading>\t<Word>\t<POS>\t<Comment>\n"
+            "\n"
+        )
+
+    def entry(self, word):
+        reading, reading_windows, surface, pos, description, _, _ = _entry_fields(word)
+        # Windows用読みが設定されていればそれを使用、なければ通常の読みを使用
+        return f"{reading_windows or reading}\t{surface}\t{map_pos_for_windows(pos)}\t{description}\n"
+
+
+# 出力形式名と形式クラスの対応
+FORMATS = {
+    'csv': CsvFormat,
+    'txt': TxtFormat,
+    'macos_txt': MacosTxtFormat,
+    'macos_plist': MacosPlistFormat,
+    'windows': WindowsFormat,
+}
+
+
+def _imported_word(reading, word, pos=None, description='', tags=(), reading_windows=''):
+    """取り込んだ項目から単語を作成（空の任意項目は省く）"""
+    entry = {'読み': reading}
+    if reading_windows:
+        entry['読み_Windows'] = reading_windows
+    entry['単語'] = word
+    if pos:
+        entry['品詞'] = pos
+    if description:
+        entry['説明'] = description
+    if tags:
+        entry['タグ'] = list(tags)
+    return entry
+
+
+class Importer:
+    """取り込み形式の基底クラス（出力形式から辞書JSONへの逆変換）
+
+    iter_words() はファイル全体を読み込まずに (カテゴリ名, 単語) を1件ずつ返す。
+    カテゴリの情報がない形式では default_category を使う。
+    出力形式が持たない情報（タグ・カテゴリなど）は復元できないが、取り込んだ辞書を
+    同じ形式で出力し直すと元のファイルと同じ内容になる。
+    """
+
+    label = ''
+
+    def __init__(self, default_category):
+        self.default_category = default_category
+
+    def iter_words(self, input_file):
+        raise NotImplementedError
+
+
+class CsvImporter(Importer):
+    """CSV形式（CsvFormat の出力）の取り込み"""
+
+    label = 'CSV'
+    HEADER = ['読み', '読み_Windows', '単語', '品詞', '説明', 'タグ', 'カテゴリ']
+
+    def iter_words(self, input_file):
+        with open(input_file, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            if next(reader, None) != self.HEADER:
+                raise Exception(f"CSVの見出しが正しくありません（{','.join(self.HEADER)} が必要）: {input_file}")
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) != len(self.HEADER):
+                    raise Exception(f"CSVの{reader.line_num}行目の列数が正しくありません: {input_file}")
+                reading, reading_windows, word, pos, description, tags, category = row
+                # タグは ; 区切りで出力しているため、; を含むタグは分割される
+                yield category or self.default_category, _imported_word(
+                    reading, word, pos, description, [tag for tag in tags.split(';') if tag], reading_windows)
+
+
+class WindowsImporter(Importer):
+    """Windows IME用形式（WindowsFormat の出力・Microsoft IMEのテキスト形式）の取り込み
+
+    ! で始まる行は見出しとして読み飛ばす。BOMがなければUTF-16LEとして読む。
+    読みは「読み」に、品詞はWindowsの品詞名のまま取り込む（出力し直すと同じ品詞になる）。
+    """
+
+    label = 'Windows形式'
+
+    @staticmethod
+    def _encoding(input_file):
+        with open(input_file, 'rb') as f:
+            bom = f.read(2)
+        return 'utf-16' if bom in (b'\xff\xfe', b'\xfe\xff') else 'utf-16-le'
+
+    def iter_words(self, input_file):
+        with open(input_file, 'r', encoding=self._encoding(input_file)) as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.rstrip('\n')
+                if not line or line.startswith('!'):
+                    continue
+                # 説明にはタブが含まれることがあるため、4列目以降はまとめる
+                fields = line.split('\t', 3)
+                if len(fields) < 2:
+                    raise Exception(f"{line_number}行目の形式が正しくありません: {input_file}")
+                fields += [''] * (4 - len(fields))
+                reading, word, pos, description = fields
+                yield self.default_category, _imported_word(reading, word, pos, description)
+
+
+class MacosPlistImporter(Importer):
+    """macOS日本語入力用.plist形式（MacosPlistFormat の出力）の取り込み
+
+    iterparse で <dict> 要素ごとに読み、処理した要素は親から取り除いて
+    メモリ使用量を一定に保つ。phrase を「単語」、shortcut を「読み」にする。
+    """
+
+    label = 'macOS plist形式'
+
+    def iter_words(self, input_file):
+        import xml.etree.ElementTree as ET
+
+        parents = []
+        try:
+            for event, element in ET.iterparse(str(input_file), events=('start', 'end')):
+                if event == 'start':
+                    parents.append(element)
+                    continue
+                parents.pop()
+                if element.tag != 'dict':
+                    continue
+                children = list(element)
+                values = {}
+                for key, value in zip(children[::2], children[1::2]):
+                    if key.tag == 'key' and value.tag == 'string':
+                        values[key.text or ''] = value.text or ''
+                if 'phrase' in values or 'shortcut' in values:
+                    yield self.default_category, _imported_word(values.get('shortcut', ''), values.get('phrase', ''))
+                if parents:
+                    # 取り込んだ要素を親から取り除く（ツリーを保持しない）
+                    parents[-1].clear()
+        except ET.ParseError as e:
+            raise Exception(f"plistの解析に失敗: {e}: {input_file}")
+
+
+# 取り込み形式名と取り込みクラスの対応
+IMPORTERS = {
+    'csv': CsvImporter,
+    'windows': WindowsImporter,
+    'macos_plist': MacosPlistImporter,
+}
+
+# 取り込み時にカテゴリごとの単語をメモリ上に保持する上限（超えたらディスクに書き出す）
+IMPORT_SPOOL_SIZE = 1024 * 1024
+
+
+def import_dictionary(format_name, input_files, output_file, category=None, generated_at=None):
+    """出力形式のファイルを辞書JSONに変換し、単語数を返す
+
+    単語はカテゴリごとに一時ファイルへ書き出してから、カテゴリが最初に現れた順に
+    まとめて出力するため、入力の大きさによらずメモリ使用量は一定に収まる。
+    category を省略すると、カテゴリの情報がない形式では入力ファイル名をカテゴリ名にする。
+    """
+    importer_class = IMPORTERS[format_name]
+    input_files = [Path(path) for path in input_files]
+    spools = {}
+    try:
+        for input_file in input_files:
+            if not input_file.is_file():
+                raise Exception(f"取り込むファイルが見つかりません: {input_file}")
+            importer = importer_class(category or input_file.stem)
+            for cat_name, word in importer.iter_words(input_file):
+                spool = spools.get(cat_name)
+                if spool is None:
+                    spool = spools[cat_name] = _spooled_text(IMPORT_SPOOL_SIZE)
+                spool.write(_json_value(word) + '\n')
+
+        def spooled_words(spool):
+            spool.seek(0)
+            for line in spool:
+                yield json.loads(line)
+
+        categories = ((cat_name, {'説明': '', '有効': True}, spooled_words(spool)) for cat_name, spool in spools.items())
+        top_level = {
+            '辞書情報': {
+                '名前': input_files[0].stem if len(input_files) == 1 else '取り込んだ辞書',
+                '説明': f"{importer_class.label}から取り込み",
+                '更新日': (generated_at or datetime.now()).strftime('%Y-%m-%d'),
+            },
+            'カテゴリ': {},
+        }
+        return write_dictionary_json(output_file, categories, lambda: top_level)
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+
+def segment_encoding(fmt):
+    """本文断片のエンコーディング（出力ファイルのエンコーディングからBOMを除いたもの）"""
+    if fmt.encoding == 'utf-8-sig':
+        return 'utf-8'
+    if fmt.encoding == 'utf-16':
+        return 'utf-16-le' if sys.byteorder == 'little' else 'utf-16-be'
+    return fmt.encoding
+
+
+def encode_segments(format_names, category, entries, paths):
+    """単語を各形式の本文断片ファイルに変換
+
+    断片は出力ファイルと同じエンコーディング・改行コードのバイト列で書き出すため、
+    OutputWriter.write_segment() でそのまま連結できる。書き込み途中の断片が
+    キャッシュとして使われないよう、一時ファイルに書いてから置き換える。
+    """
+    for name, path in zip(format_names, paths):
+        fmt = FORMATS[name]()
+        temp_path = Path(f"{path}.{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding=segment_encoding(fmt), newline=fmt.newline) as f:
+            write = fmt.entry_writer(f)
+            for entry in entries:
+                write(WordView(entry, category))
+        os.replace(temp_path, path)
+    return paths
+
+
+def segment_cache_key(format_name, category, entries):
+    """本文断片キャッシュのキー（形式・カテゴリ名・単語リストの内容から算出）"""
+    fmt = FORMATS[format_name]
+    digest = hashlib.sha256()
+    for part in (format_name, str(fmt.version), fmt.encoding, repr(fmt.newline), category):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(json.dumps(entries, ensure_ascii=False, sort_keys=True, default=dict).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SegmentMemo:
+    """前回の変換のシャードと本文断片を保持し、変更のないシャードの変換を省く（監視モード用）
+
+    シャードはカテゴリ名とカテゴリ内の番号で前回のものと対応付け、単語リストが
+    前回と等しければ前回の断片をそのまま使う。内容のハッシュを計算しないため、
+    変更の有無は新しく読み込んだ単語と保持している単語の比較だけで決まる。
+    断片は自身の一時ディレクトリに作成し、使われなくなったものは削除する。
+    """
+
+    def __init__(self):
+        self._temp_dir = tempfile.TemporaryDirectory(prefix='ime-dict-segments-')
+        self.segment_dir = Path(self._temp_dir.name)
+        # (カテゴリ名, カテゴリ内の番号) -> (形式名のタプル, 単語リスト, 断片のパス)
+        self._shards = {}
+        self._next_shards = {}
+        self._ids = count()
+
+    def paths_for(self, key, format_names, entries):
+        """シャードの断片のパス（前回と同じ単語リストなら前回の断片）"""
+        previous = self._shards.get(key)
+        if previous is not None and previous[0] == tuple(format_names) and previous[1] == entries:
+            paths = previous[2]
         else:
-            # 従来のテキスト形式（互換性のため残す）
-            words = self._get_all_words(categories)
+            shard_id = next(self._ids)
+            paths = [self.segment_dir / f"{shard_id}_{name}.seg" for name in format_names]
+        self._next_shards[key] = (tuple(format_names), entries, paths)
+        return paths
+
+    @staticmethod
+    def _remove_unused(shards, used_shards):
+        used = {path for _names, _entries, paths in used_shards.values() for path in paths}
+        for _names, _entries, paths in shards.values():
+            for path in paths:
+                if path not in used:
+                    path.unlink(missing_ok=True)
+
+    def commit(self):
+        """今回の変換のシャードを保持し、使われなくなった断片を削除"""
+        self._remove_unused(self._shards, self._next_shards)
+        self._shards, self._next_shards = self._next_shards, {}
+
+    def rollback(self):
+        """失敗した変換のシャードを破棄（前回の状態を保つ）"""
+        self._remove_unused(self._next_shards, self._shards)
+        self._next_shards = {}
+
+    def close(self):
+        self._shards = {}
+        self._temp_dir.cleanup()
+
+
+class _ListWriter:
+    """write() された文字列をリストに追加するファイル風オブジェクト"""
+
+    __slots__ = ('write',)
+
+    def __init__(self, lines):
+        self.write = lines.append
+
+
+class OutputWriter:
+    """1つの出力ファイルへ単語を順に書き込む
+
+    最初の単語を受け取るまでファイルを作成しない。単語数が必要な形式や
+    カテゴリを並べ替える形式では、本文をカテゴリごとに一時ファイルへ
+    書き出しておき close() でまとめて出力する（一時ファイルへは BATCH_SIZE 件ずつ
+    まとめて書き込む）。
+    単語の代わりに encode_segments() で作成した本文断片を受け取ることもできる。
+    ordered=True の場合（--sort で並べ替えた単語）は受け取った順のまま出力し、
+    カテゴリごとにまとめ直さない（カテゴリの見出しも付けない）。
+    """
+
+    # バッファする形式で一時ファイルへまとめて書き込む単語数
+    BATCH_SIZE = 1000
+
+    def __init__(self, fmt, output_file, categories=None, ordered=False):
+        self.fmt = fmt
+        self.output_file = output_file
+        self.categories = categories
+        self.ordered = ordered
+        self.count = 0
+        self._buffered = fmt.needs_count or fmt.sort_categories
+        # カテゴリ名 -> 本文（一時ファイルまたは断片ファイルのパス）のリスト
+        self._sections = {}
+        # 一時ファイルへまだ書き込んでいない self._category の本文
+        self._batch = []
+        self._write_batch = fmt.entry_writer(_ListWriter(self._batch))
+        self._write_file = None
+        self._file = None
+        self._category = None
+
+    def _open(self):
+        return open(self.output_file, 'w', encoding=self.fmt.encoding, newline=self.fmt.newline)
+
+    def _start_category(self, category):
+        """バッファしない形式で、ヘッダーとカテゴリ見出しを必要に応じて書き込む"""
+        if self._file is None:
+            self._file = self._open()
+            self._file.write(self.fmt.header(None, self.categories))
+            self._write_file = self.fmt.entry_writer(self._file)
+        if category != self._category and not self.ordered:
+            self._category = category
+            self._file.write(self.fmt.category_header(category))
+
+    def _copy_part(self, part):
+        """本文を出力ファイルへ連結"""
+        if isinstance(part, Path):
+            # 断片ファイルはエンコード済みなのでバイト列のまま連結
+            self._file.flush()
+            with open(part, 'rb') as f:
+                shutil.copyfileobj(f, self._file.buffer)
+        else:
+            part.seek(0)
+            shutil.copyfileobj(part, self._file)
 
-            if not words:
+    def _flush_batch(self):
+        """まとめておいた本文をカテゴリの一時ファイルへ書き込む"""
+        if not self._batch:
+            return
+        parts = self._sections.get(self._category)
+        if parts is None or isinstance(parts[-1], Path):
+            parts = self._sections.setdefault(self._category, [])
+            parts.append(_spooled_text())
+        parts[-1].write(''.join(self._batch))
+        self._batch.clear()
+
+    def write(self, word):
+        """単語を1件書き込む"""
+        category = None if self.ordered else word.get('カテゴリ', '')
+        if self._buffered:
+            if category != self._category:
+                self._flush_batch()
+                self._category = category
+            self._write_batch(word)
+            if len(self._batch) >= self.BATCH_SIZE:
+                self._flush_batch()
+        else:
+            self._start_category(category)
+            self._write_file(word)
+        self.count += 1
+
+    def write_segment(self, category, path, count):
+        """encode_segments() で作成した本文断片を書き込む"""
+        if count == 0:
+            return
+        if self._buffered:
+            self._flush_batch()
+            self._sections.setdefault(category, []).append(Path(path))
+        else:
+            self._start_category(category)
+            self._copy_part(Path(path))
+        self.count += count
+
+    def close(self, quiet=False):
+        """出力を完了する（単語がなければファイルを作成しない。quiet=True なら結果を表示しない）"""
+        if self.count == 0:
+            self.abort()
+            if not quiet:
                 print("⚠️  出力する単語がありません")
+            return
+        self.finish()
+        if quiet:
+            return
+        print(f"✅ {self.fmt.label}出力完了: {self.output_file} ({self.count}件)")
+        if self.categories:
+            print(f"   対象カテゴリ: {', '.join(self.categories)}")
+
+    def finish(self):
+        """出力ファイルを書き終える（close() と違い結果を表示しない。単語が1件以上あること）"""
+        try:
+            if self._buffered:
+                self._flush_batch()
+                self._file = self._open()
+                self._file.write(self.fmt.header(self.count, self.categories))
+                order = sorted(self._sections) if self.fmt.sort_categories and not self.ordered else self._sections
+                for category in order:
+                    if category is not None:
+                        self._file.write(self.fmt.category_header(category))
+                    for part in self._sections[category]:
+                        self._copy_part(part)
+            self._file.write(self.fmt.footer())
+        finally:
+            self.abort()
+
+    def size(self):
+        """出力したファイルのバイト数（close() の後に使う）"""
+        return os.path.getsize(self.output_file) if self.count else 0
+
+    def abort(self):
+        """開いているファイルと一時ファイルを閉じる"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._write_file = None
+        for parts in self._sections.values():
+            for part in parts:
+                if not isinstance(part, Path):
+                    part.close()
+        self._sections = {}
+        self._batch.clear()
+
+
+SHARD_MANIFEST_SUFFIX = '.shards.json'
+
+
+def shard_path(output_file, number):
+    """分割出力のファイル名（例: dictionary.csv -> dictionary.001.csv）"""
+    output_file = Path(output_file)
+    return output_file.with_name(f"{output_file.stem}.{number:03d}{output_file.suffix}")
+
+
+def _file_sha256(path):
+    """ファイルの SHA-256（16進数）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ShardedWriter:
+    """単語数の上限ごとに番号付きのファイルへ分けて書き込む（OutputWriter と同じ使い方）
+
+    各ファイルはそれぞれのヘッダー・件数を持つ完全な出力になる。上限に達したファイルの
+    書き終えとハッシュの計算は executor（ThreadPoolExecutor）で並行に行い、その間も
+    次のファイルへの書き込みを続ける。close() で分割したファイルの一覧とハッシュを
+    <出力ファイル>.shards.json に保存し、前回の出力で不要になったファイルを削除する。
+    """
+
+    def __init__(self, format_name, fmt, output_file, categories, shard_size, executor, max_pending=2,
+                 ordered=False):
+        self.format_name = format_name
+        self.ordered = ordered
+        self.fmt = fmt
+        self.output_file = Path(output_file)
+        self.manifest_file = self.output_file.with_name(self.output_file.name + SHARD_MANIFEST_SUFFIX)
+        self.categories = categories
+        self.shard_size = shard_size
+        self.count = 0
+        self._executor = executor
+        # 書き終えを待つファイルの数の上限（書き込みが先行しすぎて一時ファイルがたまらないように）
+        self._max_pending = max_pending
+        self._writer = None
+        self._number = 0
+        # 書き終えを待っているファイルの Future（完了すると shards.json の1項目を返す）
+        self._pending = deque()
+        self._shards = []
+
+    def write(self, word):
+        """単語を1件書き込む（上限に達したら次のファイルへ）"""
+        writer = self._writer
+        if writer is None or writer.count >= self.shard_size:
+            writer = self._next_shard()
+        writer.write(word)
+        self.count += 1
+
+    def _next_shard(self):
+        """書き込み中のファイルを executor に渡し、次のファイルを開く"""
+        if self._writer is not None:
+            self._submit(self._writer)
+        self._number += 1
+        self._writer = OutputWriter(self.fmt, shard_path(self.output_file, self._number), self.categories,
+                                    ordered=self.ordered)
+        return self._writer
+
+    def _submit(self, writer):
+        self._pending.append(self._executor.submit(self._finish_shard, writer))
+        while len(self._pending) > self._max_pending:
+            self._shards.append(self._pending.popleft().result())
+
+    @staticmethod
+    def _finish_shard(writer):
+        writer.finish()
+        path = Path(writer.output_file)
+        return {'file': path.name, 'count': writer.count, 'bytes': path.stat().st_size,
+                'sha256': _file_sha256(path)}
+
+    def close(self, quiet=False):
+        """残りのファイルを書き終え、shards.json を保存（quiet=True なら結果を表示しない）"""
+        if self.count == 0:
+            self.abort()
+            if not quiet:
+                print("⚠️  出力する単語がありません")
+            return
+        self._submit(self._writer)
+        self._writer = None
+        while self._pending:
+            self._shards.append(self._pending.popleft().result())
+
+        previous = []
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                previous = [shard['file'] for shard in json.load(f)['shards']]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump({'format': self.format_name, 'shard_size': self.shard_size, 'count': self.count,
+                       'shards': self._shards}, f, ensure_ascii=False, indent=2)
+        current = {shard['file'] for shard in self._shards}
+        for name in previous:
+            if name not in current:
+                self.manifest_file.with_name(name).unlink(missing_ok=True)
+
+        if quiet:
+            return
+        print(f"✅ {self.fmt.label}出力完了: {self.manifest_file} ({self.count}件、{len(self._shards)}ファイル)")
+        if self.categories:
+            print(f"   対象カテゴリ: {', '.join(self.categories)}")
+
+    def abort(self):
+        """書き込み中のファイルを閉じ、書き終えを待っているファイルを待つ"""
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+        while self._pending:
+            self._pending.popleft().exception()
+
+    def size(self):
+        """分割したファイルの合計バイト数（close() の後に使う）"""
+        return sum(shard['bytes'] for shard in self._shards)
+
+
+# 単語リストがないカテゴリを表す（空の単語リストと区別する）
+class _MissingWordList(tuple):
+    pass
+
+
+MISSING_WORD_LIST = _MissingWordList()
+
+# 既定のスキーマファイル（data/schema.json）
+DEFAULT_SCHEMA_FILE = Path(__file__).resolve().parent.parent.parent / 'data' / 'schema.json'
+
+_JSON_TYPES = {
+    'string': lambda value: isinstance(value, str),
+    'boolean': lambda value: isinstance(value, bool),
+    'object': lambda value: isinstance(value, Mapping),
+    'array': lambda value: isinstance(value, (list, tuple)),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+_JSON_TYPE_NAMES = {
+    'string': '文字列', 'boolean': '真偽値', 'object': 'オブジェクト', 'array': '配列',
+    'number': '数値', 'integer': '整数', 'null': 'null',
+}
+
+
+def json_path(parent, key):
+    """JSONパスを1段階伸ばす（例: $.カテゴリ.記号.単語リスト[0]）"""
+    if isinstance(key, int):
+        return f"{parent}[{key}]"
+    if re.search(r'[.\[\]"\s]', key) or not key:
+        return f"{parent}[{json.dumps(key, ensure_ascii=False)}]"
+    return f"{parent}.{key}"
+
+
+class CompiledSchema:
+    """JSONスキーマの1ノードを検証関数にコンパイルしたもの
+
+    対応キーワード: type, enum, properties, patternProperties,
+    additionalProperties, required, items（その他は無視）。
+    is_valid(value) はそのノードで必要な検査だけを行い真偽値を返す高速な関数、
+    validate(value, path, errors) はエラーを (JSONパス, メッセージ) として
+    errors に追加する関数。大量の単語はまず is_valid で検査し、不正な
+    ものだけ validate でエラー箇所を調べる。
+    """
+
+    def __init__(self, schema):
+        types = schema.get('type')
+        if isinstance(types, str):
+            types = [types]
+        self.types = types
+        self.properties = {key: CompiledSchema(sub) for key, sub in schema.get('properties', {}).items()}
+        self.patterns = [(re.compile(pattern), CompiledSchema(sub))
+                         for pattern, sub in schema.get('patternProperties', {}).items()]
+        additional = schema.get('additionalProperties', True)
+        self.additional = CompiledSchema(additional) if isinstance(additional, dict) else additional
+        self.required = tuple(schema.get('required', ()))
+        self.items = CompiledSchema(schema['items']) if isinstance(schema.get('items'), dict) else None
+        self.enum = schema.get('enum')
+        self.validate = self._compile()
+        self.is_valid = self._compile_is_valid()
+
+    def member_schemas(self, key):
+        """オブジェクトのキーに適用されるスキーマのリスト"""
+        if key in self.properties and not self.patterns:
+            return [self.properties[key]]
+        schemas = []
+        if key in self.properties:
+            schemas.append(self.properties[key])
+        for pattern, schema in self.patterns:
+            if pattern.search(key):
+                schemas.append(schema)
+        if not schemas and isinstance(self.additional, CompiledSchema):
+            schemas.append(self.additional)
+        return schemas
+
+    def check_type(self, value, path, errors):
+        """型だけを検査（一致すれば True）"""
+        if self.types is None or any(_JSON_TYPES[name](value) for name in self.types if name in _JSON_TYPES):
+            return True
+        expected = '・'.join(_JSON_TYPE_NAMES.get(name, name) for name in self.types)
+        errors.append((path, f"{expected}である必要があります（{type(value).__name__}）"))
+        return False
+
+    def check_member(self, key, value, path, errors):
+        """オブジェクトの1項目を検査"""
+        schemas = self.member_schemas(key)
+        if not schemas and self.additional is False:
+            errors.append((path, f"未定義の項目 '{key}' があります"))
+        for schema in schemas:
+            schema.validate(value, json_path(path, key), errors)
+
+    def check_required(self, keys, path, errors):
+        """必須項目がそろっているか検査"""
+        for key in self.required:
+            if key not in keys:
+                errors.append((path, f"必須項目 '{key}' がありません"))
+
+    def _compile(self):
+        """このノードに必要な検査だけを並べた検証関数を作成"""
+        checks = []
+        if self.types is not None:
+            checks.append(self.check_type)
+        if self.enum is not None:
+            enum = self.enum
+
+            def check_enum(value, path, errors):
+                if value not in enum:
+                    errors.append((path, f"{enum} のいずれかである必要があります（{value!r}）"))
+                    return False
+                return True
+            checks.append(check_enum)
+
+        has_members = self.properties or self.patterns or self.additional is not True
+        if self.required or has_members:
+            required = self.required
+            check_member = self.check_member
+
+            def check_object(value, path, errors):
+                if not isinstance(value, Mapping):
+                    return True
+                for key in required:
+                    if key not in value:
+                        errors.append((path, f"必須項目 '{key}' がありません"))
+                if has_members:
+                    for key, member in value.items():
+                        check_member(key, member, path, errors)
+                return True
+            checks.append(check_object)
+
+        if self.items is not None:
+            item_validate = self.items.validate
+
+            def check_items(value, path, errors):
+                if isinstance(value, (list, tuple)):
+                    for i, item in enumerate(value):
+                        item_validate(item, f"{path}[{i}]", errors)
+                return True
+            checks.append(check_items)
+
+        def validate(value, path, errors):
+            for check in checks:
+                # 型が違う場合はそれ以上の検査をしない
+                if check(value, path, errors) is False:
+                    return
+        return validate
+
+    def _compile_is_valid(self):
+        """このノードに必要な検査だけを並べた判定関数を作成"""
+        checks = []
+        if self.types is not None:
+            type_checks = [_JSON_TYPES[name] for name in self.types if name in _JSON_TYPES]
+            if len(type_checks) == 1:
+                checks.append(type_checks[0])
+            else:
+                checks.append(lambda value: any(check(value) for check in type_checks))
+        if self.enum is not None:
+            enum = self.enum
+            checks.append(lambda value: value in enum)
+
+        if self.required or self.properties or self.patterns or self.additional is not True:
+            required = self.required
+            properties = {key: schema.is_valid for key, schema in self.properties.items()}
+            simple = not self.patterns and self.additional is True
+            member_schemas = self.member_schemas
+            additional = self.additional
+
+            def is_valid_object(value):
+                if not isinstance(value, Mapping):
+                    return True
+                for key in required:
+                    if key not in value:
+                        return False
+                for key, member in value.items():
+                    if simple:
+                        check = properties.get(key)
+                        if check is not None and not check(member):
+                            return False
+                        continue
+                    schemas = member_schemas(key)
+                    if not schemas and additional is False:
+                        return False
+                    for schema in schemas:
+                        if not schema.is_valid(member):
+                            return False
+                return True
+            checks.append(is_valid_object)
+
+        if self.items is not None:
+            item_is_valid = self.items.is_valid
+            checks.append(lambda value: not isinstance(value, (list, tuple))
+                          or all(item_is_valid(item) for item in value))
+
+        if not checks:
+            return lambda value: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda value: all(check(value) for check in checks)
+
+
+class SchemaValidator:
+    """辞書データをスキーマで検証する
+
+    validate_document() はデータ全体を検証する。iter_validated() は
+    DictionaryConverter._iter_categories() の結果を単語1件ずつ検証しながら
+    そのまま返すため、ストリーム変換と同時に検証できる。
+    """
+
+    def __init__(self, schema):
+        self.root = CompiledSchema(schema)
+        self.errors = []
+
+    @classmethod
+    def from_file(cls, schema_file=None):
+        """スキーマファイルから作成（既定は data/schema.json）"""
+        with open(schema_file or DEFAULT_SCHEMA_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def validate_document(self, data):
+        """データ全体を検証してエラーのリストを返す"""
+        errors = []
+        if not self.root.is_valid(data):
+            self.root.validate(data, '$', errors)
+        self.errors.extend(errors)
+        return errors
+
+    def iter_validated(self, categories, top_level):
+        """(カテゴリ名, カテゴリ情報, 単語リスト) を検証しながら返す
+
+        top_level は最上位の項目（辞書情報・カテゴリなど）を返す関数で、
+        ストリームモードでは走査が終わるまで確定しないため最後に呼び出して検証する。
+        カテゴリの項目も、単語リストより後の項目が確定するよう次のカテゴリへ進んでから検証する。
+        """
+        errors = self.errors
+        root = self.root
+        category_schemas = root.member_schemas('カテゴリ')
+        category_path = json_path('$', 'カテゴリ')
+        pending = None
+        for cat_name, cat_data, words in categories:
+            if pending is not None:
+                self._check_category(*pending)
+            path = json_path(category_path, cat_name)
+            schemas = [schema for parent in category_schemas for schema in parent.member_schemas(cat_name)]
+            schemas = [schema for schema in schemas if schema.check_type(cat_data, path, errors)]
+            pending = (schemas, cat_data, words is not MISSING_WORD_LIST, path)
+            word_list_schemas = [item for schema in schemas for item in schema.member_schemas('単語リスト')]
+
+            words_path = json_path(path, '単語リスト')
+            if words is not MISSING_WORD_LIST and not _is_word_list(words):
+                # 配列でない単語リストは型のエラーだけにして、1文字ずつなどには辿らない
+                for schema in word_list_schemas:
+                    schema.check_type(words, words_path, errors)
+                yield cat_name, cat_data, ()
+                continue
+            item_schemas = []
+            for schema in word_list_schemas:
+                if isinstance(words, (list, tuple)) and not schema.check_type(words, words_path, errors):
+                    continue
+                if schema.items is not None:
+                    item_schemas.append(schema.items)
+            yield cat_name, cat_data, self._validated_words(words, words_path, item_schemas)
+        if pending is not None:
+            self._check_category(*pending)
+
+        # 最上位の項目
+        data = top_level()
+        if not root.check_type(data, '$', errors):
+            return
+        root.check_required(data, '$', errors)
+        for key, value in data.items():
+            if key != 'カテゴリ':
+                root.check_member(key, value, '$', errors)
+            else:
+                for schema in category_schemas:
+                    schema.check_type(value, category_path, errors)
+
+    def _check_category(self, schemas, cat_data, has_words, path):
+        """カテゴリの必須項目と単語リスト以外の項目を検証"""
+        keys = set(cat_data)
+        if has_words:
+            keys.add('単語リスト')
+        for schema in schemas:
+            schema.check_required(keys, path, self.errors)
+            for key, value in cat_data.items():
+                if key != '単語リスト':
+                    schema.check_member(key, value, path, self.errors)
+
+    def _validated_words(self, words, path, item_schemas):
+        errors = self.errors
+        for i, word in enumerate(words):
+            for schema in item_schemas:
+                if not schema.is_valid(word):
+                    schema.validate(word, f"{path}[{i}]", errors)
+            yield word
+
+    def report(self, limit=None):
+        """検証結果を表示（エラー件数を返す）"""
+        if not self.errors:
+            print("✅ スキーマ検証: エラーはありません")
+            return 0
+        print(f"❌ スキーマ検証: {len(self.errors)}件のエラー")
+        for path, message in self.errors[:limit]:
+            print(f"  {path}: {message}")
+        if limit is not None and len(self.errors) > limit:
+            print(f"  ...ほか{len(self.errors) - limit}件")
+        return len(self.errors)
+
+
+class StageProfiler:
+    """処理段階ごとの計測結果を集めるフック
+
+    DictionaryConverter のフックとして登録すると、各段階の終了時に
+    記録（辞書）を受け取る。記録の項目:
+      stage: 段階名（load, read, format:csv, convert, stats など）
+      seconds: 経過時間（秒）
+      entries / entries_per_sec: 処理した単語数と1秒あたりの単語数
+      bytes: 読み込み・書き込みしたバイト数
+      peak_memory: tracemalloc によるピークメモリ（計測していなければ None）
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    COLUMNS = [('段階', 20), ('時間(秒)', 10), ('単語数', 10), ('単語/秒', 12), ('バイト数', 12), ('ピークメモリ', 14)]
+
+    @staticmethod
+    def _pad(text, width, left=False):
+        """全角文字を2桁として幅を揃える"""
+        display = sum(2 if unicodedata.east_asian_width(c) in 'WF' else 1 for c in text)
+        space = ' ' * max(0, width - display)
+        return text + space if left else space + text
+
+    def report(self):
+        """計測結果を表で表示"""
+        print("⏱️  処理段階ごとの計測")
+        print('  ' + ''.join(self._pad(name, width, i == 0) for i, (name, width) in enumerate(self.COLUMNS)))
+        for record in self.records:
+            peak = record['peak_memory']
+            cells = [
+                record['stage'],
+                f"{record['seconds']:.3f}",
+                '-' if record['entries'] is None else str(record['entries']),
+                '-' if record['entries_per_sec'] is None else f"{record['entries_per_sec']:.0f}",
+                '-' if record['bytes'] is None else str(record['bytes']),
+                '-' if peak is None else f"{peak / (1024 * 1024):.1f}MiB",
+            ]
+            print('  ' + ''.join(self._pad(cell, width, i == 0)
+                                 for i, (cell, (_, width)) in enumerate(zip(cells, self.COLUMNS))))
+
+    def json_lines(self):
+        """計測結果を1行1記録のJSONで返す"""
+        return [json.dumps(record, ensure_ascii=False) for record in self.records]
+
+
+class DictionaryWatcher:
+    """辞書ファイルの変更を更新日時とサイズのポーリングで検出
+
+    変更を検出した後も debounce 秒の間ファイルが変わらなくなるまで待つため、
+    連続した保存や書き込み途中のファイルは1回の変更として扱われる。
+    保存中にファイルが一時的になくなった場合も、再び作成されるまで待つ。
+    path にパスのリストを指定すると、いずれかのファイルの変更を検出する。
+    optional のファイル（変更ジャーナルなど）はなくてもよく、作成・削除も変更として扱う。
+    """
+
+    def __init__(self, path, interval=1.0, debounce=0.5, sleep=time.sleep, optional=()):
+        self.paths = [Path(p) for p in path] if isinstance(path, (list, tuple)) else [Path(path)]
+        self.optional = [Path(p) for p in optional]
+        self.interval = interval
+        self.debounce = debounce
+        self._sleep = sleep
+        self.signature = self._signature()
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _signature(self):
+        return tuple(self._stat(path) for path in self.paths + self.optional)
+
+    def wait(self):
+        """次の変更が落ち着くまで待ち、ファイルごとの (更新日時, サイズ) のタプルを返す"""
+        signature = self.signature
+        while signature == self.signature:
+            self._sleep(self.interval)
+            signature = self._signature()
+        while True:
+            self._sleep(self.debounce)
+            latest = self._signature()
+            if latest == signature and None not in latest[:len(self.paths)]:
+                break
+            signature = latest
+        self.signature = signature
+        return signature
+
+    def __iter__(self):
+        while True:
+            yield self.wait()
+
+
+# 単語リストの内容のハッシュ用（キーの順によらず同じ単語は同じ文字列になる）
+_json_sorted = json.JSONEncoder(ensure_ascii=False, sort_keys=True).encode
+
+
+def _summarizing(words, summary):
+    """単語をそのまま返しながら、件数と内容のハッシュ（SHA-256）を summary の 'count'・'hash' に集計"""
+    digest = hashlib.sha256()
+    for word in words:
+        digest.update(_json_sorted(dict(word.items()) if isinstance(word, Mapping) else word).encode('utf-8'))
+        digest.update(b'\n')
+        summary['count'] += 1
+        yield word
+    summary['hash'] = digest.hexdigest()
+
+
+def _summarize_words(words):
+    """単語リストの件数と内容のハッシュ（SHA-256）"""
+    summary = {'count': 0}
+    for _ in _summarizing(words, summary):
+        pass
+    return summary['count'], summary['hash']
+
+
+def _count_words(words):
+    """単語リストの件数（リストなら読み進めずに数える）"""
+    if isinstance(words, Sequence):
+        return len(words)
+    return sum(1 for _ in words)
+
+
+class DictionaryConverter:
+    # 複数の入力の併合方法（concat: 入力の順に連結、sorted: 読みの順に並んだ入力を読みの順に併合）
+    MERGE_MODES = ('concat', 'sorted')
+
+    def __init__(self, json_file, stream=False, compact=True, validator=None, hooks=None, snapshot=True,
+                 merge='concat', load_jobs=None, journal=True, manifest=True):
+        """辞書変換器を初期化
+
+        stream=True の場合は単語リストを読み込まず、変換時にファイルから
+        1件ずつ読み込む（巨大な辞書向け）。
+        compact=True の場合は単語を CompactEntry として読み込み、メモリ使用量を抑える。
+        validator に SchemaValidator を指定すると、辞書を走査するたびに
+        単語を検証し、エラーを validator.errors に追加する。
+        hooks には処理段階ごとの計測結果（StageProfiler を参照）を受け取る
+        関数のリストを指定する。後から add_hook() で追加することもできる。
+        json_file の拡張子が .sqlite / .sqlite3 / .db の場合は辞書データベース
+        （DictionaryStore）として開き、単語をカーソルから1件ずつ読み込む。
+        snapshot=True の場合、JSONから作成した最新のスナップショット
+        （DictionarySnapshot）があればJSONの代わりに読み込む。単語リストは
+        参照したカテゴリだけ復元する（ストリームモードでは復元した単語を保持しない）。
+        json_file にパスのリストを指定すると、各辞書をスレッドプール（load_jobs 並列）で
+        読み込み、カテゴリを併合した1つの辞書として扱う（_iter_merged_categories() を参照）。
+        merge='sorted' の場合、各辞書の単語リストが読みの順に並んでいるものとして
+        読みの順に併合する（ストリームモードでは全体をメモリに読み込まずに併合できる）。
+        journal=True の場合、JSONファイルの変更履歴（ChangeJournal）があれば
+        読み込んだ辞書の上に再生する（ストリームモードでは走査のたびに再生する）。
+        manifest=True の場合、変更ジャーナルのないJSONファイル1つを読み込んだときに、
+        マニフェスト（DictionaryManifest）が古ければ、JSONを読み込んだ直後か、
+        ストリームモードでは最初に辞書を最後まで走査したときに作り直す。
+        """
+        if merge not in self.MERGE_MODES:
+            raise Exception(f"併合方法が正しくありません: {merge}")
+        json_files = [Path(path) for path in json_file] if isinstance(json_file, (list, tuple)) else [Path(json_file)]
+        if not json_files:
+            raise Exception("入力ファイルが指定されていません")
+        self.json_files = json_files
+        self.json_file = json_files[0]
+        self.merge = merge
+        self.sources = None
+        self.stream = stream
+        self.compact = compact
+        self.validator = validator
+        self.hooks = list(hooks or [])
+        # 直前の convert() で再利用・変換した本文断片の数（本文断片を使わなかった場合は None）
+        self.cache_stats = None
+        self._peaks = []
+        self._reading_indexes = {}
+        self._tag_index = None
+        self._windows_readings = WindowsReadingGenerator()
+        self._stream_has_categories = False
+        self.snapshot = None
+        self.store = None
+        # マニフェストに記録する、読み込み前のJSONのサイズと更新日時（JSONファイル1つの場合だけ）
+        self._source = None
+        # マニフェストを作り直す必要があるか（_recording_manifest() を参照）
+        self._manifest_stale = False
+        # 再生する変更履歴（ChangeJournal.operations()）
+        self.journal = None
+        self._journal_operations = []
+        if len(json_files) > 1:
+            self._load_sources(snapshot, load_jobs)
+            return
+        if self.json_file.suffix.lower() in SQLITE_SUFFIXES:
+            # 辞書データベース（単語は参照のたびにカーソルから読み込む）
+            with self._stage('load') as record:
+                self.store = DictionaryStore(self.json_file)
+                self.data = self.store.to_data()
+                record['bytes'] = self.json_file.stat().st_size
+            return
+        if journal and ChangeJournal.path_for(self.json_file).exists():
+            self.journal = ChangeJournal(self.json_file)
+            self._journal_operations = self.journal.operations()
+        if not self._journal_operations:
+            try:
+                self._source = DictionarySnapshot._source_info(self.json_file)
+            except OSError:
+                pass
+            else:
+                self._manifest_stale = manifest and DictionaryManifest.open_if_fresh(self.json_file) is None
+        if snapshot and compact:
+            start = time.perf_counter()
+            self.snapshot = DictionarySnapshot.open_if_fresh(self.json_file)
+            opened = time.perf_counter() - start
+        if self.snapshot is not None:
+            # 参照しないカテゴリの単語は復元しない（マニフェストは compile() で作り直している）
+            self._manifest_stale = False
+            with self._stage('load') as record:
+                self.data = self.snapshot.to_data(cache=not stream)
+                record['seconds'] = opened
+                record['bytes'] = self.snapshot.header_size
+        elif stream:
+            if not self.json_file.is_file():
+                raise Exception(f"JSONファイルの読み込みに失敗: ファイルが見つかりません: {self.json_file}")
+            # 辞書情報などカテゴリ以外の項目はストリーム読み込み時に格納
+            self.data = {}
+        else:
+            with self._stage('load') as record:
+                self.data = self._load_json()
+                record['bytes'] = self.json_file.stat().st_size
+            if self._manifest_stale:
+                for _ in self._recording_manifest(self._iter_raw_categories()):
+                    pass
+        if self._journal_operations and not self._stream_json:
+            self._replay_journal()
+
+    def _replay_journal(self):
+        """読み込んだ辞書に変更履歴を再生（変更のあったカテゴリの単語リストだけをコピーする）"""
+        operations = self._journal_operations
+        with self._stage('journal') as record:
+            self.data = ChangeJournal.apply_info(self.data, operations)
+            categories = self.data.get('カテゴリ')
+            if isinstance(categories, Mapping):
+                replayed = {}
+                for cat_name, cat_data, words in ChangeJournal.replay(self._iter_raw_categories(), operations):
+                    if cat_data is not categories.get(cat_name):
+                        cat_data = dict(cat_data)
+                        if words is not MISSING_WORD_LIST:
+                            cat_data['単語リスト'] = words
+                    replayed[cat_name] = cat_data
+                self.data['カテゴリ'] = replayed
+            record['entries'] = len(operations)
+
+    def _load_sources(self, snapshot, load_jobs):
+        """併合する辞書をスレッドプールで並列に読み込む
+
+        ストリームモードでは単語を読み込まず、走査のたびに併合する。
+        それ以外では併合した結果を self.data に保持する。
+        """
+        def load(path):
+            return DictionaryConverter(path, stream=self.stream, compact=self.compact, snapshot=snapshot)
+
+        with self._stage('load') as record:
+            workers = load_jobs or min(len(self.json_files), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                self.sources = list(executor.map(load, self.json_files))
+            record['bytes'] = sum(path.stat().st_size for path in self.json_files)
+            self.data = {} if self.stream else self._merged_data()
+
+    @staticmethod
+    def _merge_top_levels(top_levels):
+        """最上位の項目を併合（先の辞書が優先、辞書情報などのオブジェクトは項目ごとに併合）"""
+        merged = {}
+        for top_level in top_levels:
+            for key, value in top_level.items():
+                if key not in merged:
+                    merged[key] = dict(value) if isinstance(value, Mapping) else value
+                elif isinstance(merged[key], dict) and isinstance(value, Mapping) and key != 'カテゴリ':
+                    for field, field_value in value.items():
+                        merged[key].setdefault(field, field_value)
+        return merged
+
+    def _merged_data(self):
+        """併合した辞書（単語リストはリストに展開する）"""
+        data = self._merge_top_levels([source._top_level() for source in self.sources])
+        if 'カテゴリ' in data:
+            categories = data['カテゴリ'] = {}
+            for cat_name, cat_data, words in self._iter_merged_categories():
+                cat_data = dict(cat_data)
+                if words is not MISSING_WORD_LIST:
+                    if _is_word_list(words) and not isinstance(words, Sequence):
+                        words = list(words)
+                    cat_data['単語リスト'] = words
+                categories[cat_name] = cat_data
+        return data
+
+    def _iter_merged_categories(self):
+        """併合する辞書のカテゴリを併合して (カテゴリ名, カテゴリ情報, 単語リスト) を返す
+
+        先に指定した辞書が優先される。カテゴリは最初に現れた順に並べ、カテゴリ情報は
+        項目ごとに優先する辞書の値を使い、単語リストは merge_word_lists() でまとめる。
+        各辞書のカテゴリの順が同じであれば、どの辞書も先読みせずに併合する。
+        順が異なる場合は、必要なカテゴリが現れるまでの間にあるカテゴリを読み込んで保持する。
+        """
+        streams = [source._iter_raw_categories() for source in self.sources]
+        names = [str(path) for path in self.json_files]
+        # 各辞書の読み進めていないカテゴリ（None なら次を読む）と、先読みして保持したカテゴリ
+        heads = [None] * len(streams)
+        finished = [False] * len(streams)
+        buffered = [{} for _ in streams]
+
+        def head(i):
+            if heads[i] is None and not finished[i]:
+                heads[i] = next(streams[i], None)
+                finished[i] = heads[i] is None
+            return heads[i]
+
+        def take(i, name):
+            """辞書 i のカテゴリ name を (カテゴリ情報, 単語リスト) で返す（なければ None）"""
+            if name in buffered[i]:
+                return buffered[i].pop(name)
+            while head(i) is not None:
+                head_name, cat_data, words = heads[i]
+                heads[i] = None
+                if head_name == name:
+                    return cat_data, words
+                if _is_word_list(words) and not isinstance(words, Sequence):
+                    # ストリームは次のカテゴリへ進む前に読み切る必要がある
+                    words = list(words)
+                buffered[i][head_name] = (cat_data, words)
+            return None
+
+        for i in range(len(streams)):
+            while True:
+                if buffered[i]:
+                    name = next(iter(buffered[i]))
+                elif head(i) is not None:
+                    name = heads[i][0]
+                else:
+                    break
+                # 前の辞書は読み終えているため、この辞書以降から集める
+                parts = [(j, take(j, name)) for j in range(i, len(streams))]
+                parts = [(j, part) for j, part in parts if part is not None]
+                if len(parts) == 1:
+                    yield name, *parts[0][1]
+                    continue
+
+                cat_data = {}
+                for _, (part_data, _words) in parts:
+                    for key, value in part_data.items():
+                        if key != '単語リスト':
+                            cat_data.setdefault(key, value)
+                lists = [(j, words) for j, (_data, words) in parts if _is_word_list(words)
+                         and words is not MISSING_WORD_LIST]
+                if lists:
+                    words = merge_word_lists([words for _, words in lists], self.merge == 'sorted',
+                                             [names[j] for j, _ in lists])
+                else:
+                    # 単語リストがない（または不正な値の）場合は優先する辞書の値を使う
+                    words = next((words for _, (_data, words) in parts if words is not MISSING_WORD_LIST),
+                                 MISSING_WORD_LIST)
+                yield name, cat_data, words
+
+    @property
+    def _stream_json(self):
+        """JSONファイルから逐次読み込むかどうか（スナップショット・データベースでは不要）"""
+        return self.stream and self.snapshot is None and self.store is None
+
+    def add_hook(self, hook):
+        """処理段階ごとの計測結果を受け取るフックを追加"""
+        self.hooks.append(hook)
+
+    def _emit(self, record):
+        """計測結果をフックに渡す"""
+        entries, seconds = record.get('entries'), record['seconds']
+        record.setdefault('entries_per_sec', entries / seconds if entries and seconds else None)
+        for hook in self.hooks:
+            hook(record)
+
+    @contextmanager
+    def _stage(self, name):
+        """処理段階を計測する（フックがなければ何もしない）
+
+        with の中で記録の entries / bytes を設定できる。seconds に設定した値は
+        経過時間に加算される（別に計測した時間の加減用）。ピークメモリは
+        tracemalloc が有効な場合だけ記録する。例外で終わった段階も記録する。
+        """
+        record = {'stage': name, 'seconds': 0.0, 'entries': None, 'bytes': None, 'peak_memory': None}
+        if not self.hooks:
+            yield record
+            return
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # 段階が入れ子になっても外側のピークを失わないよう、リセット前の値を引き継ぐ
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            self._peaks.append(0)
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            # 例外で終わった段階も記録する
+            record['seconds'] += time.perf_counter() - start
+            if tracing:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                record['peak_memory'] = peak
+            self._emit(record)
+
+    def _load_json(self):
+        """JSONファイルを読み込み"""
+        try:
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                if self.compact:
+                    return json.load(f, object_pairs_hook=compact_object_hook())
+                return json.load(f)
+        except Exception as e:
+            raise Exception(f"JSONファイルの読み込みに失敗: {e}")
+
+    def _iter_categories(self):
+        """(カテゴリ名, カテゴリ情報, 単語リスト) を順に返す
+
+        ストリームモードでは単語リストはファイルから逐次読み込むイテレータで、
+        次のカテゴリへ進む前に読み切る必要がある（読み残しは自動で読み飛ばす）。
+        """
+        categories = self._iter_raw_categories()
+        if self._manifest_stale:
+            categories = self._recording_manifest(categories)
+        if self.validator is not None:
+            yield from self.validator.iter_validated(categories, self._top_level)
+        else:
+            yield from categories
+
+    def _recording_manifest(self, categories, force=False):
+        """カテゴリをそのまま返しながらマニフェストの内容を集計し、最後まで走査したら保存
+
+        ストリームモードの単語リストは、次のカテゴリへ進む前に読み残しを読み切って集計する。
+        途中で走査をやめた場合は保存しない。保存できなかった場合（書き込めない場所など）は
+        force=True（save_manifest()）でなければ何もしない。
+        """
+        summaries = []
+        for cat_name, cat_data, words in categories:
+            summary = {'name': cat_name, 'enabled': cat_data.get('有効', True),
+                       'description': cat_data.get('説明', ''), 'count': 0, 'hash': None}
+            summaries.append(summary)
+            if isinstance(words, Sequence):
+                summary['count'], summary['hash'] = _summarize_words(words)
+                yield cat_name, cat_data, words
+            else:
+                words = _summarizing(words, summary)
+                yield cat_name, cat_data, words
+                for _ in words:
+                    pass
+        # ストリームモードでは辞書情報は走査後に確定する
+        dictionary_info = self.data.get('辞書情報', {})
+        manifest = DictionaryManifest(dictionary_info if isinstance(dictionary_info, Mapping) else {}, summaries)
+        try:
+            manifest.save(self.json_file, self._source)
+        except OSError:
+            if force:
+                raise
+            return
+        self._manifest_stale = False
+
+    def _iter_raw_categories(self):
+        """検証なしで (カテゴリ名, カテゴリ情報, 単語リスト) を返す
+
+        単語リストがないカテゴリでは MISSING_WORD_LIST（空）を返す。
+        """
+        if self.sources is not None and self.stream:
+            yield from self._iter_merged_categories()
+            # 辞書情報などは走査後に確定する
+            self.data = {key: value for key, value in self._top_level().items() if key != 'カテゴリ'}
+            return
+
+        if not self._stream_json:
+            categories = self.data.get('カテゴリ', {})
+            # 不正なデータでも落ちないよう、オブジェクト以外は空として扱う（検証でエラーになる）
+            if not isinstance(categories, Mapping):
                 return
+            for cat_name, cat_data in categories.items():
+                if not isinstance(cat_data, Mapping):
+                    cat_data = {}
+                yield cat_name, cat_data, cat_data.get('単語リスト', MISSING_WORD_LIST)
+            return
 
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write("# macOS日本語入力用辞書\n")
-                f.write(f"# 生成日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"# 単語数: {len(words)}件\n")
-                if categories:
-                    f.write(f"# カテゴリ: {', '.join(categories)}\n")
-                f.write("\n")
+        try:
+            if self._journal_operations:
+                yield from ChangeJournal.replay(self._stream_categories(), self._journal_operations)
+                self.data = ChangeJournal.apply_info(self.data, self._journal_operations)
+            else:
+                yield from self._stream_categories()
+        except (ValueError, OSError) as e:
+            raise Exception(f"JSONファイルの読み込みに失敗: {e}")
 
-                # カテゴリ別に出力
-                current_category = None
-                for word in sorted(words, key=lambda x: x.get('カテゴリ', '')):
-                    if word.get('カテゴリ') != current_category:
-                        current_category = word.get('カテゴリ')
-                        f.write(f"\n# {current_category}\n")
+    def _top_level(self):
+        """最上位の項目（ストリームモードでは読み込み済みの項目とカテゴリの有無）"""
+        if self.sources is not None and self.stream:
+            return self._merge_top_levels([source._top_level() for source in self.sources])
+        if self._stream_json and self._stream_has_categories:
+            return {**self.data, 'カテゴリ': {}}
+        return self.data
+
+    def _stream_categories(self):
+        """JSONファイルからカテゴリを逐次読み込み
+
+        単語リストは読み込んだ順に1件ずつ渡し、保持しない。そのため「有効」は
+        「単語リスト」より前にあるものとする（このツールとWeb編集ツールが書き出すJSONは
+        常にこの順）。単語リストまでに「有効」がなければ有効なカテゴリとして扱い、
+        後から false が見つかった場合はエラーにする。単語リストより後の項目は、
+        単語リストを読み終えてからカテゴリ情報に追加される。
+        """
+        self._stream_has_categories = False
+        with open(self.json_file, 'r', encoding='utf-8') as f:
+            reader = JSONStreamReader(f)
+            for key in reader.iter_object():
+                if key != 'カテゴリ':
+                    self.data[key] = reader.read_value()
+                    continue
+
+                self._stream_has_categories = True
+                for cat_name in reader.iter_object():
+                    cat_data = {}
+                    words = MISSING_WORD_LIST
+                    streamed = False
+                    for field in reader.iter_object():
+                        if field != '単語リスト':
+                            value = cat_data[field] = reader.read_value()
+                            if streamed and field == '有効' and value is False:
+                                raise ValueError(f"カテゴリ「{cat_name}」の「有効」が「単語リスト」より後にあります"
+                                                 "（ストリームモードでは「単語リスト」より前に置いてください）")
+                        elif reader.peek() != '[':
+                            # 配列でない単語リストはそのまま渡す（検証では型のエラーになる）
+                            words = reader.read_value()
+                        else:
+                            words = self._stream_words(reader)
+                            yield cat_name, cat_data, words
+                            for _ in words:
+                                pass
+                            streamed = True
+
+                    if not streamed:
+                        yield cat_name, cat_data, words
+
+    @staticmethod
+    def _stream_words(reader):
+        """単語リストの単語を1件ずつ読み込む（読み込みのエラーは呼び出し側で読み進めた時点で報告する）"""
+        try:
+            for _ in reader.iter_array():
+                yield reader.read_value()
+        except (ValueError, OSError) as e:
+            raise Exception(f"JSONファイルの読み込みに失敗: {e}") from None
 
-                    f.write(f"{word.get('読み', '')}\t{word.get('単語', '')}\t{word.get('品詞', '名詞')}\t{word.get('説明', '')}\n")
+    def list_categories(self):
+        """カテゴリ一覧を表示"""
+        return print_categories(self.summarize().rows())
 
-            print(f"✅ macOS形式出力完了: {output_file} ({len(words)}件)")
-            if categories:
-                print(f"   対象カテゴリ: {', '.join(categories)}")
+    def summarize(self):
+        """カテゴリごとの単語数などを1回の走査で集計し、DictionaryManifest で返す
 
-    def _map_pos_for_windows(self, pos):
-        """品詞をWindows IME用にマッピング"""
-        # Windows IMEで使用可能な品詞
-        windows_pos_map = {
-            '記号': '短縮よみ',
-            '名詞': '名詞',
-            '動詞': '名詞',  # Windows IMEでは動詞は使えないので名詞に
-            '形容詞': '名詞',  # Windows IMEでは形容詞は使えないので名詞に
-            '副詞': '名詞',  # Windows IMEでは副詞は使えないので名詞に
-            '人名': '人名',
-            '地名': '地名',
-            '固有名詞': '名詞',
-            '短縮よみ': '短縮よみ',
-            '顔文字': '顔文字',
-            'サ変名詞': 'サ変名詞'
-        }
-        return windows_pos_map.get(pos, '名詞')
+        件数だけを数え（読み込み済みの単語リストは len()、スナップショットの単語は
+        復元しない）、単語リストの内容のハッシュは計算しない。
+        """
+        categories = []
+        with self._stage('stats') as record:
+            for cat_name, cat_data, words in self._iter_categories():
+                categories.append({'name': cat_name, 'enabled': cat_data.get('有効', True),
+                                   'description': cat_data.get('説明', ''), 'count': _count_words(words), 'hash': None})
+            record['entries'] = sum(category['count'] for category in categories)
+        # ストリームモードでは辞書情報は走査後に確定する
+        dictionary_info = self.data.get('辞書情報', {})
+        return DictionaryManifest(dictionary_info if isinstance(dictionary_info, Mapping) else {}, categories)
+
+    def save_manifest(self):
+        """単語リストの内容のハッシュを含むマニフェストをJSONの隣に保存し、保存先のパスを返す
+
+        JSONが更新されるまでは --stats・--list-categories が辞書を読み込まずに終わる。
+        マニフェストは読み込み・変換のたびに必要に応じて作り直されるため、
+        最新のものがあっても作り直したい場合に使う。
+        変更ジャーナルのないJSONファイル1つを読み込んだ場合だけ作成できる。
+        """
+        if self._source is None:
+            raise Exception("マニフェストは変更ジャーナルのないJSONファイル1つから作成してください")
+        for _ in self._recording_manifest(self._iter_raw_categories(), force=True):
+            pass
+        return DictionaryManifest.path_for(self.json_file)
 
-    def to_windows(self, output_file, categories=None):
-        """Windows IME用形式で出力"""
-        words = self._get_all_words(categories)
+    def _iter_words(self, categories=None, dedupe=False):
+        """単語を1件ずつ返す WordStream を作成（カテゴリフィルタ・重複除去あり）"""
+        return WordStream(self._iter_categories(), categories, dedupe)
+
+    def _get_all_words(self, categories=None):
+        """全単語を取得（カテゴリフィルタあり）"""
+        return list(self._iter_words(categories))
+
+    def _select_or_iter_words(self, categories=None, dedupe=False, tags=None, pos=None, match_all_tags=False):
+        """変換する単語（タグ・品詞の指定がなければ全単語）を1件ずつ返す"""
+        if not tags and not pos:
+            return self._iter_words(categories, dedupe)
+        words = self.select_words(tags, pos, match_all_tags, categories)
+        if not dedupe:
+            return words
+        duplicates = DuplicateFilter()
+        return (word for word in words if not duplicates.is_duplicate(word))
+
+    def convert(self, targets, categories=None, jobs=1, cache_dir=None, generated_at=None, dedupe=False,
+                tags=None, pos=None, match_all_tags=False, memo=None, shard_size=None, sort=None, quiet=False):
+        """辞書を1回だけ走査して複数の形式へ同時に出力
+
+        targets は (形式名, 出力ファイル) のリスト。形式名は FORMATS のキー。
+        cache_dir を指定すると変換済みの本文断片を内容のハッシュで再利用し、
+        変更のあったカテゴリだけを変換し直す。
+        generated_at を指定するとヘッダーの生成日時に使う（再現可能な出力用）。
+        dedupe=True の場合は重複する単語を1件にまとめて出力する。
+        tags・pos を指定すると、select_words() で選択した単語だけを出力する。
+        memo に SegmentMemo を指定すると、前回の変換から変更のないシャードの
+        本文断片を再利用する（監視モード用。cache_dir の指定がある場合は使わない）。
+        shard_size を指定すると、各形式を単語数の上限ごとに番号付きのファイルへ分けて
+        出力する（ShardedWriter）。ファイルの書き終えは jobs 個のスレッドで並行に行い、
+        単語を1件ずつ分けるため本文断片（cache_dir・memo）は使わない。
+        sort に ExternalSorter.ORDERS のキー（'reading' など）を指定すると、単語を
+        外部マージソートで並べ替えてから出力する（本文断片は使わない）。カテゴリごとに
+        まとめる形式（TXT・macOSテキスト）も並べ替えた順のまま、カテゴリの見出しなしで出力する。
+        quiet=True の場合は出力結果を表示しない（変換サービスなど）。
+        """
+        if cache_dir:
+            memo = None
+        self.cache_stats = None
+        with ExitStack() as stack:
+            if shard_size:
+                workers = max(jobs, len(targets))
+                executor = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+                writers = [
+                    ShardedWriter(name, FORMATS[name](generated_at), output_file, categories, shard_size, executor,
+                                  max_pending=2 * workers, ordered=bool(sort))
+                    for name, output_file in targets
+                ]
+            else:
+                writers = [
+                    OutputWriter(FORMATS[name](generated_at), output_file, categories, ordered=bool(sort))
+                    for name, output_file in targets
+                ]
+            # 形式ごとの処理時間（フックがある場合だけ計測）
+            write_seconds = [0.0] * len(writers)
+            total = stack.enter_context(self._stage('convert'))
+            try:
+                segmented = not shard_size and not sort and (cache_dir or memo is not None)
+                with self._stage('segments' if segmented else 'read') as read:
+                    if segmented:
+                        if cache_dir:
+                            segment_dir = Path(cache_dir)
+                            segment_dir.mkdir(parents=True, exist_ok=True)
+                        elif memo is not None:
+                            segment_dir = memo.segment_dir
+                        else:
+                            # 断片ファイルは全ての出力を閉じた後に削除する
+                            segment_dir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+                        selection = None
+                        if tags or pos:
+                            selection = self._select_or_iter_words(categories, dedupe, tags, pos, match_all_tags)
+                        self._convert_segments(writers, [name for name, _ in targets], categories,
+                                               segment_dir, cached=bool(cache_dir), dedupe=dedupe,
+                                               selection=selection, memo=memo)
+                    else:
+                        words = self._select_or_iter_words(categories, dedupe, tags, pos, match_all_tags)
+                        if sort:
+                            words = ExternalSorter(sort).sort(words)
+                        if self.hooks:
+                            self._write_timed(words, writers, write_seconds)
+                        else:
+                            for word in words:
+                                for writer in writers:
+                                    writer.write(word)
+                    # 読み込みの時間には各形式への書き込みを含めない
+                    read['seconds'] = -sum(write_seconds)
+                    read['entries'] = max((writer.count for writer in writers), default=0)
+            except BaseException:
+                for writer in writers:
+                    writer.abort()
+                raise
+
+            for (name, _), writer, seconds in zip(targets, writers, write_seconds):
+                with self._stage(f'format:{name}') as record:
+                    writer.close(quiet)
+                    record['seconds'] = seconds
+                    record['entries'] = writer.count
+                    record['bytes'] = writer.size()
+            total['entries'] = read['entries']
+
+    @staticmethod
+    def _write_timed(words, writers, write_seconds):
+        """形式ごとの書き込み時間を write_seconds に加算しながら書き込む"""
+        perf_counter = time.perf_counter
+        for word in words:
+            for i, writer in enumerate(writers):
+                start = perf_counter()
+                writer.write(word)
+                write_seconds[i] += perf_counter() - start
+
+    # 本文断片1つに含める単語数の上限（キャッシュの単位）
+    SEGMENT_SIZE = 5000
+
+    def _iter_shards(self, categories=None, dedupe=False, selection=None):
+        """(カテゴリ名, 単語リスト) をシャード単位で返す（大きなカテゴリは分割）
 
-        if not words:
-            print("⚠️  出力する単語がありません")
+        selection に選択済みの WordView（重複除去済み）を渡すと、
+        辞書を走査せずにそれらを連続するカテゴリごとにまとめる。
+        """
+        if selection is not None:
+            shard = []
+            shard_category = None
+            for view in selection:
+                if shard and (view.category != shard_category or len(shard) >= self.SEGMENT_SIZE):
+                    yield shard_category, shard
+                    shard = []
+                shard_category = view.category
+                shard.append(view.entry)
+            if shard:
+                yield shard_category, shard
             return
 
-        # BOM付きUTF-16LE（encoding='utf-16'を使うと自動でBOMが付く）
-        with open(output_file, 'w', encoding='utf-16') as f:
-            # Windows IMEヘッダー
-            f.write("!Microsoft IME Dictionary Tool\n")
-            f.write("!Version=10.0\n")
-            f.write("!CharSet=UTF-16LE\n")
-            f.write("!Format=<Reading>\t<Word>\t<POS>\t<Comment>\n")
-            f.write("\n")
+        duplicates = DuplicateFilter() if dedupe else None
+        selected = set(categories) if categories else None
+        for cat_name, cat_data, words in self._iter_categories():
+            if selected is not None and cat_name not in selected:
+                continue
+            if cat_data.get('有効', True) is False:
+                continue
 
-            # データ
+            shard = []
+            for word in words:
+                if duplicates is not None and duplicates.is_duplicate(word):
+                    continue
+                shard.append(word)
+                if len(shard) >= self.SEGMENT_SIZE:
+                    yield cat_name, shard
+                    shard = []
+            if shard:
+                yield cat_name, shard
+
+    def _convert_segments(self, writers, format_names, categories, segment_dir, cached=False, dedupe=False,
+                          selection=None, memo=None):
+        """シャードごとに本文断片を作成し、元の順序で連結
+
+        cached=True の場合は segment_dir をキャッシュとして扱い、既にある断片は変換しない。
+        memo（SegmentMemo）を指定すると、前回と同じシャードの断片は変換しない。
+        selection は _iter_shards() を参照。
+        """
+        self.cache_stats = {'hit': 0, 'miss': 0}
+        try:
+            # カテゴリ名 -> カテゴリ内のシャードの番号（SegmentMemo での対応付け用）
+            shard_numbers = {}
+            for shard_id, (cat_name, entries) in enumerate(self._iter_shards(categories, dedupe, selection)):
+                if cached:
+                    paths = [segment_dir / f"{segment_cache_key(name, cat_name, entries)}.seg"
+                             for name in format_names]
+                elif memo is not None:
+                    number = shard_numbers[cat_name] = shard_numbers.get(cat_name, -1) + 1
+                    paths = memo.paths_for((cat_name, number), format_names, entries)
+                else:
+                    paths = [segment_dir / f"{shard_id}_{name}.seg" for name in format_names]
+
+                # キャッシュにない断片だけを変換
+                missing = [(name, path) for name, path in zip(format_names, paths) if not path.exists()]
+                self.cache_stats['hit'] += len(format_names) - len(missing)
+                self.cache_stats['miss'] += len(missing)
+                if missing:
+                    names, missing_paths = zip(*missing)
+                    encode_segments(names, cat_name, entries, missing_paths)
+                for writer, path in zip(writers, paths):
+                    writer.write_segment(cat_name, path, len(entries))
+        except BaseException:
+            if memo is not None:
+                memo.rollback()
+            raise
+        if memo is not None:
+            memo.commit()
+
+    def find_duplicates(self, categories=None):
+        """重複と衝突をハッシュ表で1回の走査（O(n)）で検出
+
+        戻り値の辞書:
+          duplicates: 読み・Windows用の読み・単語がすべて同じ単語のグループ
+          windows_conflicts: Windows用の読み（読み_Windows、なければ読み）が同じで
+            単語が異なり、macOS用の読みは異なるグループ（読み_Windowsによって
+            Windowsでだけ同じ読みになったもの）
+        各グループは WordView のリスト。
+        """
+        by_key = {}
+        by_windows_reading = {}
+        with self._stage('duplicates') as record:
+            words = self._iter_words(categories)
             for word in words:
-                pos = self._map_pos_for_windows(word.get('品詞', '名詞'))
-                # Windows用読みが設定されていればそれを使用、なければ通常の読みを使用
-                reading = word.get('読み_Windows') or word.get('読み', '')
-                text = word.get('単語', '')
-                comment = word.get('説明', '')
+                by_key.setdefault(duplicate_key(word), []).append(word)
+                reading_windows = word.get('読み_Windows') or word.get('読み', '')
+                by_windows_reading.setdefault(reading_windows, []).append(word)
+            record['entries'] = words.count
+
+        duplicates = [group for group in by_key.values() if len(group) > 1]
+        windows_conflicts = [
+            group for group in by_windows_reading.values()
+            if len(group) > 1
+            and len({word.get('単語', '') for word in group}) > 1
+            and len({word.get('読み', '') for word in group}) > 1
+        ]
+        return {'duplicates': duplicates, 'windows_conflicts': windows_conflicts}
+
+    def show_duplicates(self, categories=None):
+        """重複と衝突の検出結果を表示（見つかった件数を返す）"""
+        result = self.find_duplicates(categories)
+
+        def describe(word):
+            reading_windows = word.get('読み_Windows')
+            windows_note = f" / Windows: {reading_windows}" if reading_windows else ""
+            return f"{word.get('読み', '')}{windows_note} → {word.get('単語', '')} [{word.get('カテゴリ')}]"
+
+        print("🔍 重複チェック")
+        print(f"  完全な重複: {len(result['duplicates'])}グループ")
+        for group in result['duplicates']:
+            print(f"    ⚠️  {len(group)}件: {describe(group[0])}")
+            for word in group[1:]:
+                print(f"        {describe(word)}")
+
+        print(f"  Windowsでの読みの衝突: {len(result['windows_conflicts'])}グループ")
+        for group in result['windows_conflicts']:
+            reading = group[0].get('読み_Windows') or group[0].get('読み', '')
+            print(f"    ⚠️  「{reading}」: {len(group)}件")
+            for word in group:
+                print(f"        {describe(word)}")
+
+        found = len(result['duplicates']) + len(result['windows_conflicts'])
+        if not found:
+            print("  ✅ 重複・衝突はありません")
+        print()
+        return found
 
-                f.write(f"{reading}\t{text}\t{pos}\t{comment}\n")
+    def generate_windows_readings(self, categories=None):
+        """読み_Windows がない単語のWindows用の読みを生成
 
-        print(f"✅ Windows形式出力完了: {output_file} ({len(words)}件)")
-        if categories:
-            print(f"   対象カテゴリ: {', '.join(categories)}")
+        対象は読みがWindows IMEでそのまま使えない単語（WindowsReadingGenerator.needs_reading()）。
+        {'targets': 対象の件数, 'generated': 生成できた件数,
+         'ambiguous': [(WordView, 生成した読み, 理由)], 'unconvertible': [(WordView, 理由)]}
+        を返す。同じ読みは一度だけ変換するため、辞書の大きさに比例した時間で終わる。
+        """
+        needs_reading, generate = self._windows_readings.needs_reading, self._windows_readings.generate
+        selected = set(categories) if categories else None
+        result = {'targets': 0, 'generated': 0, 'ambiguous': [], 'unconvertible': []}
+        with self._stage('windows_readings') as record:
+            count = 0
+            # 単語ごとに WordView を作らず、報告する単語だけをビューにする
+            for cat_name, cat_data, words in self._iter_categories():
+                if (selected is not None and cat_name not in selected) or cat_data.get('有効', True) is False:
+                    continue
+                for word in words:
+                    count += 1
+                    if not needs_reading(word):
+                        continue
+                    result['targets'] += 1
+                    reading, note = generate(word['読み'])
+                    if reading is None:
+                        result['unconvertible'].append((WordView(word, cat_name), note))
+                    elif note is not None:
+                        result['ambiguous'].append((WordView(word, cat_name), reading, note))
+                    else:
+                        result['generated'] += 1
+            record['entries'] = count
+        return result
+
+    def show_windows_readings(self, categories=None, limit=None):
+        """Windows用の読みの生成結果と、曖昧な読み・変換できない読みを表示"""
+        result = self.generate_windows_readings(categories)
+        limit = 20 if limit is None else limit
+
+        def describe(word):
+            return f"{word.get('読み', '')} → {word.get('単語', '')} [{word.get('カテゴリ')}]"
+
+        print("🔤 Windows用の読みの生成")
+        print(f"  対象（読み_Windows がなく、読みがひらがな・半角数字だけでない単語）: {result['targets']}件")
+        print(f"  生成: {result['generated']}件 / 曖昧: {len(result['ambiguous'])}件 / "
+              f"変換できない: {len(result['unconvertible'])}件")
+        if result['ambiguous']:
+            print("  ⚠️  曖昧な読み（書き込みません）:")
+            for word, reading, note in result['ambiguous'][:limit]:
+                print(f"      {describe(word)}: 「{reading}」？ {note}")
+            if len(result['ambiguous']) > limit:
+                print(f"      …ほか{len(result['ambiguous']) - limit}件")
+        if result['unconvertible']:
+            print("  ❌ 変換できない読み:")
+            for word, note in result['unconvertible'][:limit]:
+                print(f"      {describe(word)}: {note}")
+            if len(result['unconvertible']) > limit:
+                print(f"      …ほか{len(result['unconvertible']) - limit}件")
+        print()
+        return result
+
+    def fill_windows_readings(self, output_file, categories=None):
+        """生成したWindows用の読みを書き込んだ辞書JSONを出力し、書き込んだ件数を返す
+
+        曖昧な読み・変換できない読みは書き込まない。読み_Windows は読みの直後に追加する。
+        単語は1件ずつ書き出すため、--stream と併用すれば大きな辞書もそのまま書き戻せる。
+        読み込んだ辞書JSONに書き戻す場合、変更履歴（ChangeJournal）があれば同時に反映し、
+        辞書の版は変えない（Web編集ツールの編集を続けられる）。
+        """
+        generator = self._windows_readings
+        selected = set(categories) if categories else None
+        filled = 0
+
+        def fill(words):
+            nonlocal filled
+            for word in words:
+                if isinstance(word, Mapping) and generator.needs_reading(word):
+                    reading, note = generator.generate(word['読み'])
+                    if reading is not None and note is None:
+                        word = _with_windows_reading(word, reading)
+                        filled += 1
+                yield word
+
+        def categories_with_readings(categories):
+            for cat_name, cat_data, words in categories:
+                if ((selected is None or cat_name in selected) and cat_data.get('有効', True) is not False
+                        and words is not MISSING_WORD_LIST and _is_word_list(words)):
+                    words = fill(words)
+                yield cat_name, cat_data, words
+
+        entries = 0
+
+        def write(path, categories, top_level):
+            nonlocal entries
+            entries = write_dictionary_json(path, categories_with_readings(categories), top_level)
+            return entries
+
+        output_file = Path(output_file)
+        with self._stage('fill_windows_readings') as record:
+            if (self.journal is not None and output_file.exists()
+                    and os.path.samefile(output_file, self.json_file)):
+                self.journal.compact(write)
+            else:
+                write(output_file, self._iter_raw_categories(), self._top_level)
+            record['entries'] = entries
+            record['bytes'] = output_file.stat().st_size
+        return filled
+
+    def reading_index(self, categories=None):
+        """読みの検索用インデックスを返す（カテゴリ指定ごとに一度だけ作成）"""
+        key = frozenset(categories) if categories else None
+        if key not in self._reading_indexes:
+            with self._stage('index') as record:
+                words = self._iter_words(categories)
+                self._reading_indexes[key] = ReadingIndex(words)
+                record['entries'] = words.count
+        return self._reading_indexes[key]
+
+    def lookup(self, reading, exact=False, categories=None, limit=None):
+        """読みで単語を検索（exact=False なら前方一致）
+
+        辞書データベースではインデックスを作らず、データベースの索引で検索する。
+        """
+        if self.store is not None:
+            return self.store.lookup(reading, exact=exact, categories=categories, limit=limit)
+        return self.reading_index(categories).lookup(reading, exact=exact, limit=limit)
+
+    def tag_index(self):
+        """タグ・品詞の転置インデックスを返す（一度だけ作成）"""
+        if self._tag_index is None:
+            with self._stage('tag_index') as record:
+                words = self._iter_words()
+                self._tag_index = TagIndex(words)
+                record['entries'] = words.count
+        return self._tag_index
+
+    def select_words(self, tags=None, pos=None, match_all=False, categories=None):
+        """タグ・品詞で単語を選択（条件は TagIndex.select() を参照）
+
+        辞書データベースではデータベースの索引で、ストリームモードでは
+        インデックスを作らずに1件ずつ調べて選択する（この場合はイテレータを返す）。
+        """
+        if self.store is not None:
+            return self.store.select(tags, pos, match_all, categories)
+        if self._stream_json:
+            return (word for word in self._iter_words(categories) if TagIndex.matches(word, tags, pos, match_all))
+        return self.tag_index().select(tags, pos, match_all, categories)
+
+    def show_lookup(self, reading, exact=False, categories=None, limit=None):
+        """読みの検索結果を表示"""
+        words = self.lookup(reading, exact=exact, categories=categories, limit=limit)
+        mode = "完全一致" if exact else "前方一致"
+        print(f"🔎 読み「{reading}」の検索結果（{mode}）: {len(words)}件")
+        self._print_words(words)
+        return words
+
+    @staticmethod
+    def _print_words(words):
+        for word in words:
+            reading_windows = word.get('読み_Windows')
+            windows_note = f" / Windows: {reading_windows}" if reading_windows else ""
+            print(f"  {word.get('読み', '')}{windows_note} → {word.get('単語', '')} "
+                  f"[{word.get('カテゴリ')}] ({word.get('品詞', '名詞')})")
+            if word.get('説明'):
+                print(f"     {word.get('説明')}")
+
+    def show_selection(self, tags=None, pos=None, match_all=False, categories=None, limit=None):
+        """タグ・品詞で選択した単語を表示"""
+        words = list(self.select_words(tags, pos, match_all, categories))
+        conditions = []
+        if tags:
+            conditions.append(f"タグ {'かつ' if match_all else 'または'} {', '.join(tags)}")
+        if pos:
+            conditions.append(f"品詞 {', '.join(pos)}")
+        print(f"🏷️  {' / '.join(conditions)} の単語: {len(words)}件")
+        self._print_words(words[:limit] if limit is not None else words)
+        return words
+
+    def to_csv(self, output_file, categories=None):
+        """CSV形式で出力（正しいCSV形式）"""
+        self.convert([('csv', output_file)], categories)
+
+    def to_txt(self, output_file, categories=None):
+        """タブ区切りテキスト形式で出力"""
+        self.convert([('txt', output_file)], categories)
+
+    def to_macos_plist(self, output_file, categories=None):
+        """macOS日本語入力用.plist形式で出力"""
+        self.convert([('macos_plist', output_file)], categories)
+
+    def to_macos(self, output_file, categories=None):
+        """macOS日本語入力用形式で出力（.plist形式）"""
+        self.convert([(self._macos_format(output_file), output_file)], categories)
+
+    @staticmethod
+    def _macos_format(output_file):
+        """拡張子に応じてmacOS用の形式名を返す（.plist以外は従来のテキスト形式）"""
+        return 'macos_plist' if str(output_file).endswith('.plist') else 'macos_txt'
+
+    def _map_pos_for_windows(self, pos):
+        """品詞をWindows IME用にマッピング"""
+        return map_pos_for_windows(pos)
+
+    def to_windows(self, output_file, categories=None):
+        """Windows IME用形式で出力"""
+        self.convert([('windows', output_file)], categories)
+
+    def to_sqlite(self, db_file):
+        """辞書データベース（SQLite）に出力"""
+        with self._stage('to_sqlite') as record:
+            db_file = DictionaryStore.create(db_file, self._iter_raw_categories(), self._top_level)
+            record['bytes'] = db_file.stat().st_size
+        print(f"✅ SQLite出力完了: {db_file}")
+        return db_file
+
+    def export_json(self, output_file):
+        """辞書をJSONファイルに出力（辞書データベースなどからの書き戻し用）
+
+        json.dump(indent=2) と同じ形式で、単語を1件ずつ書き出す。
+        """
+        output_file = Path(output_file)
+        with self._stage('export_json') as record:
+            count = write_dictionary_json(output_file, self._iter_raw_categories(), self._top_level)
+            record['entries'] = count
+            record['bytes'] = output_file.stat().st_size
+        print(f"✅ JSON出力完了: {output_file} ({count}件)")
+
+    def diff(self, old, categories=None):
+        """以前の版の辞書 old（DictionaryConverter）からの差分を求める
+
+        単語を delta_key() で対応づけ、{'added': [...], 'changed': [...], 'removed': [...]}
+        （WordView のリスト）を返す。カテゴリの移動や説明・タグなどの変更は changed とし、
+        新しい版の内容を返す。以前の版は内容のハッシュだけを保持し、2回走査して
+        removed を取り出すため、両方の辞書の大きさに比例した時間で終わる。
+        同じキーの単語が複数ある場合は最初の1件だけを比較する。
+        """
+        with self._stage('diff') as record:
+            old_digests = {}
+            for view in old._iter_words(categories):
+                key = delta_key(view)
+                if key not in old_digests:
+                    old_digests[key] = _delta_digest(view)
+
+            delta = {kind: [] for kind, _ in DELTA_KINDS}
+            seen = set()
+            for view in self._iter_words(categories):
+                key = delta_key(view)
+                if key in seen:
+                    continue
+                seen.add(key)
+                digest = old_digests.pop(key, None)
+                if digest is None:
+                    delta['added'].append(view)
+                elif digest != _delta_digest(view):
+                    delta['changed'].append(view)
+
+            if old_digests:
+                for view in old._iter_words(categories):
+                    if old_digests.pop(delta_key(view), None) is not None:
+                        delta['removed'].append(view)
+            record['entries'] = len(seen)
+        return delta
+
+    def export_delta(self, old, targets, categories=None, generated_at=None):
+        """以前の版の辞書 old からの差分を、追加・変更・削除ごとに各形式で出力
+
+        targets は convert() と同じ (形式名, 出力ファイル) のリスト。出力ファイル名には
+        delta_path() で差分の種類を付ける。該当する単語がない種類のファイルは、
+        以前の差分を誤って配布しないよう削除する。差分を返す。
+        """
+        delta = self.diff(old, categories)
+        print("🔀 差分: " + " / ".join(f"{label} {len(delta[kind])}件" for kind, label in DELTA_KINDS))
+        for kind, label in DELTA_KINDS:
+            views = delta[kind]
+            for name, output_file in targets:
+                path = delta_path(output_file, kind)
+                if not views:
+                    path.unlink(missing_ok=True)
+                    continue
+                writer = OutputWriter(FORMATS[name](generated_at), path, categories)
+                try:
+                    for view in views:
+                        writer.write(view)
+                except BaseException:
+                    writer.abort()
+                    raise
+                with self._stage(f'format:{name}') as record:
+                    writer.close()
+                    record['entries'] = writer.count
+                    record['bytes'] = path.stat().st_size
+        return delta
+
+    def validate(self):
+        """辞書全体をスキーマで検証（エラー件数を返す）"""
+        if self.validator is None:
+            self.validator = SchemaValidator.from_file()
+        self.validator.errors.clear()
+        with self._stage('validate') as record:
+            record['entries'] = 0
+            for _cat_name, _cat_data, words in self._iter_categories():
+                record['entries'] += sum(1 for _ in words)
+        return self.validator.report()
 
     def show_stats(self):
         """統計情報を表示"""
-        categories = self.data.get('カテゴリ', {})
-        total_words = sum(len(cat.get('単語リスト', [])) for cat in categories.values())
-        active_words = sum(
-            len(cat.get('単語リスト', []))
-            for cat in categories.values()
-            if cat.get('有効', True)
-        )
+        manifest = self.summarize()
+        print_stats(manifest.dictionary_info, manifest.rows())
 
-        print("📊 辞書統計情報")
-        print(f"  辞書名: {self.data.get('辞書情報', {}).get('名前', 'N/A')}")
-        print(f"  更新日: {self.data.get('辞書情報', {}).get('更新日', 'N/A')}")
-        print(f"  カテゴリ数: {len(categories)}")
-        print(f"  総単語数: {total_words}")
-        print(f"  有効単語数: {active_words}")
-        print()
+    def close(self):
+        """スナップショットの mmap・辞書データベースの接続を閉じる（併合した辞書も含む）
 
-        # カテゴリ別詳細
-        for cat_name, cat_data in categories.items():
-            status = "✅" if cat_data.get('有効', True) else "❌"
-            word_count = len(cat_data.get('単語リスト', []))
-            print(f"  {status} {cat_name}: {word_count}件 - {cat_data.get('説明', '')}")
+        閉じた後は単語リストを参照できない。with 文で使うと終了時に閉じる。
+        """
+        if self.snapshot is not None:
+            self.snapshot.close()
+        if self.store is not None:
+            self.store.close()
+        for source in self.sources or ():
+            source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 def main():
@@ -302,10 +3581,75 @@ def main():
 
   # 特定カテゴリのみ全形式出力
   python convert.py dictionary.json --all-formats --output-dir ./output --categories "記号・マーク"
+
+  # 巨大な辞書を1件ずつ読み込みながら変換（メモリ使用量を抑える）
+  python convert.py dictionary.json --all-formats --output-dir ./output --stream
+
+  # 読みで単語を検索（前方一致・完全一致）
+  python convert.py dictionary.json --lookup "ま"
+  python convert.py dictionary.json --lookup-exact "ほし"
+
+  # タグ・品詞で絞り込んで表示・出力（--tag-match all で全タグを持つ単語）
+  python convert.py dictionary.json --tags "矢印,記号" --tag-match all
+  python convert.py dictionary.json --csv output.csv --tags "矢印" --pos "記号"
+
+  # 重複と衝突をチェックし、重複を除いて出力
+  python convert.py dictionary.json --check-duplicates
+  python convert.py dictionary.json --all-formats --output-dir ./output --dedupe
+
+  # 読み_Windows がない単語のWindows用の読みを生成して確認し、辞書JSONに書き込む
+  python convert.py dictionary.json --windows-readings
+  python convert.py dictionary.json --write-windows-readings
+
+  # スキーマで検証（変換と同時に検証することもできる）
+  python convert.py dictionary.json --validate
+  python convert.py dictionary.json --all-formats --output-dir ./output --validate
+
+  # 読みの順に並べ替えて出力（--sort word で単語順、--sort category でカテゴリ順）
+  python convert.py dictionary.json --all-formats --output-dir ./output --sort reading
+
+  # 各形式を5万件ごとのファイルに分けて出力（dictionary.001.csv など、一覧は dictionary.csv.shards.json）
+  python convert.py dictionary.json --all-formats --output-dir ./output --shard-size 50000
+
+  # キャッシュを使い、変更のあったカテゴリだけを再変換（生成日時も固定）
+  python convert.py dictionary.json --all-formats --output-dir ./output --cache-dir ./.cache --timestamp "2025-01-01 00:00:00"
+
+  # 解析済みのスナップショットを作成（JSONより新しい間は自動で使われ、起動が速くなる）
+  python convert.py dictionary.json --compile
+
+  # Web編集ツールの変更履歴（dictionary.json.journal）を辞書JSONに反映
+  python convert.py dictionary.json --compact-journal
+
+  # 辞書データベース（SQLite）に取り込み、データベースから絞り込んで出力・JSONに書き戻す
+  python convert.py dictionary.json --to-sqlite dictionary.sqlite
+  python convert.py dictionary.sqlite --csv output.csv --categories "記号・マーク"
+  python convert.py dictionary.sqlite --to-json dictionary.json
+
+  # 辞書の変更を監視し、保存のたびに変更のあったカテゴリだけを変換し直す
+  python convert.py dictionary.json --all-formats --output-dir ./output --watch
+
+  # 以前の版との差分（追加・変更・削除）だけを全形式で出力（dictionary.added.csv など）
+  python convert.py dictionary.json --all-formats --output-dir ./delta --diff released.json
+
+  # チームごとの辞書を併合して出力（先に指定した辞書を優先、読みの順に並んだ辞書は逐次併合）
+  python convert.py base.json "teams/*.json" --all-formats --output-dir ./output
+  python convert.py "shards/*.json" --csv merged.csv --merge sorted --stream
+
+  # 既存のユーザー辞書（Windows形式・plist・CSV）を辞書JSONに取り込む
+  python convert.py vendor_windows.txt --import windows --to-json imported.json --import-category "取り込み"
+  python convert.py UserDictionary.plist --import macos_plist --to-json imported.json
+
+  # 処理段階ごとの時間とメモリを計測（JSON Lines でも保存）
+  python convert.py dictionary.json --all-formats --output-dir ./output --profile --profile-json profile.jsonl
         """
     )
 
-    parser.add_argument('json_file', help='入力JSONファイル')
+    parser.add_argument('json_file', nargs='+',
+                        help='入力JSONファイル（.sqlite / .sqlite3 / .db は辞書データベース）。'
+                             '複数のファイルやglobパターン（例: "teams/*.json"）を指定すると併合して扱う')
+    parser.add_argument('--merge', choices=DictionaryConverter.MERGE_MODES, default='concat',
+                        help='複数の辞書の併合方法（concat: 指定順に連結、sorted: 読みの順に並んだ辞書を'
+                             '読みの順に併合）。同じカテゴリ・同じ単語は先に指定した辞書を優先')
     parser.add_argument('--csv', help='CSV形式で出力')
     parser.add_argument('--txt', help='TXT形式で出力')
     parser.add_argument('--macos', help='macOS形式で出力（.plist拡張子でplist形式、それ以外はテキスト形式）')
@@ -315,74 +3659,427 @@ def main():
     parser.add_argument('--categories', help='出力するカテゴリ（カンマ区切り）複数指定可能')
     parser.add_argument('--stats', action='store_true', help='統計情報を表示')
     parser.add_argument('--list-categories', action='store_true', help='カテゴリ一覧を表示')
+    parser.add_argument('--lookup', metavar='PREFIX', help='読み（読み_Windowsを含む）の前方一致で単語を検索')
+    parser.add_argument('--lookup-exact', metavar='READING', help='読み（読み_Windowsを含む）の完全一致で単語を検索')
+    parser.add_argument('--lookup-limit', type=int, help='検索結果の最大件数')
+    parser.add_argument('--tags', help='指定したタグを持つ単語に絞り込む（カンマ区切り）。出力指定がなければ一覧を表示')
+    parser.add_argument('--pos', help='指定した品詞の単語に絞り込む（カンマ区切り）。出力指定がなければ一覧を表示')
+    parser.add_argument('--tag-match', choices=['any', 'all'], default='any',
+                        help='--tags の複数指定時にいずれか（any）・すべて（all）を持つ単語を選ぶ（既定: any）')
+    parser.add_argument('--check-duplicates', action='store_true',
+                        help='重複する単語とWindowsでの読みの衝突を検出（見つかった場合は終了コード1）')
+    parser.add_argument('--dedupe', action='store_true', help='重複する単語を1件にまとめて出力')
+    parser.add_argument('--windows-readings', action='store_true',
+                        help='読み_Windows がない単語のWindows用の読み（ひらがな）を生成して表示'
+                             '（曖昧な読み・変換できない読みを報告、表示件数は --lookup-limit）')
+    parser.add_argument('--write-windows-readings', action='store_true',
+                        help='生成したWindows用の読み（曖昧なものを除く）を辞書JSONに書き込む（--windows-readings を含む）')
+    parser.add_argument('--validate', action='store_true',
+                        help='スキーマで辞書を検証（出力指定と併用すると変換しながら検証）。エラーがあれば終了コード1')
+    parser.add_argument('--schema', help='検証に使うスキーマファイル（既定: data/schema.json）')
+    parser.add_argument('--stream', action='store_true', help='辞書を一括で読み込まず1件ずつ処理（巨大な辞書向け）')
+    parser.add_argument('--no-compact', action='store_true',
+                        help='単語を通常のdictで読み込む（読み込みは速いがメモリを多く使う）')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='--shard-size で分けたファイルを並行に書き終えるスレッド数（既定: 1）')
+    parser.add_argument('--shard-size', type=int, metavar='N',
+                        help='各形式をN件ごとの番号付きファイルに分けて出力（一覧とハッシュは <出力ファイル>.shards.json）')
+    parser.add_argument('--sort', choices=list(ExternalSorter.ORDERS),
+                        help='単語を読み・単語・カテゴリの順に並べ替えて出力（同じ値は元の順、巨大な辞書も一定のメモリで処理）')
+    parser.add_argument('--cache-dir', help='変換結果のキャッシュディレクトリ（変更のあったカテゴリだけ再変換）')
+    parser.add_argument('--timestamp', help='ヘッダーの生成日時を固定（例: "2025-01-01 00:00:00"）。'
+                                            '未指定時は環境変数 SOURCE_DATE_EPOCH があればそれを使用')
+    parser.add_argument('--compile', action='store_true',
+                        help='解析済みのバイナリスナップショットをJSONと同じ場所に作成（JSONより新しければ次回から自動で使用）')
+    parser.add_argument('--save-manifest', action='store_true',
+                        help='統計情報・カテゴリ一覧のマニフェストを最新でも作り直す（通常は読み込み・変換時に自動で更新）')
+    parser.add_argument('--compact-journal', action='store_true',
+                        help='変更履歴（<JSON>.journal）を辞書JSONに反映する（変換時は反映しなくても自動で再生される）')
+    parser.add_argument('--no-snapshot', action='store_true', help='スナップショットを使わずJSONを読み込む')
+    parser.add_argument('--to-sqlite', metavar='DB', help='辞書データベース（SQLite）に出力')
+    parser.add_argument('--to-json', metavar='FILE', help='JSON形式で出力（辞書データベースからの書き戻しなど）')
+    parser.add_argument('--import', dest='import_format', choices=list(IMPORTERS),
+                        help='入力ファイルを指定した形式（csv / windows / macos_plist）として読み込み、'
+                             '--to-json に辞書JSONとして出力')
+    parser.add_argument('--import-category', metavar='NAME',
+                        help='--import でカテゴリの情報がない形式の単語を入れるカテゴリ（既定: 入力ファイル名）')
+    parser.add_argument('--diff', metavar='OLD',
+                        help='以前の版の辞書（JSONまたはSQLite）との差分だけを、追加・変更・削除ごとに出力'
+                             '（例: dictionary.added.csv）')
+    parser.add_argument('--watch', action='store_true',
+                        help='辞書の変更を監視し、変更のあったカテゴリだけを変換し直して出力を更新（Ctrl+C で終了）')
+    parser.add_argument('--watch-interval', type=float, default=1.0, help='--watch で変更を確認する間隔（秒、既定: 1）')
+    parser.add_argument('--watch-debounce', type=float, default=0.5,
+                        help='--watch で変更が落ち着くまで待つ時間（秒、既定: 0.5）。連続した保存は1回の変換にまとめる')
+    parser.add_argument('--profile', action='store_true',
+                        help='処理段階ごとの時間・単語数・バイト数・ピークメモリを表示（tracemalloc を使うため遅くなる）')
+    parser.add_argument('--profile-json', metavar='FILE',
+                        help='処理段階ごとの計測結果をJSON Lines形式で追記（- で標準出力）。--profile を含む')
 
     args = parser.parse_args()
+    args.json_file = expand_inputs(args.json_file)
 
+    profiler = None
+    if args.profile or args.profile_json:
+        profiler = StageProfiler()
+        tracemalloc.start()
+    try:
+        _run(args, [profiler] if profiler else [])
+    finally:
+        if profiler is not None:
+            tracemalloc.stop()
+            print()
+            profiler.report()
+            if args.profile_json == '-':
+                print('\n'.join(profiler.json_lines()))
+            elif args.profile_json:
+                with open(args.profile_json, 'a', encoding='utf-8') as f:
+                    f.writelines(line + '\n' for line in profiler.json_lines())
+
+
+def _run(args, hooks):
+    """引数に従って処理を実行（hooks は処理段階ごとの計測結果を受け取る関数）"""
     # 引数チェック
-    if not any([args.csv, args.txt, args.macos, args.windows, args.all_formats, args.stats, args.list_categories]):
+    lookup_requested = args.lookup is not None or args.lookup_exact is not None
+    tags = [tag.strip() for tag in args.tags.split(',') if tag.strip()] if args.tags else None
+    pos = [name.strip() for name in args.pos.split(',') if name.strip()] if args.pos else None
+    match_all_tags = args.tag_match == 'all'
+    selection_requested = bool(tags or pos)
+    outputs_requested = any([args.csv, args.txt, args.macos, args.windows, args.all_formats])
+    windows_readings_requested = args.windows_readings or args.write_windows_readings
+    queries_requested = any([args.stats, args.list_categories, lookup_requested, args.check_duplicates, args.validate,
+                             selection_requested, windows_readings_requested])
+    exports_requested = any([args.to_sqlite, args.to_json])
+    if not any([outputs_requested, queries_requested, exports_requested, args.compile, args.import_format,
+                args.compact_journal, args.save_manifest]):
         print("❌ 出力形式を指定してください")
         print("   --csv, --txt, --macos, --windows, --all-formats")
-        print("   または --stats, --list-categories")
+        print("   または --stats, --list-categories, --lookup, --lookup-exact, --check-duplicates, --validate, "
+              "--tags, --pos, --windows-readings")
+        print("   または --compile, --save-manifest, --compact-journal, --to-sqlite, --to-json, --import")
+        sys.exit(1)
+
+    if args.watch and not outputs_requested:
+        print("❌ --watch には出力形式（--csv, --txt, --macos, --windows, --all-formats）を指定してください")
+        sys.exit(1)
+
+    if args.diff and (not outputs_requested or args.watch or selection_requested):
+        print("❌ --diff には出力形式を指定してください（--watch・--tags・--pos とは同時に指定できません）")
+        sys.exit(1)
+
+    if args.write_windows_readings and (len(args.json_file) != 1
+                                        or args.json_file[0].suffix.lower() in SQLITE_SUFFIXES):
+        print("❌ --write-windows-readings には書き込む辞書JSONを1つ指定してください")
+        sys.exit(1)
+
+    if args.jobs < 1:
+        print("❌ --jobs には1以上を指定してください")
+        sys.exit(1)
+
+    if args.shard_size is not None and (args.shard_size < 1 or not outputs_requested or args.diff):
+        print("❌ --shard-size には1以上を指定し、出力形式と併用してください（--diff とは同時に指定できません）")
         sys.exit(1)
 
+    # 生成日時の固定（再現可能な出力用）
+    generated_at = None
+    try:
+        if args.timestamp:
+            generated_at = datetime.strptime(args.timestamp, '%Y-%m-%d %H:%M:%S')
+        elif os.environ.get('SOURCE_DATE_EPOCH'):
+            # 実行する環境のタイムゾーンによらず同じ出力になるよう UTC で解釈する
+            generated_at = datetime.fromtimestamp(int(os.environ['SOURCE_DATE_EPOCH']), tz=timezone.utc)
+    except ValueError as e:
+        print(f"❌ 生成日時の指定が正しくありません: {e}")
+        sys.exit(1)
+
+    # 他の形式からの取り込み（入力は辞書JSONではないため、取り込みだけを行う）
+    if args.import_format:
+        if not args.to_json:
+            print("❌ --import には出力先の --to-json を指定してください")
+            sys.exit(1)
+        try:
+            count = import_dictionary(args.import_format, args.json_file, args.to_json,
+                                      category=args.import_category, generated_at=generated_at)
+        except Exception as e:
+            print(f"❌ 取り込みエラー: {e}")
+            sys.exit(1)
+        print(f"✅ {IMPORTERS[args.import_format].label}から取り込み完了: {args.to_json} ({count}件)")
+        return
+
+    # 変更履歴（ジャーナル）を辞書JSONに反映（スナップショットの作成より先に行う）
+    if args.compact_journal:
+        if any(path.suffix.lower() in SQLITE_SUFFIXES for path in args.json_file):
+            print("❌ --compact-journal にはJSONファイルを指定してください")
+            sys.exit(1)
+        for json_file in args.json_file:
+            try:
+                count = ChangeJournal(json_file).compact()
+            except Exception as e:
+                print(f"❌ エラー: {e}")
+                sys.exit(1)
+            if count:
+                print(f"✅ ジャーナルを反映しました: {json_file} ({count}件の変更)")
+            else:
+                print(f"ℹ️  反映する変更はありません: {json_file}")
+        if not any([outputs_requested, queries_requested, exports_requested, args.compile, args.save_manifest]):
+            return
+
+    # スナップショットの作成
+    if args.compile:
+        if any(path.suffix.lower() in SQLITE_SUFFIXES for path in args.json_file):
+            print("❌ --compile にはJSONファイルを指定してください")
+            sys.exit(1)
+        for json_file in args.json_file:
+            try:
+                snapshot_file = DictionarySnapshot.compile(json_file)
+            except Exception as e:
+                print(f"❌ エラー: {e}")
+                sys.exit(1)
+            print(f"✅ スナップショット作成完了: {snapshot_file} ({snapshot_file.stat().st_size}バイト)")
+        if not any([outputs_requested, queries_requested, exports_requested, args.save_manifest]):
+            return
+
+    # カテゴリ一覧・統計情報は、JSONが更新されていなければマニフェストから表示（辞書は読み込まない）
+    if ((args.list_categories or args.stats) and not exports_requested and not args.validate
+            and not args.save_manifest and len(args.json_file) == 1 and args.json_file[0].suffix.lower() not in SQLITE_SUFFIXES
+            and not ChangeJournal(args.json_file[0]).has_operations()):
+        manifest = DictionaryManifest.open_if_fresh(args.json_file[0])
+        if manifest is not None:
+            if args.list_categories:
+                print_categories(manifest.rows())
+            else:
+                print_stats(manifest.dictionary_info, manifest.rows())
+            return
+
     # 変換器を初期化
     try:
-        converter = DictionaryConverter(args.json_file)
+        validator = SchemaValidator.from_file(args.schema) if args.validate else None
+        converter = DictionaryConverter(args.json_file, stream=args.stream, compact=not args.no_compact,
+                                        validator=validator, hooks=hooks, snapshot=not args.no_snapshot,
+                                        merge=args.merge)
     except Exception as e:
         print(f"❌ エラー: {e}")
         sys.exit(1)
+    # 終了時にスナップショット・辞書データベースを閉じる
+    with converter:
+        if len(args.json_file) > 1:
+            mode = "読みの順に併合" if args.merge == 'sorted' else "連結"
+            print(f"📚 {len(args.json_file)}個の辞書を{mode}（先に指定した辞書を優先）: "
+                  f"{', '.join(str(path) for path in args.json_file)}")
+            print()
+
+        # マニフェストの作成
+        if args.save_manifest:
+            try:
+                manifest_file = converter.save_manifest()
+            except Exception as e:
+                print(f"❌ エラー: {e}")
+                sys.exit(1)
+            print(f"✅ マニフェスト作成完了: {manifest_file}")
+            if not any([outputs_requested, queries_requested, exports_requested]):
+                return
 
-    # カテゴリ一覧表示
-    if args.list_categories:
-        converter.list_categories()
-        return
+        # 辞書データベース・JSONへの出力
+        if exports_requested:
+            try:
+                if args.to_sqlite:
+                    converter.to_sqlite(args.to_sqlite)
+                if args.to_json:
+                    converter.export_json(args.to_json)
+            except Exception as e:
+                print(f"❌ エラー: {e}")
+                sys.exit(1)
+            if not outputs_requested and not queries_requested:
+                return
 
-    # 統計情報表示
-    if args.stats:
-        converter.show_stats()
-        return
+        # スキーマ検証（出力指定がない場合は検証だけを行う）
+        if args.validate and not outputs_requested:
+            try:
+                if converter.validate():
+                    sys.exit(1)
+            except Exception as e:
+                print(f"❌ エラー: {e}")
+                sys.exit(1)
+            # 結果は表示済み
+            validator = None
+
+        # カテゴリ一覧表示
+        if args.list_categories:
+            converter.list_categories()
+            return
 
-    # カテゴリフィルタ
-    categories = None
-    if args.categories:
-        categories = [cat.strip() for cat in args.categories.split(',')]
-        print(f"🔍 対象カテゴリ: {', '.join(categories)}")
-        print()
+        # 統計情報表示
+        if args.stats:
+            converter.show_stats()
+            return
 
-    # 出力ディレクトリ作成
-    output_dir = Path(args.output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+        # カテゴリフィルタ
+        categories = None
+        if args.categories:
+            categories = [cat.strip() for cat in args.categories.split(',')]
+            print(f"🔍 対象カテゴリ: {', '.join(categories)}")
+            print()
+
+        # 重複チェック
+        if args.check_duplicates:
+            if converter.show_duplicates(categories):
+                sys.exit(1)
+            return
+
+        # Windows用の読みの生成（--write-windows-readings では辞書JSONに書き込む）
+        if windows_readings_requested:
+            try:
+                converter.show_windows_readings(categories, limit=args.lookup_limit)
+                if args.write_windows_readings:
+                    json_file = args.json_file[0]
+                    count = converter.fill_windows_readings(json_file, categories)
+                    print(f"✅ 読み_Windows を書き込みました: {json_file} ({count}件)")
+            except Exception as e:
+                print(f"❌ エラー: {e}")
+                sys.exit(1)
+            return
+
+        # 読みで検索（インデックスは1回だけ作成して両方の検索に使う）
+        if lookup_requested:
+            if args.lookup is not None:
+                converter.show_lookup(args.lookup, categories=categories, limit=args.lookup_limit)
+            if args.lookup_exact is not None:
+                converter.show_lookup(args.lookup_exact, exact=True, categories=categories, limit=args.lookup_limit)
+            return
+
+        # タグ・品詞で絞り込み（出力指定がなければ一覧を表示）
+        if selection_requested:
+            if not outputs_requested:
+                converter.show_selection(tags, pos, match_all_tags, categories, limit=args.lookup_limit)
+                return
+            conditions = []
+            if tags:
+                conditions.append(f"タグ（{'すべて' if match_all_tags else 'いずれか'}）: {', '.join(tags)}")
+            if pos:
+                conditions.append(f"品詞: {', '.join(pos)}")
+            print(f"🔍 対象の単語 {' / '.join(conditions)}")
+            print()
+
+        # 出力ディレクトリ作成
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
 
-    # 変換処理
-    try:
         if args.all_formats:
             # 全形式出力
-            base_name = Path(args.json_file).stem
+            base_name = args.json_file[0].stem if len(args.json_file) == 1 else 'merged'
             if categories:
                 # カテゴリ指定時はファイル名に含める
                 cat_suffix = "_" + "_".join(categories)[:30].replace('/', '_')  # ファイル名用に短縮
                 base_name = f"{base_name}{cat_suffix}"
 
-            converter.to_csv(output_dir / f"{base_name}.csv", categories)
-            converter.to_txt(output_dir / f"{base_name}.txt", categories)
-            converter.to_macos(output_dir / f"{base_name}.plist", categories)  # .plist形式で出力
-            converter.to_windows(output_dir / f"{base_name}_windows.txt", categories)
+            # 1回の走査で全形式に同時出力
+            targets = [
+                ('csv', output_dir / f"{base_name}.csv"),
+                ('txt', output_dir / f"{base_name}.txt"),
+                ('macos_plist', output_dir / f"{base_name}.plist"),  # .plist形式で出力
+                ('windows', output_dir / f"{base_name}_windows.txt"),
+            ]
         else:
-            # 個別出力
+            # 個別出力（指定された形式を1回の走査でまとめて出力）
+            targets = []
             if args.csv:
-                converter.to_csv(args.csv, categories)
+                targets.append(('csv', args.csv))
             if args.txt:
-                converter.to_txt(args.txt, categories)
+                targets.append(('txt', args.txt))
             if args.macos:
-                converter.to_macos(args.macos, categories)
+                targets.append((converter._macos_format(args.macos), args.macos))
             if args.windows:
-                converter.to_windows(args.windows, categories)
+                targets.append(('windows', args.windows))
+
+        # 以前の版との差分だけを出力
+        if args.diff:
+            try:
+                with DictionaryConverter(args.diff, stream=args.stream, compact=not args.no_compact, hooks=hooks,
+                                         snapshot=not args.no_snapshot) as old:
+                    converter.export_delta(old, targets, categories, generated_at=generated_at)
+            except Exception as e:
+                print(f"❌ 差分出力エラー: {e}")
+                sys.exit(1)
+            return
 
-    except Exception as e:
-        print(f"❌ 変換エラー: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+        def convert_targets(converter, memo=None):
+            converter.convert(targets, categories, jobs=args.jobs, cache_dir=args.cache_dir,
+                              generated_at=generated_at, dedupe=args.dedupe,
+                              tags=tags, pos=pos, match_all_tags=match_all_tags, memo=memo,
+                              shard_size=args.shard_size, sort=args.sort)
+
+        if args.watch:
+            _watch(args, hooks, converter, convert_targets)
+            return
+
+        # 変換処理
+        try:
+            convert_targets(converter)
+        except Exception as e:
+            print(f"❌ 変換エラー: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+        # 変換と同時に行った検証の結果
+        if validator is not None and validator.report():
+            sys.exit(1)
+
+
+def _watch(args, hooks, converter, convert_targets):
+    """辞書の変更を監視し、変更のたびに変換し直す（Ctrl+C で終了）
+
+    前回の変換のシャードを SegmentMemo に保持し、変更のあったシャードだけを
+    変換し直して出力ファイルを組み立てる（--cache-dir 指定時はキャッシュを使う）。
+    --shard-size・--sort 指定時は本文断片を使わないため、変更のたびに全体を変換する。
+    """
+    watcher = DictionaryWatcher(args.json_file, interval=args.watch_interval, debounce=args.watch_debounce,
+                                optional=[ChangeJournal.path_for(path) for path in args.json_file])
+    memo = None
+    if args.shard_size or args.sort:
+        print("ℹ️  --shard-size・--sort 指定時は前回の変換結果を再利用せず、変更のたびにすべての単語を変換します")
+    elif not args.cache_dir:
+        memo = SegmentMemo()
+
+    def load():
+        try:
+            validator = SchemaValidator.from_file(args.schema) if args.validate else None
+            # スナップショットは古くなっているため使わない
+            return DictionaryConverter(args.json_file, stream=args.stream, compact=not args.no_compact,
+                                       validator=validator, hooks=hooks, snapshot=False, merge=args.merge)
+        except Exception as e:
+            # 書き込み途中などで読み込めない場合は次の変更を待つ
+            print(f"❌ エラー: {e}")
+            return None
+
+    try:
+        while True:
+            if converter is not None:
+                try:
+                    convert_targets(converter, memo)
+                    stats = converter.cache_stats
+                    if stats is not None:
+                        print(f"♻️  本文断片: 再利用 {stats['hit']} / 変換 {stats['miss']}")
+                    if converter.validator is not None:
+                        converter.validator.report()
+                except Exception as e:
+                    print(f"❌ 変換エラー: {e}")
+            print(f"👀 変更を監視しています: {', '.join(str(path) for path in args.json_file)}（Ctrl+C で終了）")
+            print()
+
+            watcher.wait()
+            print(f"🔄 変更を検出しました: {datetime.now():%H:%M:%S}")
+            if converter is not None:
+                converter.close()
+            converter = load()
+    except KeyboardInterrupt:
+        print()
+        print("👋 監視を終了しました")
+    finally:
+        if converter is not None:
+            converter.close()
+        if memo is not None:
+            memo.close()
 
 
 if __name__ == '__main__':
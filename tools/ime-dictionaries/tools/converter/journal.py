@@ -0,0 +1,333 @@
+"""
+辞書の変更ジャーナル
+Web編集ツールでの変更を辞書JSONの隣のジャーナルに追記し、読み込み時に再生する
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+
+# 辞書の変更履歴（追記のみのジャーナル）
+JOURNAL_SUFFIX = '.journal'
+
+
+class ChangeJournal:
+    """辞書JSONへの変更を追記していくジャーナル（JSONと同じ場所の <JSON>.journal）
+
+    単語・カテゴリの追加・編集・削除を1行1件のJSONで追記するため、大きな辞書でも
+    保存の手間は変更の大きさだけで済む。DictionaryConverter は読み込んだ辞書
+    （スナップショットを含む）の上にジャーナルを再生する。compact() でジャーナルを
+    辞書JSONに反映し、ジャーナルが COMPACT_SIZE を超えると追記時に別スレッドで反映する。
+
+    1行目は見出し {'journal': 1, 'base': 元の辞書JSONのサイズと更新日時, 'id', 'revision'}。
+    id（作成時の辞書JSONのハッシュ）と revision + 変更の件数を version() として返し、
+    反映の前後で変わらないため、編集中の辞書が最新かどうかの確認に使える。
+    """
+
+    VERSION = 1
+    # 変更の種類 -> 必須の項目
+    OPERATIONS = {
+        'add_word': ('category', 'word'),
+        'edit_word': ('category', 'index', 'word'),
+        'delete_word': ('category', 'index'),
+        'add_category': ('category',),
+        'edit_category': ('category', 'info'),
+        'delete_category': ('category',),
+        'set_info': ('info',),
+    }
+    COMPACT_SIZE = 4 * 1024 * 1024
+    # ジャーナルのパス -> ロックと実行中の反映（同じプロセスの ChangeJournal で共有する）
+    _states = {}
+    _states_lock = threading.Lock()
+
+    def __init__(self, json_file, compact_size=None):
+        self.json_file = Path(json_file)
+        self.path = self.path_for(json_file)
+        self.compact_size = self.COMPACT_SIZE if compact_size is None else compact_size
+        # 読み込み・追記・反映の書き換えを lock で排他する（反映自体は compact_lock で1つずつ）。
+        # 変換サービスと DictionaryConverter が別々に作っても同じロックを使う
+        with self._states_lock:
+            self._state = self._states.setdefault(str(self.path.resolve()), {
+                'lock': threading.RLock(), 'compact_lock': threading.Lock(), 'compaction': None,
+            })
+        self._lock = self._state['lock']
+        self._compact_lock = self._state['compact_lock']
+
+    @staticmethod
+    def path_for(json_file):
+        """JSONファイルに対応するジャーナルのパス（JSONと同じ場所）"""
+        json_file = Path(json_file)
+        return json_file.with_name(json_file.name + JOURNAL_SUFFIX)
+
+    def _read(self):
+        """(見出し, 変更のリスト) を返す（ジャーナルがなければ (None, [])）
+
+        書き込み途中で終わった最後の行は無視する。反映の途中で中断されていた場合は
+        書き換え済みのジャーナルに切り替える。
+        """
+        with self._lock:
+            try:
+                source = convert.DictionarySnapshot._source_info(self.json_file)
+            except OSError:
+                raise Exception(f"JSONファイルの読み込みに失敗: ファイルが見つかりません: {self.json_file}") from None
+            header, operations = self._parse(self.path)
+            if header is not None and header.get('base') != source:
+                pending = self.path.with_name(self.path.name + '.tmp')
+                pending_header, pending_operations = self._parse(pending)
+                if pending_header is None or pending_header.get('base') != source:
+                    raise Exception(f"ジャーナルの作成後に辞書が変更されています: {self.json_file}"
+                                    f"（ジャーナル {self.path} を確認してください）")
+                os.replace(pending, self.path)
+                header, operations = pending_header, pending_operations
+            return header, operations
+
+    def _truncate_torn_line(self):
+        """書き込み途中で終わった最後の行を切り詰める（追記の前に lock を持って呼ぶ）"""
+        try:
+            f = open(self.path, 'rb+')
+        except FileNotFoundError:
+            return
+        with f:
+            size = end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end != size:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @classmethod
+    def _parse(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None, []
+        if lines and not lines[-1].endswith('\n'):
+            lines.pop()
+        if not lines:
+            return None, []
+        try:
+            header = json.loads(lines[0])
+            operations = [json.loads(line) for line in lines[1:]]
+        except ValueError as e:
+            raise Exception(f"ジャーナルの読み込みに失敗: {path}: {e}") from None
+        if not isinstance(header, dict) or header.get('journal') != cls.VERSION:
+            raise Exception(f"ジャーナルの形式が正しくありません: {path}")
+        return header, operations
+
+    def operations(self):
+        """再生する変更のリスト"""
+        return self._read()[1]
+
+    def has_operations(self):
+        """辞書JSONに反映していない変更があるか（読み込めないジャーナルも True）"""
+        if not self.path.exists():
+            return False
+        try:
+            return bool(self.operations())
+        except Exception:
+            return True
+
+    def version(self):
+        """辞書の版（'<id>-<番号>'。ジャーナルがなければ None）"""
+        header, operations = self._read()
+        if header is None:
+            return None
+        return f"{header['id']}-{header['revision'] + len(operations)}"
+
+    @classmethod
+    def check_operation(cls, operation):
+        """変更の形式を確認（正しくなければ ValueError）"""
+        if not isinstance(operation, Mapping) or operation.get('op') not in cls.OPERATIONS:
+            raise ValueError(f"変更の種類が正しくありません: {operation!r}")
+        for key in cls.OPERATIONS[operation['op']]:
+            if key not in operation:
+                raise ValueError(f"変更に {key} がありません: {operation!r}")
+        if 'category' in operation and not isinstance(operation['category'], str):
+            raise ValueError(f"カテゴリ名は文字列で指定してください: {operation!r}")
+        if 'index' in operation and (not isinstance(operation['index'], int) or isinstance(operation['index'], bool)):
+            raise ValueError(f"index は整数で指定してください: {operation!r}")
+        for key in ('word', 'info'):
+            if key in operation and not isinstance(operation[key], Mapping):
+                raise ValueError(f"{key} はオブジェクトで指定してください: {operation!r}")
+
+    def append(self, operations, sync=True):
+        """変更を追記して新しい版を返す（ジャーナルがなければ作成する）
+
+        sync=True の場合はディスクへの書き込みを待つ。ジャーナルが compact_size を
+        超えた場合は compact_in_background() で辞書JSONに反映する。
+        """
+        operations = list(operations)
+        for operation in operations:
+            self.check_operation(operation)
+        with self._lock:
+            self._truncate_torn_line()
+            header, existing = self._read()
+            lines = []
+            if header is None:
+                digest = hashlib.sha256()
+                with open(self.json_file, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                header = {'journal': self.VERSION, 'base': convert.DictionarySnapshot._source_info(self.json_file),
+                          'id': digest.hexdigest()[:32], 'revision': 0}
+                lines.append(convert._json_value(header))
+            lines += [convert._json_value(operation) for operation in operations]
+            with open(self.path, 'a', encoding='utf-8', newline='\n') as f:
+                f.write(''.join(line + '\n' for line in lines))
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+            version = f"{header['id']}-{header['revision'] + len(existing) + len(operations)}"
+        if self.path.stat().st_size > self.compact_size:
+            self.compact_in_background()
+        return version
+
+    @staticmethod
+    def apply_info(top_level, operations):
+        """最上位の項目に辞書情報の変更（set_info）を反映した新しいdictを返す"""
+        info_operations = [operation for operation in operations if operation['op'] == 'set_info']
+        adds_category = any(operation['op'] == 'add_category' for operation in operations)
+        if not info_operations and not (adds_category and 'カテゴリ' not in top_level):
+            return top_level
+        top_level = dict(top_level)
+        for operation in info_operations:
+            info = top_level.get('辞書情報')
+            top_level['辞書情報'] = {**(info if isinstance(info, Mapping) else {}), **operation['info']}
+        if adds_category:
+            top_level.setdefault('カテゴリ', {})
+        return top_level
+
+    @classmethod
+    def replay(cls, categories, operations):
+        """(カテゴリ名, カテゴリ情報, 単語リスト) のイテレータに変更を再生して返す
+
+        変更のないカテゴリはそのまま返す（単語リストも読み込まない）。追加したカテゴリと、
+        削除してから追加し直したカテゴリは最後に追加した順に末尾に並べる。
+        """
+        by_category = {}
+        for number, operation in enumerate(operations):
+            if 'category' in operation:
+                by_category.setdefault(operation['category'], []).append((number, operation))
+
+        tail = []
+        for cat_name, cat_data, words in categories:
+            category_operations = by_category.pop(cat_name, None)
+            if category_operations is None:
+                yield cat_name, cat_data, words
+                continue
+            state = cls._fold(cat_name, (cat_data, words), category_operations)
+            if any(operation['op'] == 'delete_category' for _number, operation in category_operations):
+                if state is not None:
+                    tail.append((cls._last_add(category_operations), cat_name, state))
+            elif state is not None:
+                yield cat_name, *state
+
+        for cat_name, category_operations in by_category.items():
+            state = cls._fold(cat_name, None, category_operations)
+            if state is not None:
+                tail.append((cls._last_add(category_operations), cat_name, state))
+        for _number, cat_name, (cat_data, words) in sorted(tail, key=lambda item: item[0]):
+            yield cat_name, cat_data, words
+
+    @staticmethod
+    def _last_add(category_operations):
+        return max(number for number, operation in category_operations if operation['op'] == 'add_category')
+
+    @staticmethod
+    def _fold(cat_name, state, category_operations):
+        """カテゴリに変更を順に適用し、(カテゴリ情報, 単語リスト) か None（削除）を返す"""
+        copied = False
+        for number, operation in category_operations:
+            kind = operation['op']
+            if kind == 'add_category':
+                if state is not None:
+                    raise Exception(f"ジャーナルを適用できません（{number + 1}件目）: カテゴリが既にあります: {cat_name}")
+                state = ({'説明': '', '有効': True, **operation.get('info', {})}, [])
+                copied = True
+                continue
+            if state is None:
+                raise Exception(f"ジャーナルを適用できません（{number + 1}件目）: カテゴリがありません: {cat_name}")
+            cat_data, words = state
+            if kind == 'delete_category':
+                state = None
+                continue
+            if kind == 'edit_category':
+                state = ({**cat_data, **operation['info']}, words)
+                continue
+            if not copied:
+                # 元の単語リスト（スナップショットやストリームを含む）はコピーしてから変更する
+                words = list(words) if convert._is_word_list(words) else []
+                copied = True
+            if kind == 'add_word':
+                words.append(dict(operation['word']))
+            elif not 0 <= operation['index'] < len(words):
+                raise Exception(f"ジャーナルを適用できません（{number + 1}件目）: "
+                                f"{cat_name} に {operation['index']} 番目の単語がありません")
+            elif kind == 'edit_word':
+                words[operation['index']] = dict(operation['word'])
+            else:
+                del words[operation['index']]
+            state = (dict(cat_data), words)
+        return state
+
+    def compact(self, write=None):
+        """ジャーナルを辞書JSONに反映し、反映した変更の件数を返す
+
+        辞書はストリームで読み込むため、大きな辞書でもメモリ使用量は一定。反映中に
+        追記された変更は新しいジャーナルに残す（版の番号は変わらない）。
+        write に write_dictionary_json() と同じ引数の関数を指定すると、変更を再生した
+        辞書をその関数で書き出す（反映する変更がなくても辞書JSONを書き換える）。
+        """
+        with self._compact_lock:
+            with self._lock:
+                _header, operations = self._read()
+            if not operations and write is None:
+                return 0
+            converter = convert.DictionaryConverter(self.json_file, stream=True, snapshot=False, journal=False)
+            compacted = self.json_file.with_name(self.json_file.name + '.compact')
+            write = write or convert.write_dictionary_json
+            write(compacted, self.replay(converter._iter_raw_categories(), operations),
+                  lambda: self.apply_info(converter._top_level(), operations))
+            with self._lock:
+                header, current = self._read()
+                if header is None:
+                    os.replace(compacted, self.json_file)
+                    return 0
+                remaining = current[len(operations):]
+                new_header = {**header, 'base': convert.DictionarySnapshot._source_info(compacted),
+                              'revision': header['revision'] + len(operations)}
+                pending = self.path.with_name(self.path.name + '.tmp')
+                with open(pending, 'w', encoding='utf-8', newline='\n') as f:
+                    f.write(''.join(convert._json_value(line) + '\n' for line in [new_header, *remaining]))
+                    f.flush()
+                    os.fsync(f.fileno())
+                # 辞書を置き換えた後に中断しても、次の読み込み時に pending へ切り替わる
+                os.replace(compacted, self.json_file)
+                os.replace(pending, self.path)
+            return len(operations)
+
+    def compact_in_background(self):
+        """別スレッドで compact() を実行してスレッドを返す（実行中なら実行中のスレッド）"""
+        with self._lock:
+            compaction = self._state['compaction']
+            if compaction is None or not compaction.is_alive():
+                compaction = self._state['compaction'] = threading.Thread(target=self.compact,
+                                                                          name='journal-compaction')
+                compaction.start()
+            return compaction
+
+
+# convert もこのモジュールを import するため、定義の後で import し、convert の名前は使うときに参照する
+import convert
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+IME辞書変換サービス
+DictionaryConverter で辞書を各形式に変換して返すローカルHTTPサービス（Web編集ツールも配信する）
+
+- GET  /api/formats                     : 出力形式の一覧
+- GET  /api/convert/<形式>?category=... : 辞書ファイルを変換（ETag・304 に対応）
+- POST /api/convert/<形式>?category=... : 送信された辞書JSON（Web編集ツールで編集中の辞書）を変換
+- GET  /api/status                      : 変換結果のキャッシュの状況
+- GET  /data/dictionary.json            : 辞書ファイル（ジャーナルの変更を再生した辞書。ETag と
+                                          X-Dictionary-Version は辞書の版）
+- POST /api/journal                     : 辞書への変更をジャーナルに追記（{"version", "operations"}）
+- GET  /, /app.js など                   : Web編集ツール
+
+変換結果は辞書の版・形式・カテゴリをキーにキャッシュし、同じ変換を同時に要求された
+場合も変換は1回だけ行う。応答は一定の大きさずつ送信する。Web編集ツールの保存は
+辞書全体ではなく変更だけをジャーナルに追記する（ChangeJournal）。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sys
+import argparse
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from convert import FORMATS, DictionaryConverter, DictionarySnapshot, write_dictionary_json
+from journal import ChangeJournal
+from store import SQLITE_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+DEFAULT_DICTIONARY = ROOT_DIR / 'data' / 'dictionary.json'
+WEB_EDITOR_DIR = ROOT_DIR / 'tools' / 'web-editor'
+
+# 形式名 -> (ダウンロード時のファイル名, Content-Type)
+FORMAT_FILES = {
+    'csv': ('dictionary.csv', 'text/csv; charset=utf-8'),
+    'txt': ('dictionary.txt', 'text/plain; charset=utf-8'),
+    'macos_txt': ('dictionary_macos.txt', 'text/plain; charset=utf-8'),
+    'macos_plist': ('dictionary.plist', 'application/x-plist; charset=utf-8'),
+    'windows': ('dictionary_windows.txt', 'text/plain; charset=utf-16'),
+}
+
+# 応答を送信する単位（バイト）
+CHUNK_SIZE = 64 * 1024
+# 受け付ける辞書JSONの上限（バイト）
+MAX_BODY_SIZE = 256 * 1024 * 1024
+
+STATUS_TEXT = {
+    200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class HTTPError(Exception):
+    """エラー応答（status は HTTP のステータスコード）"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _sha256_file(path):
+    """ファイルの SHA-256（16進数）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def conversion_key(digest, format_name, categories):
+    """変換結果のキャッシュキー（ETag にも使う）"""
+    text = '\0'.join([digest, format_name, *(categories or [])])
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match ヘッダーが ETag に一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    weak = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == weak for tag in if_none_match.split(','))
+
+
+class DictionarySource:
+    """サービスが変換する辞書ファイル
+
+    辞書ファイルかジャーナルのサイズと更新日時が変わったときだけ、辞書の版を求め直して
+    DictionaryConverter を読み込み直す（同時に要求されても読み込みは1回だけ）。
+    版はジャーナルがあれば ChangeJournal.version()、なければ '<内容のハッシュ>-0'。
+    読み込み直す前の DictionaryConverter は、hold() で使っている要求がなくなってから閉じる。
+    """
+
+    def __init__(self, json_file, executor):
+        self.json_file = Path(json_file)
+        self.journal = ChangeJournal(self.json_file)
+        self._executor = executor
+        self._lock = asyncio.Lock()
+        self._source = None
+        self.version = None
+        self.converter = None
+        # DictionaryConverter -> hold() で使っている要求の数
+        self._holders = {}
+
+    async def current(self):
+        """(辞書の版, DictionaryConverter) を返す（変換に使う場合は hold() を使う）"""
+        async with self._lock:
+            try:
+                source = (DictionarySnapshot._source_info(self.json_file), self._journal_info())
+            except OSError:
+                raise HTTPError(404, f"辞書ファイルが見つかりません: {self.json_file}") from None
+            if source != self._source:
+                loop = asyncio.get_running_loop()
+                previous = self.converter
+                self.version, self.converter = await loop.run_in_executor(self._executor, self._load)
+                self._source = source
+                if previous is not None and previous not in self._holders:
+                    await loop.run_in_executor(self._executor, previous.close)
+            return self.version, self.converter
+
+    @asynccontextmanager
+    async def hold(self):
+        """(辞書の版, DictionaryConverter) を返し、使い終わるまで読み込み直しても閉じない"""
+        version, converter = await self.current()
+        self._holders[converter] = self._holders.get(converter, 0) + 1
+        try:
+            yield version, converter
+        finally:
+            self._holders[converter] -= 1
+            if not self._holders[converter]:
+                del self._holders[converter]
+                if converter is not self.converter:
+                    # 読み込み直した後に最後の要求が使い終わった
+                    await asyncio.get_running_loop().run_in_executor(self._executor, converter.close)
+
+    def close(self):
+        """読み込んでいる DictionaryConverter を閉じる"""
+        if self.converter is not None:
+            self.converter.close()
+            self.converter = None
+
+    async def append(self, version, operations):
+        """版が一致すれば変更をジャーナルに追記して新しい版を返す（一致しなければ 409）"""
+        async with self._lock:
+            current = self.version
+            try:
+                if (DictionarySnapshot._source_info(self.json_file), self._journal_info()) != self._source:
+                    current = await asyncio.get_running_loop().run_in_executor(self._executor, self._version)
+            except OSError:
+                raise HTTPError(404, f"辞書ファイルが見つかりません: {self.json_file}") from None
+            if version != current:
+                raise HTTPError(409, f"辞書が更新されています（編集中の版 {version}、最新の版 {current}）。"
+                                     "読み込み直してください")
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.journal.append, operations)
+
+    def _journal_info(self):
+        try:
+            return DictionarySnapshot._source_info(self.journal.path)
+        except OSError:
+            return None
+
+    def _version(self):
+        return self.journal.version() or f"{_sha256_file(self.json_file)[:32]}-0"
+
+    def _load(self):
+        return self._version(), DictionaryConverter(self.json_file)
+
+
+class ConversionCache:
+    """変換結果のファイルのキャッシュ（最近使われていないものから削除する）
+
+    同じキーの変換が実行中の場合は、新たに変換せずその完了を待つ。
+    use() で送信中の変換結果は固定し、最大数を超えても削除しない（固定が外れてから削除する）。
+    """
+
+    def __init__(self, cache_dir, executor, max_entries=64):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._executor = executor
+        # キー -> 変換結果のファイル（空の出力は None）
+        self._entries = OrderedDict()
+        # キー -> 実行中の変換の Future
+        self._pending = {}
+        # キー -> use() で使っている要求の数
+        self._pins = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key, render):
+        """キーの変換結果のファイルを返す（なければ executor で render(出力ファイル) を実行）"""
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        future = self._pending[key] = loop.create_future()
+        try:
+            path = await loop.run_in_executor(self._executor, self._render, key, render)
+        except BaseException as e:
+            future.set_exception(e)
+            # 待っている要求がなくても「例外が取得されなかった」警告を出さない
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+        future.set_result(path)
+        self._entries[key] = path
+        self._evict()
+        return path
+
+    @asynccontextmanager
+    async def use(self, key, render):
+        """get() と同じ変換結果のファイルを返し、使い終わるまで削除しない"""
+        path = await self.get(key, render)
+        self._pins[key] = self._pins.get(key, 0) + 1
+        try:
+            yield path
+        finally:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+                self._evict()
+
+    def _render(self, key, render):
+        output_file = self.cache_dir / key
+        render(output_file)
+        return output_file if output_file.exists() else None
+
+    def _evict(self):
+        """最近使われていない順に、固定されていない変換結果を最大数まで削除（最後に使ったものは残す）"""
+        for key in list(self._entries)[:-1]:
+            if len(self._entries) <= self.max_entries:
+                break
+            if key in self._pins:
+                continue
+            path = self._entries.pop(key)
+            if path is not None:
+                path.unlink(missing_ok=True)
+
+
+class ConversionServer:
+    """変換サービスの本体（asyncio.start_server で要求を処理する）"""
+
+    def __init__(self, json_file=DEFAULT_DICTIONARY, cache_dir=None, max_entries=64, jobs=4,
+                 web_dir=WEB_EDITOR_DIR):
+        self.web_dir = Path(web_dir).resolve()
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+        self._temp_dir = None
+        if cache_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix='ime-dictionary-server-')
+            cache_dir = self._temp_dir.name
+        self.source = DictionarySource(json_file, self._executor)
+        self.cache = ConversionCache(cache_dir, self._executor, max_entries)
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """待ち受けを開始して asyncio.Server を返す（port=0 で空いているポート）"""
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        """スレッドと辞書、一時ディレクトリを片付ける"""
+        self._executor.shutdown(wait=True)
+        self.source.close()
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+
+    async def handle(self, reader, writer):
+        """1つの接続の要求を順に処理（Connection: close か切断まで）"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    keep_alive = await self._dispatch(writer, method, target, headers, body)
+                except HTTPError as e:
+                    keep_alive = await self._send_error(writer, e.status, str(e))
+                except Exception as e:
+                    logger.exception("変換エラー: %s %s", method, target)
+                    keep_alive = await self._send_error(writer, 500, str(e))
+                if not keep_alive or headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as e:
+            await self._send_error(writer, e.status, str(e))
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """要求行・ヘッダー・本文を読み込む（接続が閉じられたら None）"""
+        try:
+            line = await reader.readline()
+        except ValueError:
+            raise HTTPError(400, "要求行が長すぎます") from None
+        if not line.strip():
+            return None
+        try:
+            method, target, _version = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, "要求行が正しくありません") from None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        body = b''
+        if method == 'POST':
+            if 'content-length' not in headers:
+                raise HTTPError(411, "Content-Length を指定してください")
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                length = -1
+            if length < 0:
+                raise HTTPError(400, f"Content-Length が正しくありません: {headers['content-length']}")
+            if length > MAX_BODY_SIZE:
+                raise HTTPError(413, "辞書が大きすぎます")
+            body = await reader.readexactly(length)
+        return method, target, headers, body
+
+    async def _dispatch(self, writer, method, target, headers, body):
+        """要求を処理して応答を送信（接続を続けられるなら True）"""
+        url = urlsplit(target)
+        path = unquote(url.path)
+        query = parse_qs(url.query)
+        if path == '/api/journal':
+            if method != 'POST':
+                raise HTTPError(405, "POST で要求してください")
+            return await self._append_journal(writer, body)
+        if path.startswith('/api/convert/'):
+            if method not in ('GET', 'POST'):
+                raise HTTPError(405, "GET または POST で要求してください")
+            return await self._convert(writer, path.removeprefix('/api/convert/'), query, headers, body)
+        if method != 'GET':
+            raise HTTPError(405, "GET で要求してください")
+        if path == '/api/formats':
+            formats = [{'name': name, 'label': FORMATS[name].label, 'file': FORMAT_FILES[name][0]}
+                       for name in FORMATS]
+            return await self._send_json(writer, formats)
+        if path == '/api/status':
+            return await self._send_json(writer, {
+                'dictionary': str(self.source.json_file), 'version': self.source.version,
+                'cached': len(self.cache._entries), 'hits': self.cache.hits, 'misses': self.cache.misses,
+            })
+        if path == '/data/dictionary.json':
+            return await self._send_dictionary(writer, headers)
+        return await self._send_static(writer, path, headers)
+
+    async def _convert(self, writer, format_name, query, headers, body):
+        """辞書を変換して返す（POST の場合は本文の辞書JSONを変換）"""
+        if format_name not in FORMATS:
+            raise HTTPError(404, f"出力形式が正しくありません: {format_name}（{', '.join(FORMATS)}）")
+        categories = [name for value in query.get('category', []) for name in [value.strip()] if name] or None
+
+        async with AsyncExitStack() as stack:
+            if body:
+                digest = hashlib.sha256(body).hexdigest()
+                converter = None
+            else:
+                digest, converter = await stack.enter_async_context(self.source.hold())
+            key = conversion_key(digest, format_name, categories)
+            etag = f'W/"{key}"'
+            if etag_matches(headers.get('if-none-match'), etag):
+                return await self._send_headers(writer, 304, {'ETag': etag, 'Cache-Control': 'no-cache'})
+
+            def render(output_file):
+                if converter is not None:
+                    converter.convert([(format_name, output_file)], categories, quiet=True)
+                    return
+                # 送信された辞書は内容のハッシュの名前で保存してから読み込む
+                json_file = self.cache.cache_dir / f'{digest}.json'
+                json_file.write_bytes(body)
+                try:
+                    posted = DictionaryConverter(json_file, snapshot=False, manifest=False)
+                except Exception as e:
+                    raise ValueError(str(e)) from e
+                finally:
+                    json_file.unlink(missing_ok=True)
+                with posted:
+                    posted.convert([(format_name, output_file)], categories, quiet=True)
+
+            try:
+                path = await stack.enter_async_context(self.cache.use(key, render))
+            except ValueError as e:
+                raise HTTPError(400, f"辞書を読み込めません: {e}") from None
+            if path is None:
+                raise HTTPError(404, "出力する単語がありません")
+            filename, content_type = FORMAT_FILES[format_name]
+            return await self._send_file(writer, path, content_type, etag=etag, extra={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+            })
+
+    async def _send_dictionary(self, writer, headers):
+        """辞書JSONを返す（未反映の変更があれば再生した辞書を書き出してキャッシュする）"""
+        async with self.source.hold() as (version, converter):
+            etag = f'"{version}"'
+            # Web編集ツールはこのヘッダーで変換サービスから読み込んだことを判断する
+            extra = {'X-Dictionary-Version': version}
+            if not converter._journal_operations:
+                return await self._send_file(writer, self.source.json_file, 'application/json; charset=utf-8',
+                                             etag=etag, headers=headers, extra=extra)
+            if etag_matches(headers.get('if-none-match'), etag):
+                return await self._send_headers(writer, 304, {'ETag': etag, 'Cache-Control': 'no-cache', **extra})
+
+            def render(output_file):
+                write_dictionary_json(output_file, converter._iter_raw_categories(), converter._top_level)
+
+            async with self.cache.use(conversion_key(version, 'json', None), render) as path:
+                return await self._send_file(writer, path, 'application/json; charset=utf-8', etag=etag,
+                                             extra=extra)
+
+    async def _append_journal(self, writer, body):
+        """Web編集ツールの変更をジャーナルに追記して新しい版を返す"""
+        try:
+            request = json.loads(body)
+            version, operations = request['version'], request['operations']
+            if not isinstance(operations, list):
+                raise ValueError("operations は配列で指定してください")
+            for operation in operations:
+                ChangeJournal.check_operation(operation)
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPError(400, f"変更を読み込めません: {e}") from None
+        version = await self.source.append(version, operations)
+        return await self._send_json(writer, {'version': version})
+
+    async def _send_static(self, writer, path, headers):
+        """Web編集ツールのファイルを返す"""
+        file = (self.web_dir / (path.lstrip('/') or 'index.html')).resolve()
+        if file.is_dir():
+            file = file / 'index.html'
+        if not file.is_relative_to(self.web_dir) or not file.is_file():
+            raise HTTPError(404, f"ファイルが見つかりません: {path}")
+        content_type = mimetypes.guess_type(file.name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith('javascript'):
+            content_type += '; charset=utf-8'
+        stat = file.stat()
+        return await self._send_file(writer, file, content_type,
+                                     etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', headers=headers)
+
+    async def _send_file(self, writer, path, content_type, etag, headers=None, extra=None):
+        """ファイルを CHUNK_SIZE ずつ送信（If-None-Match が一致すれば 304）"""
+        response_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if headers is not None and etag_matches(headers.get('if-none-match'), etag):
+            return await self._send_headers(writer, 304, response_headers)
+        response_headers.update({'Content-Type': content_type, 'Content-Length': str(os.path.getsize(path))})
+        response_headers.update(extra or {})
+        await self._send_headers(writer, 200, response_headers)
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                writer.write(chunk)
+                await writer.drain()
+        return True
+
+    async def _send_json(self, writer, value):
+        body = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        await self._send_headers(writer, 200, {'Content-Type': 'application/json; charset=utf-8',
+                                               'Content-Length': str(len(body))})
+        writer.write(body)
+        await writer.drain()
+        return True
+
+    async def _send_error(self, writer, status, message):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+        await self._send_headers(writer, status, {'Content-Type': 'application/json; charset=utf-8',
+                                                  'Content-Length': str(len(body)), 'Connection': 'close'})
+        writer.write(body)
+        await writer.drain()
+        return False
+
+    async def _send_headers(self, writer, status, headers):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8'))
+        await writer.drain()
+        return True
+
+
+async def serve(args):
+    server = ConversionServer(args.dictionary, cache_dir=args.cache_dir, max_entries=args.cache_entries,
+                              jobs=args.jobs)
+    try:
+        listener = await server.start(args.host, args.port)
+        print(f"🌐 変換サービスを起動しました: http://{args.host}:{args.port}/ （Ctrl+C で終了）")
+        print(f"   辞書: {server.source.json_file}")
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IME辞書変換サービス - Web編集ツールと変換APIを配信')
+    parser.add_argument('--dictionary', type=Path, default=DEFAULT_DICTIONARY,
+                        help='変換する辞書ファイル（既定: data/dictionary.json）')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けるアドレス（既定: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8000, help='待ち受けるポート（既定: 8000）')
+    parser.add_argument('--cache-dir', help='変換結果のキャッシュディレクトリ（既定: 終了時に削除する一時ディレクトリ）')
+    parser.add_argument('--cache-entries', type=int, default=64, help='キャッシュする変換結果の数（既定: 64）')
+    parser.add_argument('--jobs', type=int, default=4, help='変換に使うスレッド数（既定: 4）')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    # 辞書データベースの接続はスレッド間で共有できないため、JSONだけを受け付ける
+    if args.dictionary.suffix.lower() in SQLITE_SUFFIXES:
+        print("❌ --dictionary にはJSONファイルを指定してください（--to-json で書き出せます）")
+        sys.exit(1)
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n👋 変換サービスを終了しました")
+    except OSError as e:
+        print(f"❌ 起動エラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
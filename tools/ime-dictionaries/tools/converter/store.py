@@ -0,0 +1,401 @@
+"""
+辞書データベース
+辞書をSQLiteに保存し、索引を使って検索・絞り込みをする（標準ライブラリの sqlite3 を使用）
+"""
+
+import json
+import os
+import sqlite3
+from collections.abc import Mapping, Sequence
+from itertools import count, product
+from pathlib import Path
+
+
+# SQLiteの辞書データベースとして扱う拡張子
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+
+class StoreWordList(Sequence):
+    """辞書データベース内の単語リスト（参照のたびにカーソルから1件ずつ読み込む）"""
+
+    def __init__(self, store, category_id):
+        self._store = store
+        self._category_id = category_id
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self._store.connection.execute(
+                'SELECT COUNT(*) FROM words WHERE category_id = ?', (self._category_id,)).fetchone()[0]
+        return self._count
+
+    def _rows(self, offset=0, limit=-1, order='ASC'):
+        """単語の行を辞書内の順（order='DESC' なら逆順）に返すカーソル"""
+        return self._store.connection.execute(DictionaryStore.ROW_QUERIES[order],
+                                              (self._category_id, limit, offset))
+
+    def __getitem__(self, index):
+        entry_from_row = self._store.entry_from_row
+        if isinstance(index, slice):
+            # 範囲の行を1回の問い合わせで読み込み、間隔と向きはその中で選ぶ
+            indexes = range(*index.indices(len(self)))
+            if not indexes:
+                return []
+            first = min(indexes[0], indexes[-1])
+            rows = self._rows(first, max(indexes[0], indexes[-1]) - first + 1).fetchall()
+            return [entry_from_row(rows[i - first]) for i in indexes]
+        if index < 0:
+            index += len(self)
+        row = self._rows(index, 1).fetchone() if index >= 0 else None
+        if row is None:
+            raise IndexError(index)
+        return entry_from_row(row)
+
+    def __iter__(self):
+        entry_from_row = self._store.entry_from_row
+        for row in self._rows():
+            yield entry_from_row(row)
+
+    def __reversed__(self):
+        # Sequence の既定の実装は1件ずつ OFFSET で問い合わせるため、逆順のカーソルで辿る
+        entry_from_row = self._store.entry_from_row
+        for row in self._rows(order='DESC'):
+            yield entry_from_row(row)
+
+
+def _store_queries(select, options, order):
+    """条件の指定の仕方の組み合わせごとに、単語を選ぶ問い合わせを作る
+
+    options は条件ごとの {指定の仕方: WHERE に加える条件} で、指定の仕方の
+    タプルを問い合わせのキーにする。値はすべて名前付きの引数で渡す。
+    """
+    queries = {}
+    for key in product(*options):
+        conditions = ''.join(fragments[mode] for fragments, mode in zip(options, key))
+        queries[key] = f"{select} WHERE c.enabled = 1{conditions} ORDER BY {order}"
+    return queries
+
+
+# カテゴリを指定した検索の条件（指定の有無 -> WHERE に加える条件）
+_STORE_CATEGORY_OPTIONS = {False: '', True: ' AND c.name IN (SELECT value FROM json_each(:categories))'}
+
+
+def _store_lookup_queries(columns):
+    """DictionaryStore.lookup() の問い合わせ（(読みの一致の仕方, カテゴリの指定の有無) -> SQL）"""
+    matches = {'exact': '{0} = :reading', 'prefix': '{0} >= :reading AND {0} < :prefix_end',
+               'open': '{0} >= :reading'}
+    queries = {}
+    for match, condition in matches.items():
+        select = f"""
+            SELECT m.key, w.id, c.name, {columns}
+            FROM (
+                SELECT id, reading AS key FROM words
+                WHERE {condition.format('reading')} AND reading != ''
+                UNION ALL
+                SELECT id, reading_windows FROM words
+                WHERE {condition.format('reading_windows')} AND reading_windows != ''
+                  AND reading_windows IS NOT reading
+            ) m
+            JOIN words w ON w.id = m.id
+            JOIN categories c ON c.id = w.category_id"""
+        for (filtered,), query in _store_queries(select, (_STORE_CATEGORY_OPTIONS,), 'm.key, w.id').items():
+            queries[match, filtered] = query
+    return queries
+
+
+class DictionaryStore:
+    """SQLiteに保存した辞書（標準ライブラリの sqlite3 を使用）
+
+    単語は words 表に1行ずつ保存し、読み・読み_Windows・単語・品詞・カテゴリ・
+    タグ（word_tags 表）に索引を作成する。単語リストは StoreWordList として
+    カーソルから1件ずつ読み込むため、辞書全体をメモリに読み込まずに
+    絞り込みや変換ができる。
+    文字列でない標準の項目や標準以外の項目は extra 列にJSONで保存し、
+    配列でない単語リストは categories 表の raw 列に、オブジェクトでない単語は
+    extra 列に、それぞれJSONでそのまま保存する（検証でエラーにできるように）。
+    """
+
+    SCHEMA = """
+        CREATE TABLE meta (
+            position INTEGER PRIMARY KEY,
+            key TEXT NOT NULL,
+            value TEXT
+        );
+        CREATE TABLE categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            enabled INTEGER NOT NULL,
+            info TEXT NOT NULL,
+            has_words INTEGER NOT NULL,
+            raw TEXT
+        );
+        CREATE TABLE words (
+            id INTEGER PRIMARY KEY,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            reading TEXT,
+            reading_windows TEXT,
+            word TEXT,
+            pos TEXT,
+            description TEXT,
+            tags TEXT,
+            extra TEXT
+        );
+        CREATE TABLE word_tags (
+            word_id INTEGER NOT NULL REFERENCES words(id),
+            tag TEXT NOT NULL
+        );
+    """
+
+    # 索引は取り込み後に作成する（先に作るより速い）
+    INDEXES = """
+        CREATE INDEX words_category ON words(category_id);
+        CREATE INDEX words_reading ON words(reading);
+        CREATE INDEX words_reading_windows ON words(reading_windows);
+        CREATE INDEX words_word ON words(word);
+        CREATE INDEX words_pos ON words(pos);
+        CREATE INDEX word_tags_tag ON word_tags(tag);
+        CREATE INDEX word_tags_word ON word_tags(word_id);
+    """
+
+    # 文字列として列に保存する標準の項目（タグは別扱い）
+    COLUMN_FIELDS = (('読み', 'reading'), ('読み_Windows', 'reading_windows'), ('単語', 'word'),
+                     ('品詞', 'pos'), ('説明', 'description'))
+    WORD_COLUMNS = 'reading, reading_windows, word, pos, description, tags, extra'
+    _JOINED_COLUMNS = ', '.join('w.' + column for column in WORD_COLUMNS.split(', '))
+
+    # 問い合わせは固定の文で、条件の有無や一覧の値は引数で渡す（一覧はJSONの配列で渡して json_each で展開する）
+    # StoreWordList の行（並び順 -> SQL）
+    ROW_QUERIES = {
+        'ASC': f'SELECT {WORD_COLUMNS} FROM words WHERE category_id = ? ORDER BY id ASC LIMIT ? OFFSET ?',
+        'DESC': f'SELECT {WORD_COLUMNS} FROM words WHERE category_id = ? ORDER BY id DESC LIMIT ? OFFSET ?',
+    }
+    # lookup()（(読みの一致の仕方, カテゴリの指定の有無) -> SQL）
+    LOOKUP_QUERIES = _store_lookup_queries(_JOINED_COLUMNS)
+    # find()（(単語, 品詞, タグ, カテゴリの各指定の有無) -> SQL）
+    FIND_QUERIES = _store_queries(
+        f"SELECT c.name, {_JOINED_COLUMNS} FROM words w JOIN categories c ON c.id = w.category_id",
+        ({False: '', True: ' AND w.word = :word'},
+         {False: '', True: ' AND w.pos = :pos'},
+         {False: '', True: ' AND w.id IN (SELECT word_id FROM word_tags WHERE tag = :tag)'},
+         _STORE_CATEGORY_OPTIONS), 'w.id LIMIT :limit')
+    # select()（(タグの指定の仕方, 品詞の指定の仕方, カテゴリの指定の有無) -> SQL）
+    SELECT_QUERIES = _store_queries(
+        f"SELECT c.name, {_JOINED_COLUMNS} FROM words w JOIN categories c ON c.id = w.category_id",
+        ({None: '',
+          'any': ' AND w.id IN (SELECT word_id FROM word_tags WHERE tag IN (SELECT value FROM json_each(:tags)))',
+          'all': ' AND w.id IN (SELECT word_id FROM word_tags WHERE tag IN (SELECT value FROM json_each(:tags))'
+                 ' GROUP BY word_id HAVING COUNT(DISTINCT tag) = json_array_length(:tags))'},
+         {None: '',
+          'listed': ' AND w.pos IN (SELECT value FROM json_each(:pos))',
+          # 品詞がない単語（文字列でない品詞は extra 列にある）も「名詞」として選ぶ
+          'noun': ' AND (w.pos IN (SELECT value FROM json_each(:pos))'
+                  ' OR (w.pos IS NULL AND (w.extra IS NULL OR json_type(w.extra, \'$."品詞"\') IS NULL)))'},
+         _STORE_CATEGORY_OPTIONS), 'w.id')
+
+    def __init__(self, db_file):
+        self.db_file = Path(db_file)
+        if not self.db_file.is_file():
+            raise Exception(f"辞書データベースが見つかりません: {self.db_file}")
+        self.connection = sqlite3.connect(self.db_file)
+        self._tag_lists = {}
+        self._pool = {}
+
+    @classmethod
+    def create(cls, db_file, categories, top_level):
+        """辞書データベースを作成（既存のファイルは置き換える）
+
+        categories は (カテゴリ名, カテゴリ情報, 単語リスト) のイテレータ、
+        top_level は最上位の項目を返す関数（DictionaryConverter._iter_raw_categories()
+        と _top_level() を渡すと、ストリームモードでも1件ずつ取り込める）。
+        """
+        db_file = Path(db_file)
+        temp_file = db_file.with_name(db_file.name + '.tmp')
+        if temp_file.exists():
+            temp_file.unlink()
+        connection = sqlite3.connect(temp_file)
+        try:
+            # 作成中のファイルは完成後に置き換えるため、ジャーナルと同期を省いて速くする
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.executescript(cls.SCHEMA)
+            word_ids = count(1)
+            with connection:
+                for category_id, (cat_name, cat_data, words) in enumerate(categories, 1):
+                    cls._insert_category(connection, category_id, cat_name, cat_data, words, word_ids)
+                data = top_level()
+                connection.executemany('INSERT INTO meta (position, key, value) VALUES (?, ?, ?)', [
+                    (position, key, None if key == 'カテゴリ' else json.dumps(value, ensure_ascii=False))
+                    for position, (key, value) in enumerate(data.items())
+                ])
+            connection.executescript(cls.INDEXES)
+        finally:
+            connection.close()
+        os.replace(temp_file, db_file)
+        return db_file
+
+    @classmethod
+    def _insert_category(cls, connection, category_id, cat_name, cat_data, words, word_ids):
+        info = {key: value for key, value in cat_data.items() if key != '単語リスト'}
+        has_words = words is not convert.MISSING_WORD_LIST
+        raw = None
+        if not convert._is_word_list(words):
+            # 配列でない単語リストはそのまま保存（検証でエラーにできるように）
+            raw = json.dumps(words, ensure_ascii=False)
+        connection.execute(
+            'INSERT INTO categories (id, name, enabled, info, has_words, raw) VALUES (?, ?, ?, ?, ?, ?)',
+            (category_id, cat_name, int(cat_data.get('有効', True) is not False),
+             json.dumps(info, ensure_ascii=False), int(has_words), raw))
+        if raw is not None or not has_words:
+            return
+
+        tag_rows = []
+        tag_texts = {}
+
+        def rows():
+            for word in words:
+                word_id = next(word_ids)
+                tags = word.get('タグ') if isinstance(word, Mapping) else None
+                if isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+                    tag_rows.extend((word_id, tag) for tag in dict.fromkeys(tags))
+                yield (word_id, category_id, *cls._word_columns(word, tag_texts))
+
+        connection.executemany('INSERT INTO words (id, category_id, reading, reading_windows, word, pos, '
+                               'description, tags, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows())
+        connection.executemany('INSERT INTO word_tags (word_id, tag) VALUES (?, ?)', tag_rows)
+
+    @classmethod
+    def _word_columns(cls, word, tag_texts):
+        """単語を words 表の列（reading 〜 extra）の値に変換
+
+        tag_texts はタグのリスト（タプル）からJSON文字列への変換結果の表。
+        """
+        if not isinstance(word, Mapping):
+            # オブジェクトでない単語（不正なデータ）は extra にそのまま保存
+            return [None] * (len(cls.COLUMN_FIELDS) + 1) + [json.dumps(word, ensure_ascii=False)]
+        get = word.get
+        columns = []
+        extra = {}
+        for key, _column in cls.COLUMN_FIELDS:
+            value = get(key, convert._MISSING)
+            if isinstance(value, str):
+                columns.append(value)
+            else:
+                columns.append(None)
+                if value is not convert._MISSING:
+                    extra[key] = value
+        tags = get('タグ', convert._MISSING)
+        if isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+            key = tuple(tags)
+            text = tag_texts.get(key)
+            if text is None:
+                text = tag_texts[key] = json.dumps(tags, ensure_ascii=False)
+            columns.append(text)
+        else:
+            columns.append(None)
+            if tags is not convert._MISSING:
+                extra['タグ'] = tags
+        if isinstance(word, convert.CompactEntry):
+            if word._extra:
+                extra.update(word._extra)
+        else:
+            extra.update((key, value) for key, value in word.items() if key not in convert._COMPACT_FIELDS)
+        columns.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        return columns
+
+    def entry_from_row(self, row):
+        """words 表の行（WORD_COLUMNS の順）を CompactEntry に変換"""
+        tags, extra = row[-2], row[-1]
+        if extra is not None:
+            extra = json.loads(extra)
+            if not isinstance(extra, dict):
+                return extra
+        pairs = [(key, value) for (key, _column), value in zip(self.COLUMN_FIELDS, row) if value is not None]
+        if tags is not None:
+            tag_list = self._tag_lists.get(tags)
+            if tag_list is None:
+                tag_list = self._tag_lists[tags] = json.loads(tags)
+            pairs.append(('タグ', tag_list))
+        if extra is not None:
+            pairs.extend(extra.items())
+        return convert.CompactEntry.from_pairs(pairs, self._pool)
+
+    def to_data(self):
+        """JSONを読み込んだ場合と同じ形のデータ（単語リストは StoreWordList）"""
+        data = {}
+        for key, value in self.connection.execute('SELECT key, value FROM meta ORDER BY position'):
+            data[key] = {} if value is None else json.loads(value)
+        categories = data.get('カテゴリ')
+        if not isinstance(categories, dict):
+            return data
+        rows = self.connection.execute('SELECT id, name, info, has_words, raw FROM categories ORDER BY id')
+        for category_id, name, info, has_words, raw in rows:
+            cat_data = json.loads(info)
+            if raw is not None:
+                cat_data['単語リスト'] = json.loads(raw)
+            elif has_words:
+                cat_data['単語リスト'] = StoreWordList(self, category_id)
+            categories[name] = cat_data
+        return data
+
+    @staticmethod
+    def _category_params(categories):
+        """カテゴリの指定の有無と、問い合わせに渡すカテゴリ名の一覧（JSONの配列）"""
+        return bool(categories), json.dumps(list(categories or ()), ensure_ascii=False)
+
+    def lookup(self, reading, exact=False, categories=None, limit=None):
+        """読み（読み・読み_Windows）で索引を使って検索し、WordView のリストを返す
+
+        ReadingIndex.lookup() と同じく、読みの順（同じ読みの中では辞書内の順）に返す。
+        """
+        prefix_end = None if exact else convert.ReadingIndex._prefix_end(reading)
+        match = 'exact' if exact else ('open' if prefix_end is None else 'prefix')
+        filtered, category_names = self._category_params(categories)
+        params = {'reading': reading, 'prefix_end': prefix_end, 'categories': category_names}
+        results = []
+        seen = set()
+        for row in self.connection.execute(self.LOOKUP_QUERIES[match, filtered], params):
+            word_id, cat_name = row[1], row[2]
+            if word_id in seen:
+                continue
+            seen.add(word_id)
+            results.append(convert.WordView(self.entry_from_row(row[3:]), cat_name))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def find(self, word=None, pos=None, tag=None, categories=None, limit=None):
+        """単語・品詞・タグの完全一致で索引を使って検索し、WordView のリストを返す（辞書内の順）"""
+        filtered, category_names = self._category_params(categories)
+        query = self.FIND_QUERIES[word is not None, pos is not None, tag is not None, filtered]
+        params = {'word': word, 'pos': pos, 'tag': tag, 'categories': category_names,
+                  'limit': -1 if limit is None else limit}
+        return [convert.WordView(self.entry_from_row(row[1:]), row[0])
+                for row in self.connection.execute(query, params)]
+
+    def select(self, tags=None, pos=None, match_all=False, categories=None):
+        """タグ・品詞で索引を使って単語を選択し、WordView のリストを返す（辞書内の順）
+
+        条件は TagIndex.select() と同じ。品詞がない単語は「名詞」として扱う。
+        """
+        tags = list(dict.fromkeys(tags or ()))
+        pos = list(dict.fromkeys(pos or ()))
+        tag_mode = ('all' if match_all else 'any') if tags else None
+        pos_mode = ('noun' if '名詞' in pos else 'listed') if pos else None
+        filtered, category_names = self._category_params(categories)
+        params = {'tags': json.dumps(tags, ensure_ascii=False), 'pos': json.dumps(pos, ensure_ascii=False),
+                  'categories': category_names}
+        return [convert.WordView(self.entry_from_row(row[1:]), row[0])
+                for row in self.connection.execute(self.SELECT_QUERIES[tag_mode, pos_mode, filtered], params)]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# convert もこのモジュールを import するため、定義の後で import し、convert の名前は使うときに参照する
+import convert
@@ -12,10 +12,24 @@ let dictionaryData = {
 let currentCategory = null;
 let editingWordIndex = -1;
 
+// 変換サービス（tools/converter/server.py）で配信しているか（辞書の読み込み時に判断する）
+let converterAvailable = false;
+// 変換サービスから読み込んだ辞書の版と、保存していない変更（サービスのジャーナルに追記する）
+let dictionaryVersion = null;
+let pendingChanges = [];
+
+// 変更を記録（保存時にまとめて送信する）
+function recordChange(change) {
+    pendingChanges.push(change);
+}
+
 // 辞書データを読み込む共通関数
 function loadDictionary(jsonData) {
     try {
         dictionaryData = typeof jsonData === 'string' ? JSON.parse(jsonData) : jsonData;
+        // ファイルから読み込んだ辞書はサービスの辞書と別物として扱う
+        dictionaryVersion = null;
+        pendingChanges = [];
         updateUI();
         showNotification('✅ ファイルを読み込みました', 'success');
     } catch (error) {
@@ -173,9 +187,37 @@ function showNotification(message, type = 'info') {
     }, 3000);
 }
 
+// 変更だけを変換サービスのジャーナルに追記（サービスの辞書を編集中でなければ false）
+async function saveChangesToConverter() {
+    if (!converterAvailable || dictionaryVersion === null) return false;
+    const changes = [...pendingChanges, {op: 'set_info', info: {更新日: dictionaryData.辞書情報.更新日}}];
+    try {
+        const response = await fetch('/api/journal', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({version: dictionaryVersion, operations: changes})
+        });
+        if (response.status === 409) {
+            const result = await response.json();
+            showNotification('⚠️ ' + result.error, 'error');
+            return false;
+        }
+        if (!response.ok) return false;
+        dictionaryVersion = (await response.json()).version;
+        pendingChanges = [];
+        showNotification(`💾 変更を保存しました（${changes.length - 1}件）`, 'success');
+        return true;
+    } catch (error) {
+        console.warn('変換サービスを利用できません:', error);
+        return false;
+    }
+}
+
 // JSONファイル保存
-function saveJSON() {
+// 変換サービスで配信している場合は変更だけを送信し、それ以外は辞書全体をダウンロードする
+async function saveJSON() {
     dictionaryData.辞書情報.更新日 = new Date().toISOString().split('T')[0];
+    if (await saveChangesToConverter()) return;
 
     const dataStr = JSON.stringify(dictionaryData, null, 2);
     const dataBlob = new Blob([dataStr], {type: 'application/json'});
@@ -254,6 +296,7 @@ function deleteWord(index) {
 
     if (confirm('この単語を削除しますか？')) {
         dictionaryData.カテゴリ[currentCategory].単語リスト.splice(index, 1);
+        recordChange({op: 'delete_word', category: currentCategory, index: index});
         updateUI();
         showNotification('🗑️ 単語を削除しました', 'success');
     }
@@ -313,14 +356,18 @@ document.getElementById('wordForm').addEventListener('submit', function(e) {
             // カテゴリ変更の場合
             dictionaryData.カテゴリ[currentCategory].単語リスト.splice(editingWordIndex, 1);
             dictionaryData.カテゴリ[categoryKey].単語リスト.push(wordData);
+            recordChange({op: 'delete_word', category: currentCategory, index: editingWordIndex});
+            recordChange({op: 'add_word', category: categoryKey, word: wordData});
             currentCategory = categoryKey;
         } else {
             dictionaryData.カテゴリ[categoryKey].単語リスト[editingWordIndex] = wordData;
+            recordChange({op: 'edit_word', category: categoryKey, index: editingWordIndex, word: wordData});
         }
         showNotification('✏️ 単語を更新しました', 'success');
     } else {
         // 新規追加
         dictionaryData.カテゴリ[categoryKey].単語リスト.push(wordData);
+        recordChange({op: 'add_word', category: categoryKey, word: wordData});
         currentCategory = categoryKey;
         showNotification('➕ 単語を追加しました', 'success');
     }
@@ -361,6 +408,7 @@ document.getElementById('categoryForm').addEventListener('submit', function(e) {
         有効: true,
         単語リスト: []
     };
+    recordChange({op: 'add_category', category: name, info: {説明: description, 有効: true}});
 
     currentCategory = name;
     closeCategoryModal();
@@ -437,8 +485,33 @@ function escapeCSVField(field) {
     return str.replace(/"/g, '""');
 }
 
+// 変換サービス（tools/converter/server.py）で変換してダウンロード
+// 編集中の辞書を送信し、変換ツールと同じ出力を得る。サービスで配信していない場合は false を返し、
+// 呼び出し元はブラウザ内での変換にフォールバックする
+async function exportWithConverter(format, selectedCategories, filename) {
+    if (!converterAvailable) return false;
+    try {
+        const query = selectedCategories.map(name => `category=${encodeURIComponent(name)}`).join('&');
+        const response = await fetch(`/api/convert/${format}?${query}`, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(dictionaryData)
+        });
+        if (!response.ok) return false;
+        const blob = await response.blob();
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(blob);
+        link.download = filename;
+        link.click();
+        return true;
+    } catch (error) {
+        console.warn('変換サービスを利用できません:', error);
+        return false;
+    }
+}
+
 // エクスポート機能
-function exportToCSV() {
+async function exportToCSV() {
     const selectedCategories = getSelectedCategories();
     if (selectedCategories.length === 0) {
         showNotification('⚠️ エクスポートするカテゴリを選択してください', 'error');
@@ -471,11 +544,13 @@ function exportToCSV() {
     // BOM + ヘッダー + データ
     const csvContent = '\uFEFF' + [header, ...rows].join('\n');
 
-    downloadFile(csvContent, 'dictionary.csv', 'text/csv');
+    if (!await exportWithConverter('csv', selectedCategories, 'dictionary.csv')) {
+        downloadFile(csvContent, 'dictionary.csv', 'text/csv');
+    }
     showNotification(`📄 CSV形式で出力しました (${selectedCategories.length}カテゴリ, ${data.length}件)`, 'success');
 }
 
-function exportToTXT() {
+async function exportToTXT() {
     const selectedCategories = getSelectedCategories();
     if (selectedCategories.length === 0) {
         showNotification('⚠️ エクスポートするカテゴリを選択してください', 'error');
@@ -492,11 +567,13 @@ function exportToTXT() {
         return `${word.読み}\t${word.単語}\t${word.品詞 || '名詞'}\t${word.説明 || ''}`;
     }).join('\n');
 
-    downloadFile(txtContent, 'dictionary.txt', 'text/plain');
+    if (!await exportWithConverter('txt', selectedCategories, 'dictionary.txt')) {
+        downloadFile(txtContent, 'dictionary.txt', 'text/plain');
+    }
     showNotification(`📄 TXT形式で出力しました (${selectedCategories.length}カテゴリ, ${data.length}件)`, 'success');
 }
 
-function exportToMacOS() {
+async function exportToMacOS() {
     const selectedCategories = getSelectedCategories();
     if (selectedCategories.length === 0) {
         showNotification('⚠️ エクスポートするカテゴリを選択してください', 'error');
@@ -541,7 +618,9 @@ function exportToMacOS() {
 
     const plistContent = plistHeader + '\n' + entries + '\n' + plistFooter;
 
-    downloadFile(plistContent, 'dictionary.plist', 'application/x-plist');
+    if (!await exportWithConverter('macos_plist', selectedCategories, 'dictionary.plist')) {
+        downloadFile(plistContent, 'dictionary.plist', 'application/x-plist');
+    }
     showNotification(`🍎 macOS用plist形式で出力しました (${selectedCategories.length}カテゴリ, ${data.length}件)`, 'success');
 }
 
@@ -563,7 +642,7 @@ function mapPOSForWindows(pos) {
     return windowsPOSMap[pos] || '名詞';
 }
 
-function exportToWindows() {
+async function exportToWindows() {
     const selectedCategories = getSelectedCategories();
     if (selectedCategories.length === 0) {
         showNotification('⚠️ エクスポートするカテゴリを選択してください', 'error');
@@ -592,7 +671,9 @@ function exportToWindows() {
     ].join('\n');
 
     // UTF-16LE形式でダウンロード（BOMは関数内で追加される）
-    downloadFileUTF16LE(windowsContent, 'dictionary_windows.txt');
+    if (!await exportWithConverter('windows', selectedCategories, 'dictionary_windows.txt')) {
+        downloadFileUTF16LE(windowsContent, 'dictionary_windows.txt');
+    }
     showNotification(`🪟 Windows形式で出力しました (${selectedCategories.length}カテゴリ, ${data.length}件)`, 'success');
 }
 
@@ -677,6 +758,11 @@ async function loadDefaultDictionary() {
         }
         const jsonData = await response.json();
         dictionaryData = jsonData;
+        // 変換サービスは X-Dictionary-Version に辞書の版を返す（変更の保存時に送信する）
+        // 他のサーバー（GitHub Pages など）の ETag は辞書の版ではないため使わない
+        dictionaryVersion = response.headers.get('X-Dictionary-Version');
+        converterAvailable = dictionaryVersion !== null;
+        pendingChanges = [];
         updateUI();
         showNotification('📚 IME辞書管理ツールを開始しました（デフォルトデータ読み込み済み）', 'success');
     } catch (error) {